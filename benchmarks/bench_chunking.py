@@ -0,0 +1,129 @@
+"""
+    Chunking throughput (MB/s) and chunk-size spread: the previous LangChain
+    splitter, built per document and sized in characters, against the shared
+    RecursiveChunker sized in characters and in tokens, whole-text and
+    streamed page by page.
+
+    Run from the repository root:
+
+        python -m benchmarks.bench_chunking --mb 20
+        python -m benchmarks.bench_chunking --corpus path/to/texts
+
+    Without --corpus a synthetic corpus of prose-like documents is
+    generated. Token counts use tiktoken when its encoding is available and
+    the 4-characters-per-token estimate otherwise; the output says which.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from src.utils.chunking import RecursiveChunker
+from src.utils.tokens import _get_encoding, count_tokens
+
+
+def synthetic_corpus(megabytes: float, seed: int) -> list:
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 10))) for _ in range(5000)]
+
+    def paragraph():
+        sentences = [
+            " ".join(rng.choice(vocabulary) for _ in range(rng.randint(4, 30))).capitalize()
+            for _ in range(rng.randint(1, 10))
+        ]
+        return ". ".join(sentences) + "."
+
+    documents = []
+    total = 0
+    while total < megabytes * 1024 * 1024:
+        document = "\n\n".join(paragraph() for _ in range(rng.randint(20, 400)))
+        documents.append(document)
+        total += len(document)
+    return documents
+
+
+def load_corpus(path: str) -> list:
+    documents = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            with open(os.path.join(root, name), "r", encoding="utf-8", errors="ignore") as corpus_file:
+                documents.append(corpus_file.read())
+    return documents
+
+
+def langchain_per_document(document: str) -> list:
+    # The previous path: a new splitter per call, tokens counted afterwards
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        separators=["\n\n", "\n", ".", " ", ""]
+    )
+    return [count_tokens(chunk) for chunk in splitter.split_text(document)]
+
+
+def pages(document: str, page_chars: int = 3000):
+    for start in range(0, len(document), page_chars):
+        yield {"text": document[start:start + page_chars], "page": start // page_chars + 1}
+
+
+def run(name: str, documents: list, chunk_document) -> dict:
+    started = time.perf_counter()
+    token_counts = []
+    for document in documents:
+        token_counts.extend(chunk_document(document))
+    elapsed = time.perf_counter() - started
+
+    megabytes = sum(len(document.encode("utf-8")) for document in documents) / (1024 * 1024)
+    result = {
+        "mb_per_second": megabytes / elapsed,
+        "seconds": elapsed,
+        "chunks": len(token_counts),
+        "tokens_mean": statistics.mean(token_counts),
+        "tokens_stdev": statistics.pstdev(token_counts),
+        "tokens_min": min(token_counts),
+        "tokens_max": max(token_counts)
+    }
+    print(f"  {name:22s} {result['mb_per_second']:8.2f} MB/s  {result['chunks']:7d} chunks  "
+          f"tokens {result['tokens_mean']:6.1f} ± {result['tokens_stdev']:5.1f} "
+          f"[{result['tokens_min']}, {result['tokens_max']}]")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=20.0, help="size of the synthetic corpus")
+    parser.add_argument("--corpus", help="directory of text files to use instead")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "chunking.json"))
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.mb, args.seed)
+    tokenizer = "tiktoken" if _get_encoding("gpt-4o-mini") is not None else "estimate"
+    print(f"{len(documents)} documents, {sum(map(len, documents)) / 1e6:.1f}M characters, tokens by {tokenizer}")
+
+    by_chars = RecursiveChunker(1000, 200, "chars")
+    by_tokens = RecursiveChunker(250, 50, "tokens")
+
+    results = {"parameters": vars(args), "tokenizer": tokenizer, "splitters": {
+        "langchain_per_document": run("langchain_per_document", documents, langchain_per_document),
+        "chunker_chars": run("chunker_chars", documents, lambda document: [
+            chunk["token_count"] for chunk in by_chars.split(document)
+        ]),
+        "chunker_tokens": run("chunker_tokens", documents, lambda document: [
+            chunk["token_count"] for chunk in by_tokens.split(document)
+        ]),
+        "chunker_tokens_stream": run("chunker_tokens_stream", documents, lambda document: [
+            metadata["token_count"] for _, metadata in by_tokens.stream(pages(document))
+        ])
+    }}
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
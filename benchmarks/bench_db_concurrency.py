@@ -0,0 +1,133 @@
+"""
+    Drive many simulated user sessions against the database layer at once
+    and report per-operation latency, throughput, errors and how many pooled
+    connections were in use. Each session runs in its own thread with its
+    own DatabaseManager, as Streamlit sessions do; all of them share the
+    process-wide engine and pool.
+
+    Run from the repository root. Without DATABASE_URL a throwaway SQLite
+    file is used; point DATABASE_URL at a local Postgres to test that:
+
+        python -m benchmarks.bench_db_concurrency --sessions 50 --turns 20
+
+    Benchmark chatbots are named "bench db <n>" and are deleted at the end.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.metrics import MetricsRecorder
+
+
+def run_session(db, session_id: int, chatbots: list, turns: int, recorder: MetricsRecorder, seed: int):
+    rng = random.Random(seed + session_id)
+    name = rng.choice(chatbots)
+
+    def timed(operation, call, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return call(*args, **kwargs)
+        except Exception as e:
+            recorder.increment("errors")
+            print(f"session {session_id} {operation} failed: {e}")
+        finally:
+            recorder.record(operation, time.perf_counter() - started)
+
+    # A page load: the catalog, the chatbot and the latest page of history
+    timed("get_chatbot_summaries", db.get_chatbot_summaries)
+    timed("get_chatbot", db.get_chatbot, name)
+    timed("get_chat_history_page", db.get_chat_history_page, name, limit=50)
+
+    # Then a conversation, re-reading history as each rerun does
+    for turn in range(turns):
+        timed("save_chat_message", db.save_chat_message, name, f"question {session_id}.{turn}", "answer " * 50)
+        timed("get_chat_history_page", db.get_chat_history_page, name, limit=50)
+        if rng.random() < 0.1:
+            timed("get_all_chatbots", db.get_all_chatbots)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="simulated user sessions")
+    parser.add_argument("--concurrency", type=int, default=None, help="sessions running at once (default: all)")
+    parser.add_argument("--turns", type=int, default=20, help="chat turns per session")
+    parser.add_argument("--chatbots", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "db_concurrency.json"))
+    args = parser.parse_args()
+
+    if not os.environ.get("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(prefix="bench_db_"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    # Imported after DATABASE_URL is settled; the engine is built on first use
+    from src.database_manager import DatabaseManager
+    from src.resource_manager import get_db_engine
+
+    setup = DatabaseManager()
+    chatbots = [f"bench db {i}" for i in range(args.chatbots)]
+    for name in chatbots:
+        setup.create_chatbot(name, "You are a benchmark.", [
+            {"filename": "bench.txt", "type": "text/plain", "content": "benchmark " * 200, "chunk_count": 4}
+        ])
+
+    pool = get_db_engine().pool
+    peak = {"checked_out": 0}
+    stop = threading.Event()
+
+    def sample_pool():
+        while not stop.is_set():
+            checked_out = getattr(pool, "checkedout", lambda: 0)()
+            peak["checked_out"] = max(peak["checked_out"], checked_out)
+            time.sleep(0.005)
+
+    recorder = MetricsRecorder(window=args.sessions * (args.turns * 3 + 3))
+    sampler = threading.Thread(target=sample_pool, daemon=True)
+    sampler.start()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency or args.sessions) as executor:
+        futures = [
+            executor.submit(run_session, DatabaseManager(), i, chatbots, args.turns, recorder, args.seed)
+            for i in range(args.sessions)
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+    stop.set()
+
+    for name in chatbots:
+        setup.delete_chatbot(name)
+
+    operations = [name for name in recorder.names() if name != "errors"]
+    total = sum(recorder.summary(name)["count"] for name in operations)
+    results = {
+        "parameters": vars(args),
+        "database": get_db_engine().dialect.name,
+        "pool": pool.status(),
+        "peak_checked_out": peak["checked_out"],
+        "elapsed": elapsed,
+        "operations_per_second": total / elapsed,
+        "errors": recorder.counter("errors"),
+        "operations": {name: recorder.summary(name) for name in operations}
+    }
+
+    print(f"{results['database']}: {args.sessions} sessions x {args.turns} turns, {total} operations "
+          f"in {elapsed:.2f}s ({results['operations_per_second']:.0f}/s), {results['errors']} errors, "
+          f"peak {peak['checked_out']} connections")
+    for name, summary in results["operations"].items():
+        print(f"  {name:22s} p50 {summary['p50'] * 1000:8.2f} ms  p95 {summary['p95'] * 1000:8.2f} ms  "
+              f"p99 {summary['p99'] * 1000:8.2f} ms")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=2, default=str)
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
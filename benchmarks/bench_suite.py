@@ -0,0 +1,309 @@
+"""
+    Offline benchmark of the app's hot paths, with local stand-ins for every
+    external service: a fake OpenAI API with configurable latency (reached
+    by the real SDK clients), the in-memory numpy vector store, and SQLite.
+    Nothing needs secrets or network access.
+
+    Stages, each reporting throughput and p50/p95/p99 per operation:
+
+    - ingestion: parse (FileProcessor.process_file), chunk
+      (build_file_chunks), push (VectorStore.push_chunks, with embeddings)
+    - retrieval: VectorStore.fetch_relevant_chunks, hybrid, distinct queries
+    - chat: end-to-end turns through the response pipeline, as the chat
+      page runs them (retrieval, history and prompt assembly, generation),
+      whole and streamed with time to first token
+    - history: DatabaseManager saves, group-committed batches and page reads
+
+    Run from the repository root:
+
+        python -m benchmarks.bench_suite
+        python -m benchmarks.bench_suite --docs 200 --queries 1000 --concurrency 8
+        python -m benchmarks.bench_suite --baseline benchmarks/results/suite-<earlier>.json
+
+    Results are saved as JSON under benchmarks/results/; with --baseline,
+    p50 and p95 are compared against an earlier run.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from benchmarks.bench_chunking import synthetic_corpus
+from benchmarks.fake_openai import FakeOpenAI
+from src.utils.metrics import MetricsRecorder
+
+
+class Stage:
+    """Times the operations of one stage and summarizes them."""
+
+    def __init__(self, name: str, recorder: MetricsRecorder):
+        self.name = name
+        self.recorder = recorder
+        self.operations = []
+        self.started = None
+        self.elapsed = None
+        self.units = {}
+
+    def __enter__(self):
+        print(f"{self.name}...")
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+
+    def time(self, operation: str, call, *args, **kwargs):
+        if operation not in self.operations:
+            self.operations.append(operation)
+        started = time.perf_counter()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            self.recorder.record(f"{self.name}.{operation}", time.perf_counter() - started)
+
+    def record(self, operation: str, seconds: float):
+        if operation not in self.operations:
+            self.operations.append(operation)
+        self.recorder.record(f"{self.name}.{operation}", seconds)
+
+    def count(self, unit: str, amount: float):
+        self.units[unit] = self.units.get(unit, 0) + amount
+
+    def summary(self) -> dict:
+        operations = {operation: self.recorder.summary(f"{self.name}.{operation}") for operation in self.operations}
+        result = {
+            "seconds": self.elapsed,
+            "throughput": {f"{unit}_per_second": amount / self.elapsed for unit, amount in self.units.items()},
+            "operations": operations
+        }
+        for operation, summary in operations.items():
+            print(f"  {operation:16s} n={summary['count']:<6d} p50 {summary['p50'] * 1000:9.2f} ms  "
+                  f"p95 {summary['p95'] * 1000:9.2f} ms  p99 {summary['p99'] * 1000:9.2f} ms")
+        for unit, rate in result["throughput"].items():
+            print(f"  {unit}: {rate:.2f}")
+        return result
+
+
+def configure_environment(workdir: str, fake: FakeOpenAI):
+    """Point every external dependency at a local stand-in; settings are read on use."""
+
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": fake.base_url,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "VECTOR_STORE_BACKEND": "numpy",
+        "NUMPY_STORE_PERSIST": "false",
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite3"),
+        "LEXICAL_INDEX_PATH": os.path.join(workdir, "lexical_index"),
+        "KB_CONTENT_PATH": os.path.join(workdir, "kb_content"),
+        "INGESTION_STAGING_PATH": os.path.join(workdir, "ingestion_staging")
+    })
+
+
+def run_ingestion(recorder, documents, chatbots) -> dict:
+    from src.file_processor import FileProcessor
+    from src.ingestion_pipeline import UploadedBlob, build_file_chunks
+    from src.utils.hashing import content_hash
+    from src.vector_store import get_vector_store
+
+    store = get_vector_store()
+    processor = FileProcessor()
+    with Stage("ingestion", recorder) as stage:
+        for i, document in enumerate(documents):
+            name = chatbots[i % len(chatbots)]
+            store.create(chatbot_name=name)
+            data = document.encode("utf-8")
+            filename = f"document_{i}.txt"
+
+            text = stage.time("parse", processor.process_file, UploadedBlob(filename, "text/plain", data))
+            file_item = {"filename": filename, "type": "text/plain", "content": text, "content_hash": content_hash(text)}
+            chunks = stage.time("chunk", build_file_chunks, file_item)
+            stage.time("push", store.push_chunks, chatbot_name=name, chunks=chunks)
+
+            stage.count("megabytes", len(data) / (1024 * 1024))
+            stage.count("chunks", len(chunks))
+            stage.count("documents", 1)
+    return stage.summary()
+
+
+def run_retrieval(recorder, queries, chatbots, concurrency) -> dict:
+    from src.vector_store import get_vector_store
+
+    store = get_vector_store()
+    with Stage("retrieval", recorder) as stage:
+        def query(i):
+            stage.time("fetch", store.fetch_relevant_chunks, chatbot_name=chatbots[i % len(chatbots)], user_query=queries[i])
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(query, range(len(queries))))
+        stage.count("queries", len(queries))
+    return stage.summary()
+
+
+def run_chat(recorder, questions, chatbots, concurrency, stream_share) -> dict:
+    from src.context_assembler import ContextAssembler
+    from src.response_pipeline import get_response_pipeline
+    from src.utils.settings import get_setting
+    from src.vector_store import get_vector_store
+
+    store = get_vector_store()
+    pipeline = get_response_pipeline()
+    history = [{"user": f"Earlier question {i}?", "assistant": f"Earlier answer {i}. " * 20} for i in range(10)]
+
+    with Stage("chat", recorder) as stage:
+        def turn(i):
+            name = chatbots[i % len(chatbots)]
+            question = questions[i]
+            # Same calls as ChatInterface._prepare_messages
+            prepared = pipeline.prepare(
+                name,
+                "You are a helpful assistant for the benchmark corpus.",
+                question,
+                history=history,
+                retrieve=lambda: store.fetch_relevant_chunks(chatbot_name=name, user_query=question),
+                assembler=ContextAssembler(
+                    token_budget=get_setting("CONTEXT_TOKEN_BUDGET", 6000),
+                    max_history_turns=get_setting("CONTEXT_MAX_HISTORY_TURNS", 10)
+                )
+            )
+            completion = {"model": "gpt-4o-mini", "max_tokens": 1000, "temperature": 0.7}
+
+            started = time.perf_counter()
+            if i < len(questions) * stream_share:
+                tokens = pipeline.stream(prepared, **completion)
+                next(tokens, None)
+                stage.record("stream_ttft", time.perf_counter() - started)
+                for _ in tokens:
+                    pass
+                stage.record("stream_total", time.perf_counter() - started)
+            else:
+                pipeline.generate(prepared, **completion)
+                stage.record("generate", time.perf_counter() - started)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(turn, range(len(questions))))
+        stage.count("turns", len(questions))
+    return stage.summary()
+
+
+def run_history(recorder, turns, chatbots, concurrency, batch_size) -> dict:
+    from src.database_manager import DatabaseManager, utcnow
+
+    db = DatabaseManager()
+    for name in chatbots:
+        db.create_chatbot(name, "You are a benchmark.")
+
+    with Stage("history", recorder) as stage:
+        def session(i):
+            name = chatbots[i % len(chatbots)]
+            stage.time("save", db.save_chat_message, name, f"question {i}", "answer " * 80)
+            stage.time("page", db.get_chat_history_page, name, limit=50)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(session, range(turns)))
+
+        # What the write-behind queue sends: one transaction per batch
+        for start in range(0, turns, batch_size):
+            batch = [{
+                "chatbot_name": chatbots[i % len(chatbots)],
+                "user": f"batched question {i}",
+                "assistant": "answer " * 80,
+                "created_at": utcnow()
+            } for i in range(start, min(start + batch_size, turns))]
+            stage.time("save_batch", db.save_chat_messages, batch)
+
+        stage.count("messages", turns * 2)
+    return stage.summary()
+
+
+def compare(results: dict, baseline_path: str):
+    with open(baseline_path, "r") as baseline_file:
+        baseline = json.load(baseline_file)
+
+    print(f"Compared with {baseline_path} (ratio of this run to baseline; > 1 is slower):")
+    for stage, result in results["stages"].items():
+        earlier = baseline.get("stages", {}).get(stage)
+        if not earlier:
+            continue
+        for operation, summary in result["operations"].items():
+            before = earlier["operations"].get(operation)
+            if before:
+                print(f"  {stage}.{operation:16s} p50 x{summary['p50'] / before['p50']:.2f}  "
+                      f"p95 x{summary['p95'] / before['p95']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default="ingestion,retrieval,chat,history")
+    parser.add_argument("--docs", type=int, default=40, help="documents to ingest")
+    parser.add_argument("--mb", type=float, default=4.0, help="total size of the documents")
+    parser.add_argument("--chatbots", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=40, help="chat turns")
+    parser.add_argument("--stream-share", type=float, default=0.5, help="share of chat turns that stream")
+    parser.add_argument("--messages", type=int, default=500, help="history saves")
+    parser.add_argument("--batch-size", type=int, default=50, help="messages per group commit")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--dim", type=int, default=1536, help="embedding dimensions")
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="defaults to benchmarks/results/suite-<timestamp>.json")
+    parser.add_argument("--baseline", help="earlier results to compare with")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    fake = FakeOpenAI(dim=args.dim, embedding_latency=args.embedding_latency, ttft=args.ttft,
+                      token_latency=args.token_latency).start()
+    configure_environment(workdir, fake)
+
+    # Size the corpus by document count as well as by megabytes
+    corpus = synthetic_corpus(args.mb, args.seed)
+    documents = [corpus[i % len(corpus)][:int(args.mb * 1024 * 1024 / args.docs)] for i in range(args.docs)]
+    words = " ".join(documents).split()
+    chatbots = [f"bench suite {i}" for i in range(args.chatbots)]
+
+    def questions(count):
+        return [" ".join(rng.choice(words) for _ in range(rng.randint(3, 10))) + "?" for _ in range(count)]
+
+    recorder = MetricsRecorder(window=max(args.docs, args.queries, args.turns, args.messages) * 2)
+    results = {
+        "parameters": vars(args),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "stages": {}
+    }
+    try:
+        if "ingestion" in stages or "retrieval" in stages or "chat" in stages:
+            # Retrieval and chat need an index to search
+            results["stages"]["ingestion"] = run_ingestion(recorder, documents, chatbots)
+        if "retrieval" in stages:
+            results["stages"]["retrieval"] = run_retrieval(recorder, questions(args.queries), chatbots, args.concurrency)
+        if "chat" in stages:
+            results["stages"]["chat"] = run_chat(recorder, questions(args.turns), chatbots, args.concurrency, args.stream_share)
+        if "history" in stages:
+            results["stages"]["history"] = run_history(recorder, args.messages, chatbots, args.concurrency, args.batch_size)
+    finally:
+        fake.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"suite-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"Saved {output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+    Compare the per-bot and multi-tenant Weaviate layouts at scale: cost of
+    creating and deleting a chatbot, and query latency with many chatbots
+    present. Needs a live cluster (WEAVIATE_URL / WEAVIATE_API_KEY); vectors
+    are random, so no OpenAI calls are made.
+
+    Run from the repository root:
+
+        python -m benchmarks.bench_weaviate_layout --bots 1000
+
+    Benchmark chatbots are named "bench <n>" and the shared collection is
+    "BenchChatbots"; everything created is deleted at the end.
+"""
+import argparse
+import json
+import os
+import random
+import time
+import uuid
+import numpy as np
+from src.utils.metrics import MetricsRecorder
+from src.weaviate_manager import WeaviateManager, MultiTenantWeaviateManager
+
+
+def _objects(bot: int, chunks: int, dim: int, rng: np.random.Generator):
+    objects = {
+        str(uuid.uuid4()): {
+            "content": f"bench chatbot {bot} chunk {i}",
+            "chunk_index": i,
+            "filename": "bench.txt",
+            "file_type": "text/plain"
+        }
+        for i in range(chunks)
+    }
+    return objects, list(rng.standard_normal((chunks, dim), dtype=np.float32))
+
+
+def run_layout(store, bots: int, chunks: int, queries: int, dim: int, seed: int) -> dict:
+    recorder = MetricsRecorder(window=max(bots, queries))
+    rng = np.random.default_rng(seed)
+    names = [f"bench {i}" for i in range(bots)]
+
+    for i, name in enumerate(names):
+        started = time.perf_counter()
+        store.create(name)
+        recorder.record("create", time.perf_counter() - started)
+
+        objects, vectors = _objects(i, chunks, dim, rng)
+        started = time.perf_counter()
+        store.upsert(name, objects, vectors)
+        recorder.record("upsert", time.perf_counter() - started)
+
+    for _ in range(queries):
+        name = random.choice(names)
+        vector = rng.standard_normal(dim, dtype=np.float32).tolist()
+        started = time.perf_counter()
+        store.query(name, vector, 8)
+        recorder.record("query", time.perf_counter() - started)
+
+    for name in names:
+        started = time.perf_counter()
+        store.delete(name)
+        recorder.record("delete", time.perf_counter() - started)
+
+    return {operation: recorder.summary(operation) for operation in ("create", "upsert", "query", "delete")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bots", type=int, default=1000)
+    parser.add_argument("--chunks", type=int, default=20, help="objects per chatbot")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--layout", choices=["per_bot", "multi_tenant", "both"], default="both")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "weaviate_layout.json"))
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    layouts = {
+        "per_bot": WeaviateManager,
+        "multi_tenant": lambda: MultiTenantWeaviateManager("BenchChatbots")
+    }
+    selected = list(layouts) if args.layout == "both" else [args.layout]
+
+    results = {"parameters": vars(args), "layouts": {}}
+    for layout in selected:
+        store = layouts[layout]()
+        print(f"{layout}: {args.bots} bots x {args.chunks} chunks, {args.queries} queries")
+        try:
+            results["layouts"][layout] = run_layout(store, args.bots, args.chunks, args.queries, args.dim, args.seed)
+        finally:
+            if layout == "multi_tenant" and store.client.collections.exists("BenchChatbots"):
+                store.client.collections.delete("BenchChatbots")
+
+        for operation, summary in results["layouts"][layout].items():
+            print(f"  {operation:7s} p50 {summary['p50'] * 1000:8.2f} ms  p95 {summary['p95'] * 1000:8.2f} ms  "
+                  f"p99 {summary['p99'] * 1000:8.2f} ms")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+    Local stand-in for the OpenAI API with configurable latency, for
+    benchmarks. It serves the two endpoints the app uses, through the real
+    SDK clients: point them at it with OPENAI_BASE_URL (the SDK reads it).
+
+    - POST /v1/embeddings: deterministic pseudo-random vectors per text, in
+      float or base64 encoding
+    - POST /v1/chat/completions: a canned answer, whole or streamed as SSE
+
+    Standalone:
+
+        python -m benchmarks.fake_openai --port 8765
+"""
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+_ANSWER = (
+    "Based on the knowledge base, the answer has three parts. First, the relevant "
+    "section describes the setup in detail. Second, it lists the constraints that "
+    "apply, with an example: \\(x^2 + y^2 = r^2\\). Finally, it notes the exceptions "
+    "and where to find more information."
+)
+
+
+class FakeOpenAI:
+    """
+        Threaded HTTP server faking the embeddings and chat completions APIs.
+
+        Args:
+            dim: Embedding dimensions
+            embedding_latency: Seconds per embeddings request
+            embedding_latency_per_text: Extra seconds per embedded text
+            ttft: Seconds before the first completion token
+            token_latency: Seconds between streamed tokens
+            answer_tokens: Length of the answer, in whitespace tokens
+    """
+
+    def __init__(self, port: int = 0, dim: int = 1536, embedding_latency: float = 0.05,
+                 embedding_latency_per_text: float = 0.0002, ttft: float = 0.3,
+                 token_latency: float = 0.01, answer_tokens: int = 120):
+        self.dim = dim
+        self.embedding_latency = embedding_latency
+        self.embedding_latency_per_text = embedding_latency_per_text
+        self.ttft = ttft
+        self.token_latency = token_latency
+        words = _ANSWER.split(" ")
+        self.answer = [words[i % len(words)] + " " for i in range(answer_tokens)]
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path.endswith("/embeddings"):
+                    self._json(fake.embeddings(body))
+                elif self.path.endswith("/chat/completions"):
+                    if body.get("stream"):
+                        self._stream(fake.completion_chunks(body))
+                    else:
+                        self._json(fake.completion(body))
+                else:
+                    self.send_error(404)
+
+            def _json(self, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, events):
+                # No length known up front; the closed connection ends the body
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for event in events:
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-openai", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self) -> "FakeOpenAI":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def vector(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+
+    def embeddings(self, body: dict) -> dict:
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        time.sleep(self.embedding_latency + self.embedding_latency_per_text * len(texts))
+
+        data = []
+        for i, text in enumerate(texts):
+            vector = self.vector(text)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        tokens = sum(len(text) // 4 + 1 for text in texts)
+        return {"object": "list", "data": data, "model": body.get("model"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    def _usage(self, body: dict) -> dict:
+        prompt = sum(len(str(message.get("content", ""))) // 4 for message in body.get("messages", []))
+        return {"prompt_tokens": prompt, "completion_tokens": len(self.answer), "total_tokens": prompt + len(self.answer)}
+
+    def completion(self, body: dict) -> dict:
+        time.sleep(self.ttft + self.token_latency * len(self.answer))
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "".join(self.answer).strip()}}],
+            "usage": self._usage(body)
+        }
+
+    def completion_chunks(self, body: dict):
+        time.sleep(self.ttft)
+        for i, token in enumerate(self.answer):
+            if i:
+                time.sleep(self.token_latency)
+            yield {
+                "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(port=args.port, dim=args.dim, ttft=args.ttft, token_latency=args.token_latency,
+                      embedding_latency=args.embedding_latency).start()
+    print(f"Fake OpenAI API on {fake.base_url}; set OPENAI_BASE_URL={fake.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
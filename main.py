@@ -1,7 +1,10 @@
 import streamlit as st
 import os
-from src.chatbot_manager import ChatbotManager
-from src.pages import show_home_page, show_chat_page, show_create_chatbot_page, show_edit_chatbot_page
+from src.chatbot_manager import get_chatbot_manager
+from src.ingestion_jobs import get_ingestion_worker
+from src.pages import show_home_page, show_chat_page, show_create_chatbot_page, show_edit_chatbot_page, show_metrics_panel
+from src.utils.metrics import get_metrics_logger
+from src.utils.settings import get_setting
 
 
 def set_page_config():
@@ -19,8 +22,14 @@ def set_page_config():
 set_page_config()
 
 # Initialize session state
-if 'chatbot_manager' not in st.session_state:
-    st.session_state.chatbot_manager = ChatbotManager()
+get_chatbot_manager()
+
+# Start (or resume) background ingestion jobs
+if st.session_state.chatbot_manager.db:
+    get_ingestion_worker()
+
+# Periodic metrics line in the server log
+get_metrics_logger()
 
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'home'
@@ -39,7 +48,7 @@ def handle_url_routing(query_params):
 
     if 'chatbot' in query_params:
         chatbot_name = query_params['chatbot']
-        if chatbot_name in st.session_state.chatbot_manager.chatbots:
+        if st.session_state.chatbot_manager.chatbot_exists(chatbot_name):
             st.session_state.current_page = 'chat'
             st.session_state.selected_chatbot = chatbot_name
         else:
@@ -77,6 +86,9 @@ def create_sidebar():
             st.query_params.clear()
             st.rerun()
 
+        if get_setting("SHOW_METRICS_PANEL", False):
+            show_metrics_panel()
+
 
 
 
@@ -0,0 +1,38 @@
+"""
+    Copy every chatbot's per-bot Weaviate collection into its tenant of the
+    shared multi-tenant collection.
+
+    Run from the repository root, with the usual WEAVIATE_* and DB settings:
+
+        python -m scripts.migrate_to_multi_tenant [--delete-source]
+
+    Then set WEAVIATE_LAYOUT=multi_tenant. Re-running is safe; without
+    --delete-source the old collections are left in place for rollback.
+"""
+import argparse
+from src.database_manager import DatabaseManager
+from src.utils.settings import get_setting
+from src.weaviate_manager import MultiTenantWeaviateManager, migrate_to_multi_tenant
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delete-source", action="store_true", help="drop each per-bot collection once copied")
+    args = parser.parse_args()
+
+    chatbot_names = DatabaseManager().get_all_chatbots()
+    target = MultiTenantWeaviateManager(get_setting("WEAVIATE_SHARED_COLLECTION", "Chatbots"))
+
+    migrated = migrate_to_multi_tenant(
+        chatbot_names,
+        target,
+        delete_source=args.delete_source,
+        progress=lambda name, copied: print(f"{name}: {copied} objects")
+    )
+
+    skipped = len(chatbot_names) - len(migrated)
+    print(f"Migrated {len(migrated)} chatbots ({sum(migrated.values())} objects), skipped {skipped} without a collection")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+import streamlit as st
+from .utils.settings import get_setting
+from .utils.metrics import increment_counter
+
+
+# Words that usually point back into the conversation ("what about it?")
+_CONTEXT_WORDS = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|their|he|she|him|her|his|"
+    r"above|previous|earlier|same|else|again|also|more|another|other)\b",
+    re.IGNORECASE
+)
+
+
+def is_context_dependent(question: str, history: List[Dict]) -> bool:
+    """
+        Whether a question probably relies on earlier turns, in which case
+        a stored answer to a similar-looking question may not apply.
+    """
+
+    if not history:
+        return False
+    if len(question.split()) < 4:
+        return True
+    return bool(_CONTEXT_WORDS.search(question))
+
+
+class _ChatbotAnswers:
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.answers: List[Dict] = []
+
+
+class AnswerCache:
+    """
+        Process-wide, per-chatbot cache of answers, matched by cosine
+        similarity between question embeddings.
+
+        Each chatbot's entries are tied to a fingerprint of its system
+        prompt and knowledge-base version; a lookup with a different
+        fingerprint drops them.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._chatbots: Dict[str, _ChatbotAnswers] = {}
+        self._lock = threading.Lock()
+
+    def _entries_for(self, chatbot_name: str, fingerprint: str) -> _ChatbotAnswers:
+        entries = self._chatbots.get(chatbot_name)
+        if entries is None or entries.fingerprint != fingerprint:
+            entries = _ChatbotAnswers(fingerprint)
+            self._chatbots[chatbot_name] = entries
+        return entries
+
+    def _expire(self, entries: _ChatbotAnswers):
+        now = time.time()
+        keep = [i for i, answer in enumerate(entries.answers) if now - answer["stored_at"] < self.ttl]
+        if len(keep) != len(entries.answers):
+            entries.answers = [entries.answers[i] for i in keep]
+            entries.vectors = entries.vectors[keep] if keep else np.empty((0, 0), dtype=np.float32)
+
+    def lookup(self, chatbot_name: str, fingerprint: str, vector: List[float]) -> Optional[str]:
+        """
+            Returns:
+                The stored answer of the most similar earlier question, or
+                None if none is similar enough
+        """
+
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        with self._lock:
+            entries = self._entries_for(chatbot_name, fingerprint)
+            self._expire(entries)
+            if not entries.answers:
+                increment_counter("answer_cache.misses")
+                return None
+
+            similarities = entries.vectors @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                increment_counter("answer_cache.misses")
+                return None
+
+            increment_counter("answer_cache.hits")
+            return entries.answers[best]["answer"]
+
+    def store(self, chatbot_name: str, fingerprint: str, question: str, vector: List[float], answer: str):
+        row = np.asarray(vector, dtype=np.float32)
+        row /= np.linalg.norm(row) or 1.0
+
+        with self._lock:
+            entries = self._entries_for(chatbot_name, fingerprint)
+            if entries.answers:
+                entries.vectors = np.vstack([entries.vectors, row])
+            else:
+                entries.vectors = row[np.newaxis, :]
+            entries.answers.append({"question": question, "answer": answer, "stored_at": time.time()})
+
+            # Oldest entries go first
+            overflow = len(entries.answers) - self.max_entries
+            if overflow > 0:
+                entries.answers = entries.answers[overflow:]
+                entries.vectors = entries.vectors[overflow:]
+
+    def invalidate(self, chatbot_name: str):
+        with self._lock:
+            self._chatbots.pop(chatbot_name, None)
+
+
+@st.cache_resource(show_spinner=False)
+def get_answer_cache() -> AnswerCache:
+    return AnswerCache(
+        threshold=get_setting("ANSWER_CACHE_SIMILARITY", 0.95),
+        max_entries=get_setting("ANSWER_CACHE_MAX_ENTRIES", 500),
+        ttl=get_setting("ANSWER_CACHE_TTL", 86400.0)
+    )
@@ -1,12 +1,22 @@
 import streamlit as st
-from openai import OpenAI
-from .chatbot_manager import ChatbotManager
-from .weaviate_manager import WeaviateManager
-from typing import Optional, Dict
-from .utils.get_base_path import get_base_path
-from .utils.render_response import render_response
-import os
+from .chatbot_manager import get_chatbot_manager
+from .context_assembler import ContextAssembler
+from .response_pipeline import get_response_pipeline
+from .answer_cache import get_answer_cache, is_context_dependent
+from .retrieval_cache import get_retrieval_cache
+from .utils.hashing import content_hash
+from concurrent.futures import Future
+from typing import Optional, Dict, Iterator
+from .session_memory import track_chat_history
+from .utils.render_response import render_response, trim_incomplete_latex
+from .utils.metrics import record_metric
+from .utils.settings import get_setting
 import re
+import time
+
+
+# Shown when generation returns nothing
+_NO_RESPONSE = "I apologize, but I couldn't generate a response."
 
 
 class ChatInterface:
@@ -20,28 +30,103 @@ class ChatInterface:
         """
 
         self.chatbot_data = chatbot_data
+        # Set by each generated turn; read before caching its answer
+        self.last_context_report = None
 
-        # Initialize OpenAI client
-        api_key = st.secrets["OPENAI_API_KEY"]
-        if not api_key:
-            st.error("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
+        # Shared async response pipeline (and its pooled OpenAI client)
+        try:
+            self.pipeline = get_response_pipeline()
+        except Exception as e:
+            st.error(str(e))
             return
-        
-        self.openai_client = OpenAI(api_key=api_key)
 
-        # Initialize chat history - will load from database if available
+        self.chatbot_manager = get_chatbot_manager()
+
+        # Initialize chat history - will load the latest page from database if available
         self.chat_key = f"chat_history_{self.chatbot_data['name']}"
-        if self.chat_key not in st.session_state:
+        self.cursor_key = f"{self.chat_key}_cursor"
+        self.window_key = f"{self.chat_key}_window"
+        self.pending_key = f"{self.chat_key}_pending"
+        self.expand_key = f"{self.chat_key}_expand_older"
+        if self.chat_key not in st.session_state and self.pending_key not in st.session_state:
             # Try to load from database first, then fallback to empty list
-            try:
-                manager = ChatbotManager()
-                if manager.db:
-                    history = manager.get_chat_history(self.chatbot_data['name'])
-                    st.session_state[self.chat_key] = history
-                else:
-                    st.session_state[self.chat_key] = []
-            except:
-                st.session_state[self.chat_key] = []
+            st.session_state[self.cursor_key] = None
+            if self.chatbot_manager.db:
+                # Loaded in the background; render() picks it up
+                st.session_state[self.pending_key] = self.pipeline.run_in_background(
+                    self.chatbot_manager.get_chat_history_page,
+                    self.chatbot_data['name'],
+                    get_setting("CHAT_HISTORY_PAGE_SIZE", 50)
+                )
+            else:
+                # The session fallback store; this history may have been evicted
+                page = self.chatbot_manager.get_chat_history_page(
+                    self.chatbot_data['name'], limit=get_setting("CHAT_HISTORY_PAGE_SIZE", 50)
+                )
+                st.session_state[self.chat_key] = page['messages']
+                st.session_state[self.cursor_key] = page['next_cursor']
+
+        if self.window_key not in st.session_state:
+            st.session_state[self.window_key] = get_setting("CHAT_RENDER_WINDOW", 20)
+
+
+    
+
+
+    def _resolve_history(self):
+        """
+            Wait for the background history load started in __init__, if
+            any. A load that fails or times out is dropped without storing
+            a history, so the next rerun starts a new one.
+        """
+
+        future = st.session_state.get(self.pending_key)
+        if future is None:
+            return
+
+        try:
+            with st.spinner("Loading chat history..."):
+                page = future.result(timeout=get_setting("PIPELINE_HISTORY_TIMEOUT", 5.0))
+            st.session_state[self.chat_key] = page['messages']
+            st.session_state[self.cursor_key] = page['next_cursor']
+        except Exception:
+            st.warning("Chat history could not be loaded yet; it will be retried.")
+        finally:
+            st.session_state.pop(self.pending_key, None)
+
+    def _append_turn(self, turn: Dict):
+        # Without a loaded history the turn is only persisted; the reload picks it up
+        if self.chat_key in st.session_state:
+            st.session_state[self.chat_key].append(turn)
+
+
+
+    def _show_earlier_messages(self):
+        """
+            Widen the rendered window, fetching the next older page from the
+            database once every loaded message is already visible.
+        """
+
+        history = st.session_state[self.chat_key]
+        page_size = get_setting("CHAT_HISTORY_PAGE_SIZE", 50)
+
+        if st.session_state[self.window_key] >= len(history) and st.session_state[self.cursor_key] is not None:
+            page = self.chatbot_manager.get_chat_history_page(
+                self.chatbot_data['name'],
+                limit=page_size,
+                before_id=st.session_state[self.cursor_key]
+            )
+            st.session_state[self.chat_key] = page['messages'] + history
+            st.session_state[self.cursor_key] = page['next_cursor']
+
+        st.session_state[self.window_key] += page_size
+
+    def _render_messages(self, messages):
+        for message in messages:
+            with st.chat_message("user"):
+                st.write(message["user"])
+            with st.chat_message("assistant"):
+                render_response(message["assistant"])
 
 
     
@@ -50,138 +135,300 @@ class ChatInterface:
     def render(self):
         """Render the chat interface."""
 
-        if not hasattr(self, 'openai_client'):
+        if not hasattr(self, 'pipeline'):
             st.error("OpenAI client not initialized. Please check your API key.")
             return
         
         chatbot_name = self.chatbot_data['name']
         chat_key = self.chat_key
 
+        # Pinned to the bottom of the page wherever it is called
+        prompt = st.chat_input("Type your message here...")
+
+        prepared = None
+        history_future = st.session_state.get(self.pending_key)
+        if prompt and history_future is not None and not self.chatbot_data.get('answer_cache_enabled', False):
+            # Start retrieval now; the history load finishes alongside it.
+            # The answer cache needs the history first, so it does not take this path
+            prepared = self.pipeline.submit(self._prepare_messages(chatbot_name, prompt, history=history_future))
+
+        self._resolve_history()
+        if self.chatbot_manager.db:
+            # Bounds how many bots' histories this session keeps loaded
+            track_chat_history(chat_key, [chat_key, self.cursor_key, self.window_key, self.pending_key, self.expand_key])
+        # Without a database the page shares its turns with the fallback store,
+        # so evicting it frees nothing; that store is capped as it is written
+
         # Chat controls
         col1, col2 = st.columns([7, 1])
         with col2:
             if st.button("🗑️ Clear Chat"):
                 st.session_state[chat_key] = []
+                st.session_state[self.cursor_key] = None
+                st.session_state.pop(self.pending_key, None)
                 st.rerun()
 
         # Display chat history
         chat_container = st.container()
 
         with chat_container:
+            # Only the latest window of messages is loaded, and of those only
+            # the most recent turns are drawn unless the rest is expanded
+            history = st.session_state.get(chat_key, [])
+            window = st.session_state[self.window_key]
+            visible = history[-window:]
+            split = max(0, len(visible) - get_setting("CHAT_RECENT_TURNS", 6))
+            older, latest = visible[:split], visible[split:]
+
+            if not older or st.toggle(f"Show {len(older)} earlier messages", key=self.expand_key):
+                if len(history) > window or st.session_state[self.cursor_key] is not None:
+                    st.button("⬆️ Show earlier messages", on_click=self._show_earlier_messages)
+                self._render_messages(older)
+
             # Show existing messages
-            for message in st.session_state[chat_key]:
-                with st.chat_message("user"):
-                    st.write(message["user"])
-                with st.chat_message("assistant"):
-                    render_response(message["assistant"])
-
-        # Chat input
-        if prompt := st.chat_input("Type your message here..."):
+            self._render_messages(latest)
+
+        if prompt:
             # Add user message to chat history
             with st.chat_message("user"):
                 st.write(prompt)
             
             # Generate response
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    try:
-                        response = self._generate_response(chatbot_name, prompt)
+                try:
+                    started = time.perf_counter()
+                    response = self._lookup_cached_answer(chatbot_name, prompt)
+                    if response is not None:
                         render_response(response)
+                        elapsed = time.perf_counter() - started
+                        timings = {"ttft": elapsed, "total": elapsed, "cached": True}
+                    elif get_setting("STREAM_RESPONSES", True):
+                        response, timings = self._render_streamed_response(chatbot_name, prompt, prepared)
+                        self._store_cached_answer(chatbot_name, prompt, response)
+                    else:
+                        with st.spinner("Thinking..."):
+                            started = time.perf_counter()
+                            response = self._generate_response(chatbot_name, prompt, prepared)
+                            elapsed = time.perf_counter() - started
+                            timings = {"ttft": elapsed, "total": elapsed}
+                        render_response(response)
+                        self._store_cached_answer(chatbot_name, prompt, response)
+
+                    record_metric("chat.ttft", timings["ttft"], chatbot=chatbot_name)
+                    record_metric("chat.generation_time", timings["total"], chatbot=chatbot_name)
+                    if get_setting("SHOW_RESPONSE_TIMINGS", False):
+                        st.caption(f"First token {timings['ttft']:.2f}s · total {timings['total']:.2f}s")
+
+                    # Add to chat history
+                    self._append_turn({
+                        "user": prompt,
+                        "assistant": response,
+                        "timings": timings
+                    })
 
-                        # Add to chat history
-                        st.session_state[chat_key].append({
-                            "user": prompt,
-                            "assistant": response
-                        })
-
-                        # Save to database if available
-                        try:
-                            manager = ChatbotManager()
-                            manager.update_chat_history(chatbot_name, prompt, response)
-                        except:
-                            pass  # Fallback to session state only
-
-                    except Exception as e:
-                        error_message = f"Sorry, I encountered an error: {str(e)}"
-                        st.error(error_message)
-                        
-                        # Add error to chat history
-                        st.session_state[chat_key].append({
-                            "user": prompt,
-                            "assistant": error_message
-                        })
+                    # Save to database if available
+                    try:
+                        self.chatbot_manager.update_chat_history(chatbot_name, prompt, response)
+                    except:
+                        pass  # Fallback to session state only
+
+                except Exception as e:
+                    error_message = f"Sorry, I encountered an error: {str(e)}"
+                    st.error(error_message)
+                    
+                    # Add error to chat history
+                    self._append_turn({
+                        "user": prompt,
+                        "assistant": error_message
+                    })
     
 
 
-    def _generate_response(self, chatbot_name: str, user_message: str) -> str:
+    def _answer_cache_fingerprint(self, chatbot_name: str) -> str:
+        # Changes whenever the system prompt or the indexed files change
+        kb_version = get_retrieval_cache().kb_version(chatbot_name)
+        return f"{content_hash(self.chatbot_data['system_prompt'])}:{kb_version}"
+
+    def _answer_cache_applies(self, user_message: str) -> bool:
+        return (
+            self.chatbot_data.get('answer_cache_enabled', False)
+            and not is_context_dependent(user_message, st.session_state.get(self.chat_key, []))
+        )
+
+    def _lookup_cached_answer(self, chatbot_name: str, user_message: str) -> Optional[str]:
         """
-        Generate a response using OpenAI API with the chatbot's configuration.
-        
-        Args:
-            user_message: User's input message
-            
-        Returns:
-            str: Generated response
+            Returns:
+                A stored answer to a near-identical earlier question, or None
+                when the cache is off, not applicable or has no match
         """
 
-        try:
-            # Prepare the system message with knowledge base context
-            system_message = self.chatbot_data['system_prompt']
+        if not self._answer_cache_applies(user_message):
+            return None
+
+        vector = self.chatbot_manager.vector_store.embed_query(user_message)
+        return get_answer_cache().lookup(chatbot_name, self._answer_cache_fingerprint(chatbot_name), vector)
+
+    def _store_cached_answer(self, chatbot_name: str, user_message: str, response: str):
+        if not self._answer_cache_applies(user_message):
+            return
+
+        # An answer built without its full context, or no answer, must not be replayed
+        report = self.last_context_report
+        if response == _NO_RESPONSE or report is None or report.get("degraded"):
+            return
+
+        # The embedding is already cached from retrieval
+        vector = self.chatbot_manager.vector_store.embed_query(user_message)
+        get_answer_cache().store(
+            chatbot_name, self._answer_cache_fingerprint(chatbot_name), user_message, vector, response
+        )
 
-            # prepare conversation history
-            messages = [
-                {"role": "system", "content": system_message}
-            ]
 
-            # Add recent chat history for context (last 10 exchanges)
-            recent_history = st.session_state.get(self.chat_key, [])[-10:]
+
+    def _render_streamed_response(self, chatbot_name: str, user_message: str, prepared: Optional[Future] = None):
+        """
+            Stream the response into the chat, re-rendering as tokens arrive.
             
-            for exchange in recent_history:
-                messages.append({"role": "user", "content": exchange["user"]})
-                messages.append({"role": "assistant", "content": exchange["assistant"]})
+            Args:
+                chatbot_name: Name of the chatbot
+                user_message: User's input message
+                prepared: The turn's prepare stage if already submitted
+                
+            Returns:
+                tuple: Full response text and a dict with time-to-first-token
+                ("ttft") and total generation time ("total") in seconds
+        """
 
-            weaviate_manager = WeaviateManager()
+        render_interval = get_setting("STREAM_RENDER_INTERVAL", 0.05)
+        placeholder = st.empty()
+        started = time.perf_counter()
+        ttft = None
+        parts = []
+        last_render = 0.0
 
-            # get top-k from knowledge base vector db (k=10)
-            raw = weaviate_manager.fetch_relevant_chunks(chatbot_name=chatbot_name, user_query=user_message)
+        with st.spinner("Thinking..."):
+            stream = self._stream_response(chatbot_name, user_message, prepared)
+            # Wait for the first token under the spinner
+            first = next(stream, None)
 
-            #re-filter chunks
-            filtered = [
-                item["content"] for item in raw
-            ]
+        if first is not None:
+            ttft = time.perf_counter() - started
+            parts.append(first)
 
-            # add this top-k and user query to a special prompt 
-            base_path = get_base_path()
-            file_path = os.path.join(base_path,"src","data","prompt.txt")
+        for delta in stream:
+            parts.append(delta)
+            now = time.perf_counter()
+            # Throttle re-renders; each one redraws the whole message
+            if now - last_render >= render_interval:
+                with placeholder.container():
+                    render_response(trim_incomplete_latex("".join(parts)), memoize=False)
+                last_render = now
 
-            with open(file_path,"r") as prompt_file:
-                prompt = prompt_file.read()
+        total = time.perf_counter() - started
+        response = "".join(parts) or _NO_RESPONSE
 
-            formatted_chunks = "\n\n".join(
-                [f"{i+1}. {chunk}" for i, chunk in enumerate(filtered)]
-            )
+        with placeholder.container():
+            render_response(response)
 
-            final_prompt = (
-                prompt
-                .replace("{{user_query}}", user_message)
-                .replace("{{relevant_chunks}}",formatted_chunks)
-            )
+        return response, {"ttft": ttft if ttft is not None else total, "total": total}
+
+
+
+    def _prepare_messages(self, chatbot_name: str, user_message: str, history=None):
+        """
+        Build the pipeline stage that produces the message list sent to
+        OpenAI: system prompt, recent history and the user query wrapped in
+        the retrieval prompt, all within the CONTEXT_TOKEN_BUDGET
+        input-token budget. Retrieval and template loading run concurrently.
+        
+        Args:
+            chatbot_name: Name of the chatbot
+            user_message: User's input message
+            history: Future of a history load still running; defaults
+                to the loaded history
+            
+        Returns:
+            Coroutine resolving to the messages and the context report
+        """
 
+        vector_store = self.chatbot_manager.vector_store
 
-            # Add current user message
-            messages.append({"role": "user", "content": final_prompt})
+        assembler = ContextAssembler(
+            token_budget=get_setting("CONTEXT_TOKEN_BUDGET", 6000),
+            max_history_turns=get_setting("CONTEXT_MAX_HISTORY_TURNS", 10)
+        )
+
+        return self.pipeline.prepare(
+            chatbot_name,
+            self.chatbot_data['system_prompt'],
+            user_message,
+            # Recent chat history for context, trimmed to the token budget
+            history=history if history is not None else st.session_state.get(self.chat_key, []),
+            # get top-k from knowledge base vector db, best first
+            retrieve=lambda: vector_store.fetch_relevant_chunks(chatbot_name=chatbot_name, user_query=user_message),
+            assembler=assembler
+        )
+
+    def _record_context_report(self, chatbot_name: str, report: Dict):
+        self.last_context_report = report
+        record_metric("chat.prompt_tokens", report["total_tokens"], chatbot=chatbot_name)
+        record_metric("chat.chunks_dropped", report["chunks_dropped"], chatbot=chatbot_name)
+        record_metric("chat.turns_dropped", report["turns_dropped"], chatbot=chatbot_name)
+
+
+
+    def _generate_response(self, chatbot_name: str, user_message: str, prepared: Optional[Future] = None) -> str:
+        """
+        Generate a response using OpenAI API with the chatbot's configuration.
+        
+        Args:
+            user_message: User's input message
+            prepared: The turn's prepare stage if already submitted
+            
+        Returns:
+            str: Generated response
+        """
 
+        try:
             # Generate response using OpenAI
             # the newest OpenAI model is "gpt-4o-mini" which was released May 13, 2024.
             # do not change this unless explicitly requested by the user
-            response = self.openai_client.chat.completions.create(
+            response, report = self.pipeline.generate(
+                prepared or self._prepare_messages(chatbot_name, user_message),
                 model="gpt-4o-mini",
-                messages=messages,
                 max_tokens=1000,
                 temperature=0.7
             )
+            self._record_context_report(chatbot_name, report)
+
+            return response or _NO_RESPONSE
+
+        except Exception as e:
+            raise Exception(f"Failed to generate response: {str(e)}")
+
 
-            return response.choices[0].message.content or "I apologize, but I couldn't generate a response."
+
+    def _stream_response(self, chatbot_name: str, user_message: str, prepared: Optional[Future] = None) -> Iterator[str]:
+        """
+        Stream a response from the OpenAI API.
+        
+        Args:
+            chatbot_name: Name of the chatbot
+            user_message: User's input message
+            prepared: The turn's prepare stage if already submitted
+            
+        Yields:
+            str: Text deltas as they arrive
+        """
+
+        try:
+            yield from self.pipeline.stream(
+                prepared or self._prepare_messages(chatbot_name, user_message),
+                on_report=lambda report: self._record_context_report(chatbot_name, report),
+                model="gpt-4o-mini",
+                max_tokens=1000,
+                temperature=0.7
+            )
 
         except Exception as e:
-            raise Exception(f"Failed to generate response: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to generate response: {str(e)}")
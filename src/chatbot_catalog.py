@@ -0,0 +1,56 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import streamlit as st
+from .utils.settings import get_setting
+
+
+class ChatbotCatalog:
+    """
+        Process-wide cache of chatbot summaries.
+
+        The catalog is loaded with a single query and shared by every
+        session. Writes through ChatbotManager invalidate it; the TTL only
+        bounds staleness for changes made by other server processes.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._summaries: Optional[Dict[str, Dict]] = None
+        self._loaded_at = 0.0
+        # Bumped by invalidate(); a load that started before a bump is stale
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, loader: Callable[[], List[Dict]]) -> Dict[str, Dict]:
+        """
+            Args:
+                loader: Returns the list of summaries when the cache is cold
+
+            Returns:
+                Dict: Summaries keyed by chatbot name, in creation order
+        """
+
+        with self._lock:
+            if self._summaries is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._summaries
+            generation = self._generation
+
+        summaries = {summary['name']: summary for summary in loader()}
+
+        with self._lock:
+            # Still returned to this caller, but not kept if a write raced the load
+            if self._generation == generation:
+                self._summaries = summaries
+                self._loaded_at = time.monotonic()
+        return summaries
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._summaries = None
+
+
+@st.cache_resource(show_spinner=False)
+def get_chatbot_catalog() -> ChatbotCatalog:
+    return ChatbotCatalog(ttl=get_setting("CATALOG_CACHE_TTL", 60.0))
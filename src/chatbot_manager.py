@@ -1,42 +1,82 @@
 from .database_manager import DatabaseManager
 from .file_processor import FileProcessor
-from .utils.generate_chunks import chunk_with_recursive_splitter
-from.weaviate_manager import WeaviateManager
+from .ingestion_pipeline import ingest_files, build_file_chunks
+from .ingestion_jobs import queue_ingestion
+from .utils.hashing import content_hash
+from .vector_store import get_vector_store
+from .chatbot_catalog import get_chatbot_catalog
+from .answer_cache import get_answer_cache
+from .kb_content_store import get_kb_content_store
+from .message_writer import get_message_writer
+from .session_memory import append_fallback_turn, forget_fallback_history
+from .utils.settings import get_setting
 import streamlit as st
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 
 
 
+def _warn_on_failure(index: int, filename: str, status: str, detail: Optional[str] = None):
+    if status == "failed":
+        st.warning(f"Could not process file {filename}: {detail}")
+
+
 class ChatbotManager:
     def __init__(self):
         self.file_processor = FileProcessor()
-        self.weaviate_manager = WeaviateManager()
+        self.vector_store = get_vector_store()
         try:
             self.db = DatabaseManager()
+            self.message_writer = get_message_writer() if get_setting("CHAT_WRITE_BEHIND", True) else None
         except Exception as e:
             st.error(f"Database Connection failed : {str(e)}")
             # Fallback to session state if database fails
             if 'chatbots' not in st.session_state:
                 st.session_state.chatbots = {}
             self.db = None
+            self.message_writer = None
 
     @property
     def chatbots(self) -> Dict :
-        """Get all chatbots as a dictionary."""
+        """Get summaries of all chatbots as a dictionary keyed by name."""
+        return {summary['name']: summary for summary in self.get_chatbot_summaries()}
+
+    def get_chatbot_summaries(self) -> List[Dict]:
+        """
+        Get a summary of every chatbot: name, prompt preview, file count
+        and timestamps. Backed by the shared catalog cache, so repeated
+        calls across reruns and sessions do not hit the database.
+        
+        Returns:
+            List[Dict]: Chatbot summaries in creation order
+        """
+        if self.db:
+            return list(get_chatbot_catalog().get(self.db.get_chatbot_summaries).values())
+        else:
+            return [{
+                'name': name,
+                'prompt_preview': data['system_prompt'][:100],
+                'file_count': len(data.get('knowledge_base', [])),
+                'created_at': data.get('created_at'),
+                'updated_at': data.get('updated_at')
+            } for name, data in st.session_state.chatbots.items()]
+
+    def chatbot_exists(self, name: str) -> bool:
+        """
+        Check whether a chatbot exists without loading it.
+        
+        Args:
+            name: Name of the chatbot
+            
+        Returns:
+            bool: True if an active chatbot has this name
+        """
         if self.db:
-            # Convert database chatbots to dict format for compatibility
-            chatbot_names = self.db.get_all_chatbots()
-            chatbots_dict = {}
-            for name in chatbot_names:
-                chatbot_data = self.db.get_chatbot(name)
-                if chatbot_data:
-                    chatbots_dict[name] = chatbot_data
-            return chatbots_dict
+            return name in get_chatbot_catalog().get(self.db.get_chatbot_summaries)
         else:
-            return st.session_state.chatbots
+            return name in st.session_state.chatbots
 
-    def create_chatbot(self, name: str, system_prompt: str, uploaded_files: List = None) -> bool:
+    def create_chatbot(self, name: str, system_prompt: str, uploaded_files: List = None, answer_cache_enabled: bool = False, progress: Callable = None) -> bool:
         """
             Create a new chatbot with the given parameters.
             
@@ -44,6 +84,8 @@ class ChatbotManager:
                 name: Unique name for the chatbot
                 system_prompt: System prompt to guide chatbot behavior
                 uploaded_files: List of uploaded files for knowledge base
+                answer_cache_enabled: Reuse answers to similar earlier questions
+                progress: Per-file progress callback, see ingest_files (optional)
                 
             Returns:
                 bool: True if chatbot was created successfully, False otherwise
@@ -51,45 +93,30 @@ class ChatbotManager:
         try:
             # Process uploaded files for knowledge base
             knowledge_base = []
-            knowledge_base_chunks = []
             if uploaded_files:
-                for uploaded_file in uploaded_files:
-                    try:
-                        processed_content = self.file_processor.process_file(uploaded_file)
-                        knowledge_base.append({
-                            'filename': uploaded_file.name,
-                            'content': processed_content,
-                            'type': uploaded_file.type
-                        })
-                        file_chunks = chunk_with_recursive_splitter(processed_content)
-                        
-                        for i,chunk in enumerate(file_chunks):
-                            knowledge_base_chunks.append({
-                                "filename": uploaded_file.name,
-                                "chunk_index": i,
-                                "content": chunk,
-                                "type": uploaded_file.type
-                            })
+                # Create embeddings and push to the vector store, file by file as
+                # soon as each one is parsed and chunked
                 
-
-                    except Exception as e:
-                        st.warning(f"Could not process file {uploaded_file.name}: {str(e)}")
-
-                # Create embeddings and push to weaviate
-                
-                self.weaviate_manager.create_weaviate_class(chatbot_name = name)
-                self.weaviate_manager.push_chunks_to_weaviate(chatbot_name=name, chunks=knowledge_base_chunks)
+                self.vector_store.create(chatbot_name = name)
+                knowledge_base, _ = ingest_files(
+                    uploaded_files,
+                    on_chunks=lambda batches: self.vector_store.push_chunk_batches(name, batches),
+                    progress=progress or _warn_on_failure
+                )
 
 
             if self.db:
                 # Store in database
-                return self.db.create_chatbot(name, system_prompt, knowledge_base)
+                created = self.db.create_chatbot(name, system_prompt, knowledge_base, answer_cache_enabled)
+                get_chatbot_catalog().invalidate()
+                return created
             else:
-                # Fallback to session state
+                # Fallback to session state; file contents are kept on disk
                 chatbot_data = {
                     'name': name,
                     'system_prompt': system_prompt,
-                    'knowledge_base': knowledge_base,
+                    'knowledge_base': get_kb_content_store().strip_content(knowledge_base),
+                    'answer_cache_enabled': answer_cache_enabled,
                     'chat_history': []
                 }
                 st.session_state.chatbots[name] = chatbot_data
@@ -100,6 +127,61 @@ class ChatbotManager:
             st.error(f"Error creating chatbot: {str(e)}")
             return False
         
+    def process_uploaded_files(self, uploaded_files: List, progress: Callable = None) -> Tuple[List[Dict], Dict[Tuple[str, str], List[Dict]]]:
+        """
+        Parse and chunk uploaded files in parallel without indexing them.
+        
+        Args:
+            uploaded_files: List of uploaded files
+            progress: Per-file progress callback, see ingest_files (optional)
+            
+        Returns:
+            tuple: Knowledge base entries, and each file's chunks by
+            (filename, content_hash)
+        """
+
+        return ingest_files(uploaded_files, progress=progress or _warn_on_failure)
+
+    def queue_ingestion(self, name: str, uploaded_files: List, retained_files: List[Dict] = None,
+                        system_prompt: Optional[str] = None, answer_cache_enabled: bool = False) -> Optional[int]:
+        """
+        Index uploaded files into a chatbot in the background.
+        
+        Args:
+            name: Name of the chatbot
+            uploaded_files: List of uploaded files to add
+            retained_files: Metadata of the existing files to keep; files
+                left out are removed when the job finishes (optional)
+            system_prompt: Create the chatbot with this prompt, atomically
+                with its job, so a failure leaves no empty chatbot (optional)
+            answer_cache_enabled: Answer cache setting of the created chatbot
+            
+        Returns:
+            int: The ingestion job ID, or None without a database (jobs are
+            stored there)
+        """
+        if not self.db:
+            return None
+        new_chatbot = None
+        if system_prompt is not None:
+            new_chatbot = {'system_prompt': system_prompt, 'answer_cache_enabled': answer_cache_enabled}
+        job_id = queue_ingestion(self.db, name, uploaded_files, retained_files, new_chatbot)
+        if new_chatbot is not None:
+            get_chatbot_catalog().invalidate()
+        return job_id
+
+    def get_ingestion_job(self, job_id: int) -> Optional[Dict]:
+        """Get an ingestion job with the status of each of its files."""
+        return self.db.get_ingestion_job(job_id) if self.db else None
+
+    def get_latest_ingestion_job(self, name: str) -> Optional[Dict]:
+        """Get the most recent ingestion job of a chatbot."""
+        return self.db.get_latest_ingestion_job(name) if self.db else None
+
+    def cancel_ingestion(self, job_id: int) -> bool:
+        """Ask the worker to stop a job; finished files are rolled back."""
+        return self.db.request_ingestion_cancel(job_id) if self.db else False
+
     def get_chatbot(self, name: str) -> Optional[Dict]:
         """
         Get chatbot data by name.
@@ -123,11 +205,11 @@ class ChatbotManager:
             List[str]: List of chatbot names
         """
         if self.db:
-            return self.db.get_all_chatbots()
+            return list(get_chatbot_catalog().get(self.db.get_chatbot_summaries))
         else:
             return list(st.session_state.chatbots.keys())
         
-    def update_chatbot(self, name :str, system_prompt :str = None, knowledge_base :List = None) -> bool:
+    def update_chatbot(self, name :str, system_prompt :str = None, knowledge_base :List = None, answer_cache_enabled :bool = None, precomputed_chunks :Dict = None) -> bool:
         """
         Update an existing chatbot.
         
@@ -135,43 +217,100 @@ class ChatbotManager:
             name: Name of the chatbot to update
             system_prompt: New system prompt (optional)
             knowledge_base: New knowledge base (optional)
+            answer_cache_enabled: Turn the answer cache on or off (optional)
+            precomputed_chunks: Chunks of new files by (filename, content_hash), as returned
+                by process_uploaded_files (optional)
             
         Returns:
             bool: True if updated successfully, False otherwise
         """
 
         try:
-
-            # Update knowledge base in weavaite
-            updated_knowledge_base_chunks = []
-            for file in knowledge_base:
-                file_chunks = chunk_with_recursive_splitter(file["content"])
-
-                for i,chunk in enumerate(file_chunks):
-                    updated_knowledge_base_chunks.append({
-                        "filename": file["filename"],
-                        "chunk_index": i,
-                        "content": chunk,
-                        "type": file["type"]
-                    })
-                
-            self.weaviate_manager.update_knowledge_base(name, updated_knowledge_base_chunks)
-            
-
-            if self.db:
-                return self.db.update_chatbot(name, system_prompt, knowledge_base)
-            else:
-                if name in st.session_state.chatbots:
-                    if system_prompt is not None:
-                        st.session_state.chatbots[name]['system_prompt'] = system_prompt
-                    if knowledge_base is not None:
-                        st.session_state.chatbots[name]['knowledge_base'] = knowledge_base
-                    return True
-                return False
+            return self.apply_update(name, system_prompt, knowledge_base, answer_cache_enabled, precomputed_chunks)
         except Exception as e:
             st.error(f"Error updating chatbot: {str(e)}")
             return False
-        
+
+    def apply_update(self, name :str, system_prompt :str = None, knowledge_base :List = None, answer_cache_enabled :bool = None, precomputed_chunks :Dict = None) -> bool:
+        """
+        Same as update_chatbot, but raises on failure instead of reporting
+        it in the page. Used by the background ingestion worker.
+        """
+
+        if knowledge_base is not None:
+            self._reindex_knowledge_base(name, knowledge_base, precomputed_chunks)
+
+        # Stored answers may no longer match the new prompt or files
+        get_answer_cache().invalidate(name)
+
+        if self.db:
+            updated = self.db.update_chatbot(name, system_prompt, knowledge_base, answer_cache_enabled)
+            get_chatbot_catalog().invalidate()
+            return updated
+        else:
+            if name in st.session_state.chatbots:
+                if system_prompt is not None:
+                    st.session_state.chatbots[name]['system_prompt'] = system_prompt
+                if knowledge_base is not None:
+                    st.session_state.chatbots[name]['knowledge_base'] = get_kb_content_store().strip_content(knowledge_base)
+                if answer_cache_enabled is not None:
+                    st.session_state.chatbots[name]['answer_cache_enabled'] = answer_cache_enabled
+                return True
+            return False
+
+    def _reindex_knowledge_base(self, name: str, knowledge_base: List, precomputed_chunks: Dict = None):
+        """Update the vector store, re-chunking only files whose content is not already indexed."""
+
+        indexed_files = self.vector_store.get_indexed_files(name)
+
+        def is_indexed(file):
+            indexed = indexed_files.get(file["filename"])
+            if indexed is None or indexed["file_hash"] != file.get("content_hash"):
+                return False
+            # An interrupted push leaves a file with only some of its chunks
+            return not file.get("chunk_count") or indexed["chunks"] == file["chunk_count"]
+
+        retained_files = []
+        updated_knowledge_base_chunks = []
+
+        # Retained files arrive as metadata only; fetch the stored text
+        # just for those that still need indexing
+        missing_content = [
+            file["filename"] for file in knowledge_base
+            if "content" not in file and not is_indexed(file)
+        ]
+        stored_content = {}
+        if missing_content and self.db:
+            stored_content = {
+                stored["filename"]: stored["content"]
+                for stored in self.db.get_knowledge_base_files(name, include_content=True, filenames=missing_content)
+            }
+        elif missing_content:
+            stored_content = {
+                file["filename"]: get_kb_content_store().get(file["content_hash"])
+                for file in knowledge_base
+                if file["filename"] in missing_content and file.get("content_hash")
+            }
+
+        for file in knowledge_base:
+            content = file.get("content", stored_content.get(file["filename"]))
+            if not file.get("content_hash"):
+                file["content_hash"] = content_hash(content)
+
+            if is_indexed(file):
+                retained_files.append(file["filename"])
+                continue
+
+            file_chunks = (precomputed_chunks or {}).get((file["filename"], file["content_hash"]))
+            if not file_chunks:
+                file_chunks = build_file_chunks({**file, "content": content})
+            file["chunk_count"] = len(file_chunks)
+            updated_knowledge_base_chunks.extend(file_chunks)
+
+        self.vector_store.update_knowledge_base(
+            name, updated_knowledge_base_chunks, retained_files=retained_files
+        )
+
     def clear_chat_history(self, chatbot_name: str):
         """
         Clear chat history for a specific chatbot.
@@ -180,10 +319,13 @@ class ChatbotManager:
             chatbot_name: Name of the chatbot
         """
         if self.db:
+            if self.message_writer:
+                self.message_writer.discard(chatbot_name)
             self.db.clear_chat_history(chatbot_name)
         else:
             if chatbot_name in st.session_state.chatbots:
                 st.session_state.chatbots[chatbot_name]['chat_history'] = []
+                forget_fallback_history(chatbot_name)
 
     def get_chat_history(self, chatbot_name: str) -> List[Dict]:
         """
@@ -197,12 +339,47 @@ class ChatbotManager:
         """
 
         if self.db:
-            return self.db.get_chat_history(chatbot_name)
+            if not self.message_writer:
+                return self.db.get_chat_history(chatbot_name)
+            stored, pending = self.message_writer.read_through(
+                chatbot_name, lambda: self.db.get_chat_history(chatbot_name)
+            )
+            return stored + pending
         else:
             if chatbot_name in st.session_state.chatbots:
                 return st.session_state.chatbots[chatbot_name].get('chat_history', [])
             return []
         
+    def get_chat_history_page(self, chatbot_name: str, limit: int = 50, before_id: Optional[int] = None) -> Dict:
+        """
+        Get one page of chat history, newest page first.
+        
+        Args:
+            chatbot_name: Name of the chatbot
+            limit: Maximum number of messages in the page
+            before_id: Cursor returned with the previous page (optional)
+            
+        Returns:
+            Dict: 'messages' (oldest first) and 'next_cursor' for older messages
+        """
+
+        if self.db:
+            if not self.message_writer or before_id is not None:
+                return self.db.get_chat_history_page(chatbot_name, limit=limit, before_id=before_id)
+            # Queued messages are the newest, so they only belong on the latest page
+            page, pending = self.message_writer.read_through(
+                chatbot_name, lambda: self.db.get_chat_history_page(chatbot_name, limit=limit)
+            )
+            return {'messages': page['messages'] + pending, 'next_cursor': page['next_cursor']}
+        else:
+            history = self.get_chat_history(chatbot_name)
+            end = len(history) if before_id is None else before_id
+            start = max(0, end - limit)
+            return {
+                'messages': history[start:end],
+                'next_cursor': start if start > 0 else None
+            }
+        
     def update_chat_history(self, chatbot_name: str, user_message: str, bot_response: str):
         """
         Update chat history for a specific chatbot.
@@ -214,16 +391,17 @@ class ChatbotManager:
         """
 
         if self.db:
-            self.db.save_chat_message(chatbot_name, user_message, bot_response)
+            if self.message_writer:
+                # Written in the background with other turns; see ChatMessageWriter
+                self.message_writer.enqueue(chatbot_name, user_message, bot_response)
+            else:
+                self.db.save_chat_message(chatbot_name, user_message, bot_response)
         else:
-            # Fallback to session state
+            # Fallback to session state, capped; see append_fallback_turn
             if chatbot_name in st.session_state.chatbots:
-                if 'chat_history' not in st.session_state.chatbots[chatbot_name]:
-                    st.session_state.chatbots[chatbot_name]['chat_history'] = []
-                
-                st.session_state.chatbots[chatbot_name]['chat_history'].append({
+                append_fallback_turn(chatbot_name, {
                     'user': user_message,
-                    'bot': bot_response
+                    'assistant': bot_response
                 })
 
     def delete_chatbot(self, name: str) -> bool:
@@ -239,15 +417,34 @@ class ChatbotManager:
 
         try:
             # delete from weavaite
-            self.weaviate_manager.delete_chatbot(chatbot_name=name)
+            self.vector_store.delete_chatbot(chatbot_name=name)
+            get_answer_cache().invalidate(name)
 
             if self.db:
-                return self.db.delete_chatbot(name)
+                if self.message_writer:
+                    self.message_writer.discard(name)
+                deleted = self.db.delete_chatbot(name)
+                get_chatbot_catalog().invalidate()
+                return deleted
             else:
                 if name in st.session_state.chatbots:
                     del st.session_state.chatbots[name]
+                    forget_fallback_history(name)
                     return True
                 return False
         except Exception as e:
             st.error(f"Error deleting chatbot: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+
+def get_chatbot_manager() -> ChatbotManager:
+    """
+        Returns:
+            The session's ChatbotManager, created on first use. The
+            underlying DB engine and vector store are process-wide,
+            so this only builds the lightweight manager objects.
+    """
+
+    if 'chatbot_manager' not in st.session_state:
+        st.session_state.chatbot_manager = ChatbotManager()
+    return st.session_state.chatbot_manager
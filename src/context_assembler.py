@@ -0,0 +1,123 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from .utils.tokens import count_tokens, MESSAGE_OVERHEAD_TOKENS
+
+
+@lru_cache(maxsize=2048)
+def _text_tokens(text: str) -> int:
+    # Keyed by content, so a history turn is tokenized once across reruns
+    # without annotating dicts shared with the session and the caches
+    return count_tokens(text)
+
+
+class ContextAssembler:
+    """
+        Builds the chat completion messages within a fixed input-token budget.
+
+        The system prompt and the templated user query are always sent.
+        Retrieved chunks (best first) may use up to chunk_share of what is
+        left, then recent history (newest first) fills the rest, and any
+        unused space goes back to the remaining chunks.
+    """
+
+    def __init__(self, token_budget: int = 6000, max_history_turns: int = 10, chunk_share: float = 0.6):
+        self.token_budget = token_budget
+        self.max_history_turns = max_history_turns
+        self.chunk_share = chunk_share
+
+    def _turn_tokens(self, exchange: Dict) -> int:
+        return _text_tokens(exchange["user"]) + _text_tokens(exchange["assistant"]) + 2 * MESSAGE_OVERHEAD_TOKENS
+
+    def _chunk_tokens(self, chunk: Dict) -> int:
+        # Precomputed at ingestion; older objects and merged passages are counted here
+        token_count = chunk.get("token_count")
+        if token_count is None:
+            token_count = _text_tokens(chunk["content"])
+        # Numbering prefix and blank-line separator
+        return token_count + 4
+
+    def assemble(self, system_prompt: str, history: List[Dict], chunks: List[Dict], user_query: str, template: str) -> Tuple[List[Dict], Dict]:
+        """
+            Args:
+                system_prompt: The chatbot's system prompt
+                history: Previous exchanges, oldest first, with "user" and
+                    "assistant" keys
+                chunks: Retrieved chunks, best first, with "content" and
+                    optionally a precomputed "token_count"
+                user_query: The current question
+                template: Prompt template with {{user_query}} and
+                    {{relevant_chunks}} placeholders
+
+            Returns:
+                tuple: The messages to send, and a report of the token usage
+                and of the turns and chunks that were dropped
+        """
+
+        fixed_tokens = (
+            count_tokens(system_prompt) + count_tokens(template) + count_tokens(user_query)
+            + 2 * MESSAGE_OVERHEAD_TOKENS
+        )
+        available = max(0, self.token_budget - fixed_tokens)
+
+        candidate_turns = history[-self.max_history_turns:] if self.max_history_turns > 0 else []
+
+        # Chunks first, up to their share of the budget
+        chunk_limit = int(available * self.chunk_share)
+        selected_chunks = []
+        chunk_tokens = 0
+        position = 0
+        while position < len(chunks):
+            cost = self._chunk_tokens(chunks[position])
+            if chunk_tokens + cost > chunk_limit:
+                break
+            selected_chunks.append(chunks[position])
+            chunk_tokens += cost
+            position += 1
+
+        # Then the most recent turns with whatever is left
+        selected_turns = []
+        history_tokens = 0
+        for exchange in reversed(candidate_turns):
+            cost = self._turn_tokens(exchange)
+            if chunk_tokens + history_tokens + cost > available:
+                break
+            selected_turns.insert(0, exchange)
+            history_tokens += cost
+
+        # Unused history space goes back to the next best chunks
+        while position < len(chunks):
+            cost = self._chunk_tokens(chunks[position])
+            if chunk_tokens + history_tokens + cost > available:
+                break
+            selected_chunks.append(chunks[position])
+            chunk_tokens += cost
+            position += 1
+
+        messages = [{"role": "system", "content": system_prompt}]
+        for exchange in selected_turns:
+            messages.append({"role": "user", "content": exchange["user"]})
+            messages.append({"role": "assistant", "content": exchange["assistant"]})
+
+        formatted_chunks = "\n\n".join(
+            [f"{i+1}. {chunk['content']}" for i, chunk in enumerate(selected_chunks)]
+        )
+        final_prompt = (
+            template
+            .replace("{{user_query}}", user_query)
+            .replace("{{relevant_chunks}}", formatted_chunks)
+        )
+        messages.append({"role": "user", "content": final_prompt})
+
+        report = {
+            "token_budget": self.token_budget,
+            "total_tokens": fixed_tokens + chunk_tokens + history_tokens,
+            "fixed_tokens": fixed_tokens,
+            "history_tokens": history_tokens,
+            "chunk_tokens": chunk_tokens,
+            "turns_included": len(selected_turns),
+            "turns_dropped": len(history) - len(selected_turns),
+            "chunks_included": len(selected_chunks),
+            "chunks_dropped": len(chunks) - len(selected_chunks)
+        }
+
+        return messages, report
@@ -1,25 +1,50 @@
-from datetime import datetime,timezone
-from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, DateTime
+from contextlib import contextmanager
+from datetime import datetime,timezone,timedelta
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index, func, inspect, or_, text
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
-import streamlit as st
+from sqlalchemy.orm import sessionmaker, deferred
 from typing import List, Dict, Optional
 import json
+from .resource_manager import get_db_engine
+from .utils.hashing import content_hash
 
 
 Base = declarative_base()
 
+
+def utcnow() -> datetime:
+    """
+        The current time as naive UTC, the convention of every DateTime
+        column here; aware values would not compare reliably with them.
+    """
+
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class Chatbot(Base):
     __tablename__ = 'chatbots'
     
     id = Column(Integer, primary_key=True)
     name = Column(String(255),unique=True, nullable=False)
     system_prompt = Column(Text, nullable=False)
-    knowledge_base = Column(Text)  # JSON string of knowledge base files
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=datetime.now(timezone.utc), onupdate=datetime.now(timezone.utc))
+    knowledge_base = Column(Text)  # Legacy JSON blob, migrated to knowledge_base_files
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     is_active = Column(Boolean, default=True)
+    answer_cache_enabled = Column(Boolean, default=False, nullable=False)
+
+class KnowledgeBaseFile(Base):
+    __tablename__ = 'knowledge_base_files'
+
+    id = Column(Integer, primary_key=True)
+    chatbot_id = Column(Integer, ForeignKey('chatbots.id', ondelete='CASCADE'), nullable=False, index=True)
+    filename = Column(String(1024), nullable=False)
+    file_type = Column(String(255))
+    size = Column(Integer, default=0)  # Characters of extracted text
+    content_hash = Column(String(64))
+    chunk_count = Column(Integer, default=0)
+    content = deferred(Column(Text))  # Only loaded by the edit/re-index paths
+    created_at = Column(DateTime, default=utcnow)
 
 class ChatMessage(Base):
     __tablename__ = 'chat_messages'
@@ -28,188 +53,697 @@ class ChatMessage(Base):
     chatbot_name = Column(String(255), nullable=False)
     user_message = Column(Text, nullable=False)
     bot_response = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=utcnow)
+
+    # Keyset pagination walks (chatbot_name, id); id is the monotonic key
+    __table_args__ = (
+        Index('ix_chat_messages_chatbot_name_id', 'chatbot_name', 'id'),
+    )
+
+class IngestionJob(Base):
+    __tablename__ = 'ingestion_jobs'
+
+    id = Column(Integer, primary_key=True)
+    chatbot_name = Column(String(255), nullable=False, index=True)
+    status = Column(String(32), nullable=False, default='queued', index=True)  # queued, running, succeeded, failed, cancelled
+    retained_files = Column(Text)  # JSON metadata of the files the job keeps
+    staging_dir = Column(String(1024))
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    retry_at = Column(DateTime)  # A queued retry is not claimed before this time
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)  # Doubles as the worker heartbeat
+
+class IngestionJobFile(Base):
+    __tablename__ = 'ingestion_job_files'
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey('ingestion_jobs.id', ondelete='CASCADE'), nullable=False, index=True)
+    filename = Column(String(1024), nullable=False)
+    file_type = Column(String(255))
+    staged_path = Column(String(1024), nullable=False)
+    status = Column(String(32), nullable=False, default='pending')  # pending, done, failed
+    detail = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+
+# Jobs that are not finished yet
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+
+
+# Column-only reads: rows come back as plain tuples, no ORM objects are built
+_FILE_METADATA_COLUMNS = (
+    KnowledgeBaseFile.filename, KnowledgeBaseFile.file_type, KnowledgeBaseFile.size,
+    KnowledgeBaseFile.content_hash, KnowledgeBaseFile.chunk_count
+)
+_MESSAGE_COLUMNS = (ChatMessage.id, ChatMessage.user_message, ChatMessage.bot_response, ChatMessage.created_at)
+
+
+def _file_metadata(kb_file: KnowledgeBaseFile) -> Dict:
+    return {
+        'filename': kb_file.filename,
+        'type': kb_file.file_type,
+        'size': kb_file.size,
+        'content_hash': kb_file.content_hash,
+        'chunk_count': kb_file.chunk_count
+    }
+
+
+def _message_dict(msg: ChatMessage) -> Dict:
+    return {
+        'id': msg.id,
+        'user': msg.user_message,
+        'assistant': msg.bot_response,
+        'created_at': msg.created_at
+    }
+
+
+def _job_dict(job: IngestionJob, files: List[IngestionJobFile]) -> Dict:
+    return {
+        'id': job.id,
+        'chatbot_name': job.chatbot_name,
+        'status': job.status,
+        'retained_files': json.loads(job.retained_files or '[]'),
+        'staging_dir': job.staging_dir,
+        'attempts': job.attempts,
+        'error': job.error,
+        'cancel_requested': job.cancel_requested,
+        'retry_at': job.retry_at,
+        'created_at': job.created_at,
+        'updated_at': job.updated_at,
+        'files': [{
+            'id': job_file.id,
+            'filename': job_file.filename,
+            'type': job_file.file_type,
+            'staged_path': job_file.staged_path,
+            'status': job_file.status,
+            'detail': job_file.detail,
+            'attempts': job_file.attempts
+        } for job_file in files]
+    }
+
+
+def _new_kb_file(chatbot_id: int, item: Dict) -> KnowledgeBaseFile:
+    content = item.get('content') or ''
+    return KnowledgeBaseFile(
+        chatbot_id=chatbot_id,
+        filename=item['filename'],
+        file_type=item.get('type'),
+        size=len(content),
+        content_hash=item.get('content_hash') or content_hash(content),
+        chunk_count=item.get('chunk_count', 0),
+        content=content
+    )
+
+
+def migrate_schema(engine):
+    """
+        Move knowledge bases still stored in the legacy chatbots.knowledge_base
+        JSON column into knowledge_base_files. Runs once per process when the
+        engine is created; migrated rows have the column cleared, so later
+        runs only touch rows that still need it. Also adds columns and
+        indexes that create_all does not add to existing tables.
+    """
+
+    # create_all never alters existing tables
+    chatbot_columns = {column['name'] for column in inspect(engine).get_columns('chatbots')}
+    if 'answer_cache_enabled' not in chatbot_columns:
+        with engine.begin() as connection:
+            connection.execute(text(
+                "ALTER TABLE chatbots ADD COLUMN answer_cache_enabled BOOLEAN NOT NULL DEFAULT FALSE"
+            ))
+    job_columns = {column['name'] for column in inspect(engine).get_columns('ingestion_jobs')}
+    if 'retry_at' not in job_columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE ingestion_jobs ADD COLUMN retry_at TIMESTAMP"))
+
+    # create_all only builds indexes together with new tables
+    for index in ChatMessage.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        try:
+            legacy = (
+                session.query(Chatbot)
+                .filter(Chatbot.knowledge_base.isnot(None))
+                .all()
+            )
+            for chatbot in legacy:
+                for item in json.loads(chatbot.knowledge_base or '[]'):
+                    session.add(_new_kb_file(chatbot.id, item))
+                chatbot.knowledge_base = None
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise Exception(f"Error migrating knowledge bases: {str(e)}")
 
 
 class DatabaseManager:
     def __init__(self):
-        self.database_url = st.secrets["DATABASE_URL"]
-        if not self.database_url:
-            raise Exception("DATABASE_URL environment variable not found")
-        
-        self.engine = create_engine(
-            self.database_url, 
-            pool_pre_ping=True,
-            pool_recycle=500
-        )
-        
-        Base.metadata.create_all(self.engine)
-        
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+        # Shared, pooled engine; the schema is created once per process
+        self.engine = get_db_engine()
 
-    def create_chatbot(self, name:str, system_prompt:str, knowledge_base: List[Dict] = None)-> bool:
-        """Create a new chatbot in the database."""
+        # Objects stay readable after commit; sessions never outlive an operation
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
 
+    @contextmanager
+    def session_scope(self):
+        """
+            A session for one operation: committed when the block succeeds,
+            rolled back when it raises, and always closed so its connection
+            goes straight back to the pool. Nothing is shared between
+            threads or Streamlit sessions.
+        """
+
+        session = self.Session()
         try:
-            # Check if chatbot already exists
-            existing = (
-                self.session.query(Chatbot)
-                .filter_by(name=name, is_active=True)
-                .first()
-            )
-            if existing:
-                return False
-            
-            # Convert knowledge base to JSON string
-            kb_json = json.dumps(knowledge_base) if knowledge_base else json.dumps([])
-            
-            chatbot = Chatbot(
-                name=name,
-                system_prompt=system_prompt,
-                knowledge_base=kb_json
-            )
-            
-            self.session.add(chatbot)
-            self.session.commit()
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def is_available(self) -> bool:
+        """Whether the database answers at all, to tell outages from rejected rows."""
+
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
             return True
-            
+        except Exception:
+            return False
+
+    def create_chatbot(self, name:str, system_prompt:str, knowledge_base: List[Dict] = None, answer_cache_enabled: bool = False)-> bool:
+        """Create a new chatbot in the database."""
+
+        try:
+            with self.session_scope() as session:
+                return self._add_chatbot(session, name, system_prompt, knowledge_base, answer_cache_enabled)
+
         except Exception as e:
-            self.session.rollback()
             raise Exception(f"Error creating chatbot: {str(e)}")
-        
+
+    def _add_chatbot(self, session, name: str, system_prompt: str, knowledge_base: List[Dict] = None, answer_cache_enabled: bool = False) -> bool:
+        """Add a chatbot and its files to a session; False if an active one has this name."""
+
+        # Check if chatbot already exists
+        existing = (
+            session.query(Chatbot.id)
+            .filter_by(name=name, is_active=True)
+            .first()
+        )
+        if existing:
+            return False
+
+        chatbot = Chatbot(
+            name=name,
+            system_prompt=system_prompt,
+            answer_cache_enabled=answer_cache_enabled
+        )
+
+        session.add(chatbot)
+        session.flush()
+
+        # Store each file in the blob table
+        for item in knowledge_base or []:
+            session.add(_new_kb_file(chatbot.id, item))
+        return True
+
     def get_all_chatbots(self) -> List[str]:
         """Get list of all active chatbot names."""
         try:
-            chatbots = (
-                self.session.query(Chatbot)
-                .filter_by(is_active=True)
-                .all()
-            )
-            return [chatbot.name for chatbot in chatbots]
-            
+            with self.session_scope() as session:
+                rows = (
+                    session.query(Chatbot.name)
+                    .filter_by(is_active=True)
+                    .order_by(Chatbot.id)
+                    .all()
+                )
+                return [name for name, in rows]
+
         except Exception as e:
-            raise Exception(f"Error getting chatbots: {str(e)}") 
-        
+            raise Exception(f"Error getting chatbots: {str(e)}")
+
+    def get_chatbot_summaries(self) -> List[Dict]:
+        """
+            Get a summary of every active chatbot in one query: name, prompt
+            preview, file count and timestamps.
+        """
+        try:
+            with self.session_scope() as session:
+                rows = (
+                    session.query(
+                        Chatbot.name,
+                        func.substr(Chatbot.system_prompt, 1, 100),
+                        func.count(KnowledgeBaseFile.id),
+                        Chatbot.created_at,
+                        Chatbot.updated_at
+                    )
+                    .outerjoin(KnowledgeBaseFile, KnowledgeBaseFile.chatbot_id == Chatbot.id)
+                    .filter(Chatbot.is_active.is_(True))
+                    .group_by(Chatbot.id)
+                    .order_by(Chatbot.id)
+                    .all()
+                )
+
+            return [{
+                'name': name,
+                'prompt_preview': prompt_preview,
+                'file_count': file_count,
+                'created_at': created_at,
+                'updated_at': updated_at
+            } for name, prompt_preview, file_count, created_at, updated_at in rows]
+
+        except Exception as e:
+            raise Exception(f"Error getting chatbot summaries: {str(e)}")
+
     def get_chatbot(self, name:str) -> Optional[Dict]:
-        """Get chatbot by name."""
+        """
+            Get chatbot by name. The knowledge base is returned as file
+            metadata only; use get_knowledge_base_files for the content.
+        """
         try:
-            chatbot = (
-                self.session.query(Chatbot)
-                .filter_by(name=name, is_active=True)
-                .first()
-            )
-            if not chatbot:
-                return None
-            
+            with self.session_scope() as session:
+                chatbot = (
+                    session.query(
+                        Chatbot.id, Chatbot.name, Chatbot.system_prompt,
+                        Chatbot.answer_cache_enabled, Chatbot.created_at, Chatbot.updated_at
+                    )
+                    .filter_by(name=name, is_active=True)
+                    .first()
+                )
+                if not chatbot:
+                    return None
+
+                kb_files = (
+                    session.query(*_FILE_METADATA_COLUMNS)
+                    .filter_by(chatbot_id=chatbot.id)
+                    .order_by(KnowledgeBaseFile.id)
+                    .all()
+                )
+
             return {
                 'name': chatbot.name,
                 'system_prompt': chatbot.system_prompt,
-                'knowledge_base': json.loads(chatbot.knowledge_base),
+                'knowledge_base': [_file_metadata(kb_file) for kb_file in kb_files],
+                'answer_cache_enabled': chatbot.answer_cache_enabled,
                 'created_at': chatbot.created_at,
                 'updated_at': chatbot.updated_at
             }
-            
+
         except Exception as e:
             raise Exception(f"Error getting chatbot: {str(e)}")
-        
-    def update_chatbot(self, name: str, system_prompt: str = None, knowledge_base: List[Dict] = None) -> bool:
+
+    def get_knowledge_base_files(self, name: str, include_content: bool = False, filenames: List[str] = None) -> List[Dict]:
+        """
+            Get the knowledge base files of a chatbot.
+
+            Args:
+                name: Name of the chatbot
+                include_content: Also load the extracted text of each file
+                filenames: Restrict the result to these files (optional)
+
+            Returns:
+                List[Dict]: File metadata, plus 'content' when requested
+        """
+
+        try:
+            columns = list(_FILE_METADATA_COLUMNS)
+            if include_content:
+                columns.append(KnowledgeBaseFile.content)
+
+            with self.session_scope() as session:
+                query = (
+                    session.query(*columns)
+                    .join(Chatbot, Chatbot.id == KnowledgeBaseFile.chatbot_id)
+                    .filter(Chatbot.name == name, Chatbot.is_active.is_(True))
+                )
+                if filenames is not None:
+                    query = query.filter(KnowledgeBaseFile.filename.in_(filenames))
+                rows = query.order_by(KnowledgeBaseFile.id).all()
+
+            files = []
+            for kb_file in rows:
+                item = _file_metadata(kb_file)
+                if include_content:
+                    item['content'] = kb_file.content
+                files.append(item)
+            return files
+
+        except Exception as e:
+            raise Exception(f"Error getting knowledge base files: {str(e)}")
+
+    def update_chatbot(self, name: str, system_prompt: str = None, knowledge_base: List[Dict] = None, answer_cache_enabled: bool = None) -> bool:
         """Update an existing chatbot."""
         try:
-            chatbot = (
-                self.session.query(Chatbot)
-                .filter_by(name=name, is_active=True)
-                .first()
-            )
-            if not chatbot:
-                return False
-            
-            if system_prompt is not None:
-                chatbot.system_prompt = system_prompt
-            
-            if knowledge_base is not None:
-                chatbot.knowledge_base = json.dumps(knowledge_base)
-            
-            chatbot.updated_at = datetime.now(timezone.utc)
-            self.session.commit()
-            return True
-            
+            with self.session_scope() as session:
+                chatbot = (
+                    session.query(Chatbot)
+                    .filter_by(name=name, is_active=True)
+                    .first()
+                )
+                if not chatbot:
+                    return False
+
+                if system_prompt is not None:
+                    chatbot.system_prompt = system_prompt
+
+                if knowledge_base is not None:
+                    self._sync_knowledge_base_files(session, chatbot.id, knowledge_base)
+
+                if answer_cache_enabled is not None:
+                    chatbot.answer_cache_enabled = answer_cache_enabled
+
+                chatbot.updated_at = utcnow()
+                return True
+
         except Exception as e:
-            self.session.rollback()
             raise Exception(f"Error updating chatbot: {str(e)}")
-        
+
+    def _sync_knowledge_base_files(self, session, chatbot_id: int, knowledge_base: List[Dict]):
+        """
+            Make the stored files match the given knowledge base. Entries
+            without 'content' are retained files and keep their stored blob.
+        """
+
+        existing = {
+            kb_file.filename: kb_file
+            for kb_file in session.query(KnowledgeBaseFile).filter_by(chatbot_id=chatbot_id).all()
+        }
+        wanted = {item['filename']: item for item in knowledge_base}
+
+        for filename, kb_file in existing.items():
+            if filename not in wanted:
+                session.delete(kb_file)
+
+        for filename, item in wanted.items():
+            kb_file = existing.get(filename)
+            changed = kb_file is None or (
+                'content' in item and kb_file.content_hash != item.get('content_hash')
+            )
+            if changed and 'content' in item:
+                if kb_file is not None:
+                    session.delete(kb_file)
+                session.add(_new_kb_file(chatbot_id, item))
+            elif kb_file is not None and 'chunk_count' in item:
+                kb_file.chunk_count = item['chunk_count']
+
     def clear_chat_history(self, chatbot_name: str):
         """Clear chat history for a chatbot."""
         try:
-            (
-                self.session.query(ChatMessage)
-                .filter_by(chatbot_name=chatbot_name)
-                .delete()
-            )
-            self.session.commit()
-            
+            with self.session_scope() as session:
+                (
+                    session.query(ChatMessage)
+                    .filter_by(chatbot_name=chatbot_name)
+                    .delete(synchronize_session=False)
+                )
+
         except Exception as e:
-            self.session.rollback()
             raise Exception(f"Error clearing chat history: {str(e)}")
-        
+
     def get_chat_history(self, chatbot_name: str) -> List[Dict]:
-        """Get chat history for a chatbot."""
+        """Get the full chat history for a chatbot, oldest first."""
 
         try:
-            messages = (
-                self.session.query(ChatMessage)
-                .filter_by(chatbot_name=chatbot_name)
-                .order_by(ChatMessage.created_at.desc())
-                .all()
-            )
-            
-            return [{
-                'user': msg.user_message,
-                'assistant': msg.bot_response,
-                'created_at': msg.created_at
-            } for msg in reversed(messages)]
-            
+            with self.session_scope() as session:
+                messages = (
+                    session.query(*_MESSAGE_COLUMNS)
+                    .filter_by(chatbot_name=chatbot_name)
+                    .order_by(ChatMessage.id)
+                    .all()
+                )
+
+            return [_message_dict(msg) for msg in messages]
+
         except Exception as e:
             raise Exception(f"Error getting chat history: {str(e)}")
-        
+
+    def get_chat_history_page(self, chatbot_name: str, limit: int = 50, before_id: Optional[int] = None) -> Dict:
+        """
+            Get one page of chat history using keyset pagination.
+
+            Args:
+                chatbot_name: Name of the chatbot
+                limit: Maximum number of messages to return
+                before_id: Cursor from a previous page; only older messages
+                    are returned. None returns the latest page.
+
+            Returns:
+                Dict: 'messages' (oldest first) and 'next_cursor', the cursor
+                for the next older page or None when there is none
+        """
+
+        try:
+            with self.session_scope() as session:
+                query = (
+                    session.query(*_MESSAGE_COLUMNS)
+                    .filter(ChatMessage.chatbot_name == chatbot_name)
+                )
+                if before_id is not None:
+                    query = query.filter(ChatMessage.id < before_id)
+
+                # One extra row tells whether an older page exists
+                rows = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+            return {
+                'messages': [_message_dict(msg) for msg in reversed(rows)],
+                'next_cursor': rows[-1].id if has_more else None
+            }
+
+        except Exception as e:
+            raise Exception(f"Error getting chat history: {str(e)}")
+
     def save_chat_message(self, chatbot_name: str, user_message: str, bot_response: str):
         """Save a chat message to the database."""
 
         try:
-            message = ChatMessage(
-                chatbot_name=chatbot_name,
-                user_message=user_message,
-                bot_response=bot_response
-            )
-            
-            self.session.add(message)
-            self.session.commit()
-            
+            with self.session_scope() as session:
+                session.add(ChatMessage(
+                    chatbot_name=chatbot_name,
+                    user_message=user_message,
+                    bot_response=bot_response
+                ))
+
         except Exception as e:
-            self.session.rollback()
             raise Exception(f"Error saving chat message: {str(e)}")
-        
+
+    def save_chat_messages(self, messages: List[Dict]):
+        """
+            Save a batch of chat messages in one transaction (group commit).
+
+            Args:
+                messages: Dicts with chatbot_name, user, assistant and
+                    created_at, in the order they were sent
+        """
+
+        try:
+            with self.session_scope() as session:
+                session.add_all([
+                    ChatMessage(
+                        chatbot_name=message['chatbot_name'],
+                        user_message=message['user'],
+                        bot_response=message['assistant'],
+                        created_at=message['created_at']
+                    )
+                    for message in messages
+                ])
+
+        except Exception as e:
+            raise Exception(f"Error saving chat messages: {str(e)}")
+
     def delete_chatbot(self, name: str) -> bool:
-        """Soft delete a chatbot (mark as inactive)."""
+        """Soft delete a chatbot (mark as inactive) and delete its chat history."""
 
         try:
-            chatbot = (
-                self.session.query(Chatbot)
-                .filter_by(name=name, is_active=True)
-                .first()
-            )
+            with self.session_scope() as session:
+                deleted = (
+                    session.query(Chatbot)
+                    .filter_by(name=name, is_active=True)
+                    .update(
+                        {'is_active': False, 'updated_at': utcnow()},
+                        synchronize_session=False
+                    )
+                )
+                if not deleted:
+                    return False
+
+                (
+                    session.query(ChatMessage)
+                    .filter_by(chatbot_name=name)
+                    .delete(synchronize_session=False)
+                )
+                return True
+
+        except Exception as e:
+            raise Exception(f"Error deleting chatbot: {str(e)}")
+
+    def create_ingestion_job(self, chatbot_name: str, files: List[Dict], retained_files: List[Dict] = None, staging_dir: str = None, new_chatbot: Optional[Dict] = None) -> int:
+        """
+            Queue an ingestion job.
+
+            Args:
+                chatbot_name: Name of the chatbot
+                files: Staged uploads, each with filename, type and staged_path
+                retained_files: Metadata of the existing files the chatbot
+                    keeps once the job is applied
+                staging_dir: Directory holding the staged uploads
+                new_chatbot: system_prompt and answer_cache_enabled of a
+                    chatbot to create in the same transaction, so neither
+                    exists without the other (optional)
+
+            Returns:
+                int: The job ID
+        """
+
+        try:
+            with self.session_scope() as session:
+                if new_chatbot is not None and not self._add_chatbot(session, chatbot_name, **new_chatbot):
+                    raise ValueError(f"a chatbot named '{chatbot_name}' already exists")
+
+                job = IngestionJob(
+                    chatbot_name=chatbot_name,
+                    retained_files=json.dumps(retained_files or []),
+                    staging_dir=staging_dir
+                )
+                session.add(job)
+                session.flush()
+
+                for item in files:
+                    session.add(IngestionJobFile(
+                        job_id=job.id,
+                        filename=item['filename'],
+                        file_type=item.get('type'),
+                        staged_path=item['staged_path']
+                    ))
+                return job.id
+
+        except Exception as e:
+            raise Exception(f"Error creating ingestion job: {str(e)}")
+
+    def get_ingestion_job(self, job_id: int) -> Optional[Dict]:
+        """Get a job and the status of each of its files."""
+
+        try:
+            with self.session_scope() as session:
+                job = session.get(IngestionJob, job_id)
+                if not job:
+                    return None
+
+                files = (
+                    session.query(IngestionJobFile)
+                    .filter_by(job_id=job.id)
+                    .order_by(IngestionJobFile.id)
+                    .all()
+                )
+                return _job_dict(job, files)
+
+        except Exception as e:
+            raise Exception(f"Error getting ingestion job: {str(e)}")
+
+    def get_latest_ingestion_job(self, chatbot_name: str) -> Optional[Dict]:
+        """Get the most recent job of a chatbot, finished or not."""
+
+        try:
+            with self.session_scope() as session:
+                job_id = (
+                    session.query(IngestionJob.id)
+                    .filter_by(chatbot_name=chatbot_name)
+                    .order_by(IngestionJob.id.desc())
+                    .limit(1)
+                    .scalar()
+                )
+            return self.get_ingestion_job(job_id) if job_id is not None else None
+
+        except Exception as e:
+            raise Exception(f"Error getting ingestion job: {str(e)}")
+
+    def claim_ingestion_job(self, stale_after: float) -> Optional[Dict]:
+        """
+            Take the oldest queued job that is due (its retry_at, if any,
+            has passed), or a running job whose worker has not reported for
+            stale_after seconds (it died mid-job), and mark it running. The conditional update makes the claim atomic when
+            several processes poll the same table.
+        """
+
+        try:
+            now = utcnow()
+            stale_before = now - timedelta(seconds=stale_after)
+            with self.session_scope() as session:
+                candidates = (
+                    session.query(IngestionJob.id, IngestionJob.status, IngestionJob.updated_at)
+                    .filter(or_(
+                        (IngestionJob.status == 'queued') & or_(IngestionJob.retry_at.is_(None), IngestionJob.retry_at <= now),
+                        (IngestionJob.status == 'running') & (IngestionJob.updated_at < stale_before)
+                    ))
+                    .order_by(IngestionJob.id)
+                    .limit(10)
+                    .all()
+                )
+
+            for job_id, status, updated_at in candidates:
+                with self.session_scope() as session:
+                    claimed = (
+                        session.query(IngestionJob)
+                        .filter_by(id=job_id, status=status, updated_at=updated_at)
+                        .update({'status': 'running', 'updated_at': utcnow()}, synchronize_session=False)
+                    )
+                if claimed:
+                    return self.get_ingestion_job(job_id)
+            return None
+
+        except Exception as e:
+            raise Exception(f"Error claiming ingestion job: {str(e)}")
+
+    def update_ingestion_job(self, job_id: int, **fields):
+        """Update job columns (status, attempts, error, retry_at); also refreshes the heartbeat."""
+
+        try:
+            fields['updated_at'] = utcnow()
+            with self.session_scope() as session:
+                session.query(IngestionJob).filter_by(id=job_id).update(fields, synchronize_session=False)
+
+        except Exception as e:
+            raise Exception(f"Error updating ingestion job: {str(e)}")
+
+    def update_ingestion_file(self, file_id: int, **fields):
+        """Checkpoint one file of a job (status, detail, attempts)."""
+
+        try:
+            with self.session_scope() as session:
+                session.query(IngestionJobFile).filter_by(id=file_id).update(fields, synchronize_session=False)
+
+        except Exception as e:
+            raise Exception(f"Error updating ingestion file: {str(e)}")
+
+    def request_ingestion_cancel(self, job_id: int) -> bool:
+        """Ask the worker to stop an unfinished job at its next checkpoint."""
+
+        try:
+            with self.session_scope() as session:
+                requested = (
+                    session.query(IngestionJob)
+                    .filter(IngestionJob.id == job_id, IngestionJob.status.in_(ACTIVE_JOB_STATUSES))
+                    .update({'cancel_requested': True}, synchronize_session=False)
+                )
+            return bool(requested)
+
+        except Exception as e:
+            raise Exception(f"Error cancelling ingestion job: {str(e)}")
+
+    def is_ingestion_cancel_requested(self, job_id: int) -> bool:
+        try:
+            with self.session_scope() as session:
+                return bool(
+                    session.query(IngestionJob.cancel_requested)
+                    .filter_by(id=job_id)
+                    .scalar()
+                )
 
-            if not chatbot:
-                return False
-            
-            chatbot.is_active = False
-            chatbot.updated_at = datetime.now(timezone.utc)
-            self.session.commit()
-            
-            # Also delete chat history
-            self.clear_chat_history(name)
-            return True
-            
         except Exception as e:
-            self.session.rollback()
-            raise Exception(f"Error deleting chatbot: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error getting ingestion job: {str(e)}")
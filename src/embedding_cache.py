@@ -0,0 +1,136 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, List
+import numpy as np
+import streamlit as st
+from .resource_manager import get_openai_client
+from .utils.get_base_path import get_base_path
+from .utils.metrics import increment_counter
+from .utils.settings import get_setting
+from .utils.tokens import count_tokens
+
+
+def embedding_key(model: str, text: str) -> str:
+    """Content address of an embedding: hash of the model and the text."""
+
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+        Persistent, content-addressed store of embeddings in SQLite.
+
+        Vectors are stored as float32 blobs keyed by embedding_key, so the
+        same text embedded with the same model is only ever paid for once,
+        across re-indexes, restarts and collection migrations.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, np.ndarray]):
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                [(key, model, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors.items()]
+            )
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class Embedder:
+    """
+        Client-side embedding stage: serves vectors from the persistent
+        cache and embeds only the misses, in large batched requests.
+    """
+
+    def __init__(self, cache: EmbeddingCache, model: str, batch_size: int = 512, batch_tokens: int = 250000):
+        self.cache = cache
+        self.model = model
+        self.batch_size = batch_size
+        # OpenAI caps the total tokens of one embeddings request
+        self.batch_tokens = batch_tokens
+
+    def _request(self, texts: List[str]) -> List[np.ndarray]:
+        response = get_openai_client().embeddings.create(model=self.model, input=texts)
+        increment_counter("embeddings.requests")
+        increment_counter("embeddings.texts", len(texts))
+        return [np.asarray(item.embedding, dtype=np.float32) for item in response.data]
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        """
+            Args:
+                texts: Texts to embed
+
+            Returns:
+                List: One float32 vector per text, in input order
+        """
+
+        keys = [embedding_key(self.model, text) for text in texts]
+        vectors = self.cache.get_many(list(set(keys)))
+        increment_counter("embeddings.cache_hits", sum(1 for key in keys if key in vectors))
+
+        # Unique misses, batched by count and by tokens
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing[key] = text
+
+        batch_keys, batch_texts, batch_tokens = [], [], 0
+        for key, text in missing.items():
+            tokens = count_tokens(text)
+            if batch_texts and (len(batch_texts) >= self.batch_size or batch_tokens + tokens > self.batch_tokens):
+                self._store(vectors, batch_keys, batch_texts)
+                batch_keys, batch_texts, batch_tokens = [], [], 0
+            batch_keys.append(key)
+            batch_texts.append(text)
+            batch_tokens += tokens
+        if batch_texts:
+            self._store(vectors, batch_keys, batch_texts)
+
+        return [vectors[key] for key in keys]
+
+    def _store(self, vectors: Dict[str, np.ndarray], keys: List[str], texts: List[str]):
+        embedded = dict(zip(keys, self._request(texts)))
+        self.cache.put_many(self.model, embedded)
+        vectors.update(embedded)
+
+
+@st.cache_resource(show_spinner=False)
+def get_embedder(model: str) -> Embedder:
+    cache = EmbeddingCache(get_setting(
+        "EMBEDDING_CACHE_PATH",
+        os.path.join(get_base_path(), "src", "data", "embedding_cache.sqlite3")
+    ))
+    return Embedder(
+        cache,
+        model=model,
+        batch_size=get_setting("EMBEDDING_BATCH_SIZE", 512),
+        batch_tokens=get_setting("EMBEDDING_BATCH_TOKENS", 250000)
+    )
@@ -1,7 +1,8 @@
 import streamlit as st 
 import PyPDF2
-import io
+import codecs
 import docx
+from typing import Dict, Iterator
 
 
 class FileProcessor:
@@ -20,95 +21,115 @@ class FileProcessor:
             str: Extracted text content
         """
 
+        return "".join(segment["text"] for segment in self.iter_segments(uploaded_file)).strip()
+
+    def iter_segments(self, uploaded_file) -> Iterator[Dict]:
+        """
+        Extract text from an uploaded file one page, paragraph or block at a
+        time, so large documents never have to be held as a single string.
+        
+        Args:
+            uploaded_file: Streamlit uploaded file object
+            
+        Yields:
+            Dict: "text" plus "page" (PDF page number) or "section" (nearest
+            Word heading) where known
+        """
+
         try:
             file_type = uploaded_file.type
-            file_content = ""
+            uploaded_file.seek(0)
             
             if file_type == "text/plain":
                 # Handle plain text files
-                file_content = self._process_text_file(uploaded_file)
+                yield from self._process_text_file(uploaded_file)
             
             elif file_type == "application/pdf":
                 # Handle PDF files
-                file_content = self._process_pdf_file(uploaded_file)
+                yield from self._process_pdf_file(uploaded_file)
             
             elif file_type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", 
                              "application/msword"]:
                 # Handle Word documents
-                file_content = self._process_word_file(uploaded_file)
+                yield from self._process_word_file(uploaded_file)
             
             elif file_type == "text/markdown":
                 # Handle Markdown files
-                file_content = self._process_text_file(uploaded_file)
+                yield from self._process_text_file(uploaded_file)
             
             else:
                 # Try to process as text file
                 try:
-                    file_content = self._process_text_file(uploaded_file)
+                    yield from self._process_text_file(uploaded_file)
                 except:
                     raise ValueError(f"Unsupported file type: {file_type}")
             
-            return file_content
-            
         except Exception as e:
             raise Exception(f"Error processing file {uploaded_file.name}: {str(e)}")
         
-    def _process_text_file(self, uploaded_file) -> str:
-        """Process plain text files."""
+    def _process_text_file(self, uploaded_file, block_size: int = 64 * 1024) -> Iterator[Dict]:
+        """Process plain text files in fixed-size blocks."""
         try:
-            # Try UTF-8 first
-            content = uploaded_file.read().decode('utf-8')
-            uploaded_file.seek(0)  # Reset file pointer
-            return content
+            # Try UTF-8 first, validating the whole file before yielding
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            while block := uploaded_file.read(block_size):
+                decoder.decode(block)
+            decoder.decode(b"", final=True)
+            encoding = 'utf-8'
         except UnicodeDecodeError:
-            try:
-                # Fallback to latin-1
-                uploaded_file.seek(0)
-                content = uploaded_file.read().decode('latin-1')
-                uploaded_file.seek(0)
-                return content
-            except Exception as e:
-                raise Exception(f"Could not decode text file: {str(e)}")
-    
-    def _process_pdf_file(self, uploaded_file) -> str:
-        """Process PDF files using PyPDF2."""
+            # Fallback to latin-1
+            encoding = 'latin-1'
+
         try:
-            
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.read()))
+            uploaded_file.seek(0)
+            decoder = codecs.getincrementaldecoder(encoding)()
+            while block := uploaded_file.read(block_size):
+                yield {"text": decoder.decode(block)}
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield {"text": tail}
             uploaded_file.seek(0)  # Reset file pointer
+        except Exception as e:
+            raise Exception(f"Could not decode text file: {str(e)}")
+    
+    def _process_pdf_file(self, uploaded_file) -> Iterator[Dict]:
+        """Process PDF files page by page using PyPDF2."""
+        try:
             
-            text_content = ""
-            for page in pdf_reader.pages:
-                text_content += page.extract_text() + "\n"
+            # PdfReader reads from the upload's own buffer; no extra copy
+            pdf_reader = PyPDF2.PdfReader(uploaded_file)
             
-            return text_content.strip()
+            for page_number, page in enumerate(pdf_reader.pages, start=1):
+                yield {"text": (page.extract_text() or "") + "\n", "page": page_number}
+
+            uploaded_file.seek(0)  # Reset file pointer
             
         except ImportError:
             # Fallback if PyPDF2 is not available
             st.warning("PyPDF2 not available. Cannot process PDF files.")
-            return f"PDF file: {uploaded_file.name} (content could not be extracted)"
+            yield {"text": f"PDF file: {uploaded_file.name} (content could not be extracted)"}
         
         except Exception as e:
             raise Exception(f"Error processing PDF: {str(e)}")
         
-    def _process_word_file(self, uploaded_file) -> str:
-        """Process Word documents."""
+    def _process_word_file(self, uploaded_file) -> Iterator[Dict]:
+        """Process Word documents paragraph by paragraph."""
         try:
             
             
-            doc = docx.Document(io.BytesIO(uploaded_file.read()))
+            doc = docx.Document(uploaded_file)
             uploaded_file.seek(0)  # Reset file pointer
             
-            text_content = ""
+            section = None
             for paragraph in doc.paragraphs:
-                text_content += paragraph.text + "\n"
-            
-            return text_content.strip()
+                if paragraph.style is not None and paragraph.style.name.startswith("Heading") and paragraph.text.strip():
+                    section = paragraph.text.strip()
+                yield {"text": paragraph.text + "\n", "section": section}
             
         except ImportError:
             # Fallback if python-docx is not available
             st.warning("python-docx not available. Cannot process Word documents.")
-            return f"Word document: {uploaded_file.name} (content could not be extracted)"
+            yield {"text": f"Word document: {uploaded_file.name} (content could not be extracted)"}
         
         except Exception as e:
             raise Exception(f"Error processing Word document: {str(e)}")
\ No newline at end of file
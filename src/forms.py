@@ -1,7 +1,98 @@
 import streamlit as st
 from typing import Dict, Optional, List
-from .weaviate_manager import WeaviateManager
-from .utils.generate_chunks import chunk_with_recursive_splitter
+from .utils.settings import get_setting
+
+_FILE_STATUS_ICONS = {"pending": "⏳", "done": "✅", "failed": "⚠️"}
+
+
+class IngestionProgress:
+    """
+        Per-file progress display for ingest_files: an overall progress
+        bar plus one status line per uploaded file.
+    """
+
+    def __init__(self, uploaded_files: List):
+        self.total = len(uploaded_files)
+        self.finished = 0
+        self.bar = st.progress(0.0, text=f"Processing {self.total} files...")
+        # By upload index: several uploads may share a filename
+        self.rows = []
+        for uploaded_file in uploaded_files:
+            row = st.empty()
+            row.write(f"⏳ {uploaded_file.name}")
+            self.rows.append(row)
+
+    def __call__(self, index: int, filename: str, status: str, detail: Optional[str] = None):
+        row = self.rows[index] if 0 <= index < len(self.rows) else None
+        if row is None:
+            return
+
+        if status == "processing":
+            row.write(f"⚙️ {filename}: processing...")
+            return
+
+        if status == "done":
+            row.write(f"✅ {filename}: {detail}")
+        else:
+            row.warning(f"Could not process file {filename}: {detail}")
+
+        self.finished += 1
+        self.bar.progress(self.finished / self.total, text=f"Processed {self.finished} of {self.total} files")
+
+
+def render_ingestion_job(job: Dict):
+    """Overall progress, one line per file and the job's outcome."""
+
+    files = job['files']
+    finished = sum(1 for job_file in files if job_file['status'] != 'pending')
+    st.progress(finished / len(files) if files else 1.0, text=f"Processed {finished} of {len(files)} files")
+
+    for job_file in files:
+        icon = _FILE_STATUS_ICONS.get(job_file['status'], "⏳")
+        detail = job_file['detail'] or job_file['status']
+        st.write(f"{icon} {job_file['filename']}: {detail}")
+
+    if job['status'] == 'succeeded':
+        st.success("Knowledge base is ready.")
+    elif job['status'] == 'failed':
+        st.error(f"Ingestion failed: {job['error']}")
+    elif job['status'] == 'cancelled':
+        st.info("Ingestion was cancelled; the knowledge base was left unchanged.")
+    elif job['attempts']:
+        st.warning(f"Retrying after an error (attempt {job['attempts'] + 1}): {job['error']}")
+
+
+@st.fragment(run_every=get_setting("INGESTION_STATUS_INTERVAL", 2.0))
+def ingestion_status(job_id: int):
+    """
+        Live status of a running ingestion job. Only this fragment reruns
+        while polling; once the job finishes the whole page reruns once,
+        which stops the polling.
+    """
+
+    job = st.session_state.chatbot_manager.get_ingestion_job(job_id)
+    if job is None:
+        return
+
+    if job['status'] not in ('queued', 'running'):
+        st.rerun(scope="app")
+
+    st.write("Indexing knowledge base in the background. You can leave this page.")
+    render_ingestion_job(job)
+
+    if job['cancel_requested']:
+        st.write("Cancelling...")
+    elif st.button("Cancel ingestion", key=f"cancel_ingestion_{job_id}"):
+        st.session_state.chatbot_manager.cancel_ingestion(job_id)
+
+
+def show_ingestion_job(job: Optional[Dict]):
+    if job is None:
+        return
+    if job['status'] in ('queued', 'running'):
+        ingestion_status(job['id'])
+    else:
+        render_ingestion_job(job)
 
 
 def create_chatbot_form():
@@ -31,6 +122,12 @@ def create_chatbot_form():
             help="Upload documents that your chatbot can reference in conversations"
         )
 
+        answer_cache_enabled = st.checkbox(
+            "Reuse answers to similar questions",
+            value=False,
+            help="Answer repeated or paraphrased questions instantly from earlier answers"
+        )
+
         # Submit button
         submit_button = st.form_submit_button("Create Chatbot", type="primary")
 
@@ -39,15 +136,32 @@ def create_chatbot_form():
                 st.error("Please enter a chatbot name.")
             elif not system_prompt:
                 st.error("Please enter a system prompt.")
-            elif chatbot_name in st.session_state.chatbot_manager.chatbots:
+            elif st.session_state.chatbot_manager.chatbot_exists(chatbot_name):
                 st.error(f"A chatbot named '{chatbot_name}' already exists.")
+            elif uploaded_files and st.session_state.chatbot_manager.db:
+                # Index in the background; the page shows the job's progress.
+                # The chatbot and its job are created together, or neither is
+                try:
+                    st.session_state.ingestion_job = st.session_state.chatbot_manager.queue_ingestion(
+                        chatbot_name,
+                        uploaded_files,
+                        system_prompt=system_prompt,
+                        answer_cache_enabled=answer_cache_enabled
+                    )
+                except Exception as e:
+                    st.error(f"Error creating chatbot: {str(e)}")
+                else:
+                    st.session_state.ingestion_chatbot = chatbot_name
+                    st.rerun()
             else:
                 with st.spinner("Creating chatbot..."):
                     try:
                         success = st.session_state.chatbot_manager.create_chatbot(
                             name=chatbot_name,
                             system_prompt=system_prompt,
-                            uploaded_files=uploaded_files
+                            uploaded_files=uploaded_files,
+                            answer_cache_enabled=answer_cache_enabled,
+                            progress=IngestionProgress(uploaded_files) if uploaded_files else None
                         )
                         
                         if success:
@@ -66,32 +180,51 @@ def create_chatbot_form():
                         st.error(f"Error creating chatbot: {str(e)}")
 
 
-def handle_update_button( new_uploaded_files: List, chatbot_name: str, system_prompt: str = None, chatbot_data: Dict = None):
+def _clear_removal_flags():
+    keys_to_remove = []
+    for key in st.session_state.keys():
+        if isinstance(key, str) and key.startswith("remove_file_"):
+            keys_to_remove.append(key)
+    for key in keys_to_remove:
+        del st.session_state[key]
+
+
+def handle_update_button( new_uploaded_files: List, chatbot_name: str, system_prompt: str = None, chatbot_data: Dict = None, answer_cache_enabled: bool = None):
+    # Handle file removals
+    updated_kb = []
+    for i, kb_item in enumerate(chatbot_data.get('knowledge_base', [])):
+        if not st.session_state.get(f"remove_file_{i}", False):
+            updated_kb.append(kb_item)
+
+    manager = st.session_state.chatbot_manager
+    if new_uploaded_files and manager.db:
+        # New files are indexed in the background; removals apply when the job finishes
+        try:
+            if manager.update_chatbot(chatbot_name, system_prompt, None, answer_cache_enabled):
+                manager.queue_ingestion(chatbot_name, new_uploaded_files, retained_files=updated_kb)
+                manager.clear_chat_history(chatbot_name)
+                _clear_removal_flags()
+                st.rerun()
+            else:
+                st.error("Failed to update chatbot.")
+        except Exception as e:
+            st.error(f"Error updating chatbot: {str(e)}")
+        return
+
     with st.spinner("Updating chatbot..."):
         try:
-            # Handle file removals
-            updated_kb = []
-            for i, kb_item in enumerate(chatbot_data.get('knowledge_base', [])):
-                if not st.session_state.get(f"remove_file_{i}", False):
-                    updated_kb.append(kb_item)
-            
-            # Add new files
+            # Add new files, parsed and chunked in parallel
+            new_chunks = {}
             if new_uploaded_files:
-                for uploaded_file in new_uploaded_files:
-                    try:
-                        processed_content = st.session_state.chatbot_manager.file_processor.process_file(uploaded_file)
-                        updated_kb.append({
-                            'filename': uploaded_file.name,
-                            'content': processed_content,
-                            'type': uploaded_file.type
-                        })
-                    except Exception as e:
-                        st.warning(f"Could not process file {uploaded_file.name}: {str(e)}")
+                new_kb, new_chunks = st.session_state.chatbot_manager.process_uploaded_files(
+                    new_uploaded_files, progress=IngestionProgress(new_uploaded_files)
+                )
+                updated_kb.extend(new_kb)
 
 
             # Update chatbot using the manager method
             success = st.session_state.chatbot_manager.update_chatbot(
-                chatbot_name, system_prompt, updated_kb
+                chatbot_name, system_prompt, updated_kb, answer_cache_enabled, precomputed_chunks=new_chunks
             )
 
             # Clear chat history since the chatbot has been modified
@@ -104,12 +237,7 @@ def handle_update_button( new_uploaded_files: List, chatbot_name: str, system_pr
                 st.error("Failed to update chatbot.")
 
             # Clean up removal flags
-            keys_to_remove = []
-            for key in st.session_state.keys():
-                if isinstance(key, str) and key.startswith("remove_file_"):
-                    keys_to_remove.append(key)
-            for key in keys_to_remove:
-                del st.session_state[key]
+            _clear_removal_flags()
             
             # Redirect to chat page
             st.session_state.current_page = 'chat'
@@ -145,6 +273,14 @@ def handle_delete_button(chatbot_name: str):
 
 
 def edit_chatbot_form(chatbot_name :str, chatbot_data:Optional[Dict]):
+    latest_job = st.session_state.chatbot_manager.get_latest_ingestion_job(chatbot_name)
+    job_active = latest_job is not None and latest_job['status'] in ('queued', 'running')
+    if job_active:
+        show_ingestion_job(latest_job)
+    elif latest_job is not None:
+        with st.expander("Last knowledge base update"):
+            show_ingestion_job(latest_job)
+
     with st.form("edit_chatbot_form"):
         # System prompt (pre-filled with current value)
         system_prompt = st.text_area(
@@ -179,6 +315,12 @@ def edit_chatbot_form(chatbot_name :str, chatbot_data:Optional[Dict]):
             help="Upload documents to add to the knowledge base"
         )
 
+        answer_cache_enabled = st.checkbox(
+            "Reuse answers to similar questions",
+            value=chatbot_data.get('answer_cache_enabled', False),
+            help="Answer repeated or paraphrased questions instantly from earlier answers"
+        )
+
         # Update button
         col1, col2 = st.columns([1, 1])
         with col1:
@@ -186,8 +328,10 @@ def edit_chatbot_form(chatbot_name :str, chatbot_data:Optional[Dict]):
         with col2:
             delete_button = st.form_submit_button("Delete Chatbot", type="secondary")
 
-        if update_button:
-            handle_update_button(new_uploaded_files, chatbot_name, system_prompt, chatbot_data)
+        if update_button and job_active:
+            st.error("The knowledge base is still being indexed. Wait for it to finish or cancel it first.")
+        elif update_button:
+            handle_update_button(new_uploaded_files, chatbot_name, system_prompt, chatbot_data, answer_cache_enabled)
 
         if delete_button:
             handle_delete_button(chatbot_name)
\ No newline at end of file
@@ -0,0 +1,258 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from datetime import timedelta
+from typing import Dict, List, Optional
+import streamlit as st
+from .database_manager import utcnow
+from .ingestion_pipeline import get_ingestion_executor, iter_chunk_batches, process_upload
+from .utils.get_base_path import get_base_path
+from .utils.metrics import increment_counter, record_metric
+from .utils.settings import get_setting
+
+
+def _staging_root() -> str:
+    return get_setting("INGESTION_STAGING_PATH", os.path.join(get_base_path(), "src", "data", "ingestion_staging"))
+
+
+def stage_uploads(uploaded_files: List) -> tuple:
+    """
+        Write uploads to disk so a job outlives the request that queued it.
+
+        Returns:
+            tuple: The staging directory, and one dict per upload with
+            filename, type and staged_path
+    """
+
+    staging_dir = os.path.join(_staging_root(), uuid.uuid4().hex)
+    os.makedirs(staging_dir, exist_ok=True)
+
+    staged = []
+    for i, uploaded_file in enumerate(uploaded_files):
+        safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", uploaded_file.name)[-100:]
+        path = os.path.join(staging_dir, f"{i:04d}_{safe_name}")
+        with open(path, "wb") as staged_file:
+            staged_file.write(uploaded_file.getvalue())
+        staged.append({"filename": uploaded_file.name, "type": uploaded_file.type, "staged_path": path})
+    return staging_dir, staged
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class IngestionWorker:
+    """
+        Background thread that runs queued ingestion jobs.
+
+        Jobs and per-file progress live in the database, so a job survives
+        reruns, disconnects and restarts. Each file is checkpointed once it
+        is parsed, pushed to the vector store and its parsed text saved next
+        to the staged upload; a resumed job skips finished files, and the
+        deterministic object IDs make re-pushing a file harmless. Files are
+        retried up to max_attempts times, and a job whose final step fails
+        is requeued the same way. Cancellation is checked between files and
+        rolls the vector store back to the chatbot's stored knowledge base.
+    """
+
+    def __init__(self, poll_interval: float = 2.0, max_attempts: int = 3, stale_after: float = 300.0):
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.stale_after = stale_after
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ingestion-worker", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Check for work now instead of at the next poll."""
+
+        self._wake.set()
+
+    def _run(self):
+        # Imported here: the manager module builds UI-facing objects
+        from .chatbot_manager import ChatbotManager
+
+        manager = None
+        while True:
+            try:
+                if manager is None:
+                    manager = ChatbotManager()
+                job = manager.db.claim_ingestion_job(self.stale_after) if manager.db else None
+                if job is not None:
+                    self._run_job(manager, job)
+                    continue
+            except Exception as e:
+                print(f"Ingestion worker error: {e}")
+                manager = None
+
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _check_cancelled(self, manager, job: Dict):
+        if manager.db.is_ingestion_cancel_requested(job["id"]):
+            raise JobCancelled()
+        # Heartbeat, so the job is not taken for dead and claimed again
+        manager.db.update_ingestion_job(job["id"])
+
+    def _run_job(self, manager, job: Dict):
+        started = time.perf_counter()
+        name = job["chatbot_name"]
+        try:
+            parsed = self._process_files(manager, job)
+            self._check_cancelled(manager, job)
+            manager.apply_update(name, knowledge_base=job["retained_files"] + parsed)
+            manager.db.update_ingestion_job(job["id"], status="succeeded", error=None)
+            increment_counter("ingestion.jobs_succeeded")
+
+        except JobCancelled:
+            # Drop whatever was pushed for this job's files
+            stored = manager.db.get_chatbot(name)
+            if stored is not None:
+                manager.apply_update(name, knowledge_base=stored["knowledge_base"])
+            manager.db.update_ingestion_job(job["id"], status="cancelled")
+            increment_counter("ingestion.jobs_cancelled")
+
+        except Exception as e:
+            attempts = job["attempts"] + 1
+            status = "queued" if attempts < self.max_attempts else "failed"
+            # Backed off in the table, so the worker goes on with other jobs meanwhile
+            retry_at = utcnow() + timedelta(seconds=min(2 ** attempts, 30)) if status == "queued" else None
+            manager.db.update_ingestion_job(job["id"], status=status, attempts=attempts, error=str(e), retry_at=retry_at)
+            increment_counter("ingestion.jobs_failed" if status == "failed" else "ingestion.jobs_retried")
+            if status == "queued":
+                return
+
+        record_metric("ingestion.job_time", time.perf_counter() - started, chatbot=name)
+        if job["staging_dir"]:
+            shutil.rmtree(job["staging_dir"], ignore_errors=True)
+
+    def _process_files(self, manager, job: Dict) -> List[Dict]:
+        """
+            Parse, chunk and index every unfinished file of a job.
+
+            Returns:
+                List[Dict]: Knowledge base entries of the successfully
+                processed files, finished earlier or now
+        """
+
+        name = job["chatbot_name"]
+        parsed = {}
+        pending = []
+        for job_file in job["files"]:
+            if job_file["status"] == "done":
+                parsed[job_file["id"]] = self._load_checkpoint(job_file)
+            elif job_file["status"] == "pending":
+                pending.append(job_file)
+
+        executor = get_ingestion_executor()
+        attempts = {job_file["id"]: job_file["attempts"] for job_file in pending}
+
+        def submit(job_file) -> Future:
+            with open(job_file["staged_path"], "rb") as staged_file:
+                data = staged_file.read()
+            args = (job_file["filename"], job_file["type"], data, self._chunks_path(job_file))
+            if executor is not None:
+                return executor.submit(process_upload, *args)
+
+            future = Future()
+            try:
+                future.set_result(process_upload(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        if pending:
+            # Pushes go straight to the collection, which may not exist yet
+            manager.vector_store.create(name)
+
+        running = {}
+        queue = list(pending)
+        while queue or running:
+            self._check_cancelled(manager, job)
+
+            # Inline parsing takes one file per round so cancellation stays responsive
+            while queue and (executor is not None or not running):
+                job_file = queue.pop(0)
+                attempts[job_file["id"]] += 1
+                manager.db.update_ingestion_file(job_file["id"], detail="processing", attempts=attempts[job_file["id"]])
+                running[submit(job_file)] = job_file
+
+            done, _ = wait(list(running), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_file = running.pop(future)
+                try:
+                    file_item = future.result()
+                    # Raises unless every object was written, so a file is
+                    # only checkpointed and marked done once it is indexed
+                    if file_item["chunk_count"]:
+                        manager.vector_store.push_chunk_batches(name, iter_chunk_batches(self._chunks_path(job_file)))
+                    self._save_checkpoint(job_file, file_item)
+                    os.remove(self._chunks_path(job_file))
+                except Exception as e:
+                    if attempts[job_file["id"]] < self.max_attempts:
+                        queue.append(job_file)
+                    else:
+                        manager.db.update_ingestion_file(job_file["id"], status="failed", detail=str(e))
+                    continue
+
+                manager.db.update_ingestion_file(job_file["id"], status="done", detail=f"{file_item['chunk_count']} chunks")
+                parsed[job_file["id"]] = file_item
+
+        return [parsed[job_file["id"]] for job_file in job["files"] if job_file["id"] in parsed]
+
+    def _checkpoint_path(self, job_file: Dict) -> str:
+        return job_file["staged_path"] + ".parsed.json"
+
+    def _chunks_path(self, job_file: Dict) -> str:
+        return job_file["staged_path"] + ".chunks.jsonl"
+
+    def _save_checkpoint(self, job_file: Dict, file_item: Dict):
+        path = self._checkpoint_path(job_file)
+        with open(path + ".tmp", "w", encoding="utf-8") as checkpoint:
+            json.dump(file_item, checkpoint)
+        os.replace(path + ".tmp", path)
+
+    def _load_checkpoint(self, job_file: Dict) -> Dict:
+        with open(self._checkpoint_path(job_file), "r", encoding="utf-8") as checkpoint:
+            return json.load(checkpoint)
+
+
+@st.cache_resource(show_spinner=False)
+def get_ingestion_worker() -> IngestionWorker:
+    return IngestionWorker(
+        poll_interval=get_setting("INGESTION_POLL_INTERVAL", 2.0),
+        max_attempts=get_setting("INGESTION_MAX_ATTEMPTS", 3),
+        stale_after=get_setting("INGESTION_STALE_AFTER", 300.0)
+    )
+
+
+def queue_ingestion(db, chatbot_name: str, uploaded_files: List, retained_files: Optional[List[Dict]] = None, new_chatbot: Optional[Dict] = None) -> int:
+    """
+        Stage uploads and queue a job that indexes them into a chatbot.
+
+        Args:
+            db: DatabaseManager holding the job tables
+            chatbot_name: Name of an existing chatbot, or of the one to create
+            uploaded_files: Streamlit uploaded files to add
+            retained_files: Metadata of the chatbot's existing files to keep
+            new_chatbot: Settings of a chatbot created together with the
+                job, see DatabaseManager.create_ingestion_job (optional)
+
+        Returns:
+            int: The job ID
+    """
+
+    staging_dir, staged = stage_uploads(uploaded_files)
+    try:
+        job_id = db.create_ingestion_job(chatbot_name, staged, retained_files, staging_dir, new_chatbot)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    get_ingestion_worker().wake()
+    return job_id
@@ -0,0 +1,284 @@
+import hashlib
+import io
+import json
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import streamlit as st
+from .file_processor import FileProcessor
+from .utils.chunking import get_chunker
+from .utils.hashing import content_hash
+from .utils.settings import get_setting
+
+
+class UploadedBlob(io.BytesIO):
+    """
+        In-memory upload with the name and type attributes of Streamlit's
+        UploadedFile. Worker processes receive the raw bytes and rebuild
+        the upload with this, since UploadedFile itself cannot be sent
+        between processes.
+    """
+
+    def __init__(self, name: str, type: str, data: bytes):
+        super().__init__(data)
+        self.name = name
+        self.type = type
+
+
+def iter_file_chunks(file_item: Dict, segments: Optional[Iterable[Dict]] = None) -> Iterator[Dict]:
+    """
+        Split one knowledge base file into chunks tagged with the file's
+        and each chunk's content hash, the chunk's token count, its
+        character offsets in the extracted text and the pages/section it
+        came from. Chunks are produced one at a time as the segments are
+        consumed.
+
+        Args:
+            file_item: Knowledge base entry with filename, type and
+                content_hash, and content unless segments are given
+            segments: Page/paragraph segments from FileProcessor.iter_segments;
+                defaults to the stored content as a single segment
+
+        Yields:
+            Dict: Chunks ready to be pushed to the vector store
+    """
+
+    if segments is None:
+        segments = [{"text": file_item["content"]}]
+
+    for i, (chunk, metadata) in enumerate(get_chunker().stream(segments)):
+        yield {
+            "filename": file_item["filename"],
+            "chunk_index": i,
+            "content": chunk,
+            "type": file_item["type"],
+            "file_hash": file_item["content_hash"],
+            "chunk_hash": content_hash(chunk),
+            "token_count": metadata["token_count"],
+            "char_start": metadata["start"],
+            "char_end": metadata["end"],
+            "page_start": metadata["page_start"],
+            "page_end": metadata["page_end"],
+            "section": metadata["section"]
+        }
+
+
+def build_file_chunks(file_item: Dict, segments: Optional[Iterable[Dict]] = None) -> List[Dict]:
+    """
+        All chunks of one file at once, see iter_file_chunks.
+
+        Returns:
+            List[Dict]: Chunks ready to be pushed to the vector store
+    """
+
+    return list(iter_file_chunks(file_item, segments))
+
+
+def process_upload(name: str, file_type: str, data: bytes, chunks_path: str) -> Dict:
+    """
+        Parse and chunk one upload. Runs in a worker process.
+
+        Extracted text is spooled to a file next to chunks_path as it
+        streams in, with each page or section kept as a span of it, and
+        hashed on the way. The chunks carry the file's hash, which is only
+        known once everything is read, so they are cut in a second pass
+        that reads the spans back and written to chunks_path as JSON lines,
+        one at a time. Besides the text the knowledge base keeps, memory
+        stays bounded by the chunker's window.
+
+        Args:
+            name: Filename of the upload
+            file_type: MIME type of the upload
+            data: Raw bytes of the upload
+            chunks_path: JSON lines file to write the chunks to; read it
+                back with iter_chunk_batches
+
+        Returns:
+            Dict: The knowledge base entry, with content and chunk_count
+    """
+
+    text_path = chunks_path + ".text"
+    # content_hash of the stripped text: leading whitespace is skipped, and
+    # whitespace after the last other character waits in pending until more
+    # text follows it
+    hasher = hashlib.sha256()
+    pending = ""
+    content_start = None
+    spans = []
+    length = 0
+    try:
+        with open(text_path, "wb") as text_file:
+            for segment in FileProcessor().iter_segments(UploadedBlob(name, file_type, data)):
+                text = segment.pop("text")
+                encoded = text.encode("utf-8")
+                text_file.write(encoded)
+                spans.append((length, len(encoded), segment))
+                length += len(encoded)
+
+                if content_start is None:
+                    text = text.lstrip()
+                    if not text:
+                        continue
+                    content_start = length - len(text.encode("utf-8"))
+                core = text.rstrip()
+                if core:
+                    hasher.update((pending + core).encode("utf-8"))
+                    pending = text[len(core):]
+                else:
+                    pending += text
+
+        file_item = {
+            'filename': name,
+            'type': file_type,
+            'content': '',
+            'content_hash': hasher.hexdigest(),
+            'chunk_count': 0
+        }
+
+        with open(text_path, "rb") as text_file:
+            segments = (
+                {**metadata, "text": _read_text(text_file, start, size)}
+                for start, size, metadata in spans
+            )
+            with open(chunks_path, "w", encoding="utf-8") as chunks_file:
+                for chunk in iter_file_chunks(file_item, segments):
+                    chunks_file.write(json.dumps(chunk) + "\n")
+                    file_item['chunk_count'] += 1
+
+            if content_start is not None:
+                # Decoded straight from the mapped file, the only copy kept
+                content_end = length - len(pending.encode("utf-8"))
+                with mmap.mmap(text_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    with memoryview(mapped) as view:
+                        file_item['content'] = str(view[content_start:content_end], "utf-8")
+        return file_item
+
+    finally:
+        if os.path.exists(text_path):
+            os.remove(text_path)
+
+
+def _read_text(text_file, start: int, size: int) -> str:
+    text_file.seek(start)
+    return text_file.read(size).decode("utf-8")
+
+
+def iter_chunk_batches(chunks_path: str, batch_size: Optional[int] = None) -> Iterator[List[Dict]]:
+    """
+        Read back the chunks process_upload wrote, batch_size at a time
+        (INGESTION_PUSH_BATCH by default).
+
+        Yields:
+            List[Dict]: Consecutive chunks of the file
+    """
+
+    batch_size = batch_size or get_setting("INGESTION_PUSH_BATCH", 256)
+    batch = []
+    with open(chunks_path, "r", encoding="utf-8") as chunks_file:
+        for line in chunks_file:
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+@st.cache_resource(show_spinner=False)
+def get_ingestion_executor() -> Optional[ProcessPoolExecutor]:
+    """
+        Returns:
+            The process-wide worker pool for parsing and chunking, or None
+            when INGESTION_WORKERS is 0 (everything runs inline)
+    """
+
+    workers = get_setting("INGESTION_WORKERS", os.cpu_count() or 1)
+    if workers <= 0:
+        return None
+
+    # Spawned, not forked: the server process holds gRPC and DB threads
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def ingest_files(uploaded_files: List, on_chunks: Optional[Callable[[Iterator[List[Dict]]], None]] = None,
+                 progress: Optional[Callable[[int, str, str, Optional[str]], None]] = None) -> Tuple[List[Dict], Dict[Tuple[str, str], List[Dict]]]:
+    """
+        Parse and chunk uploads in parallel, handing each file's chunks on
+        as soon as that file is ready.
+
+        Args:
+            uploaded_files: Streamlit uploaded files
+            on_chunks: Called once per finished file with an iterator over
+                its chunks in batches, e.g. to push them to the vector store
+                while other files are still parsing. The chunks are then
+                not kept, and not returned.
+            progress: Called with (upload index, filename, status, detail)
+                where status is "processing", "done" or "failed"; uploads
+                may share a filename, so displays key by the index
+
+        Returns:
+            tuple: Knowledge base entries in upload order, and, without
+            on_chunks, the chunks of each successfully processed file keyed
+            by (filename, content_hash)
+    """
+
+    def report(i, status, detail=None):
+        if progress:
+            progress(i, uploaded_files[i].name, status, detail)
+
+    executor = get_ingestion_executor()
+    results = {}
+    chunks_by_file = {}
+    # Each file's chunks are spooled here between the worker and on_chunks
+    spool_dir = tempfile.mkdtemp(prefix="ingest_")
+
+    def chunks_path(i):
+        return os.path.join(spool_dir, f"{i:04d}.jsonl")
+
+    def finish(i, file_item):
+        results[i] = file_item
+        if on_chunks:
+            if file_item['chunk_count']:
+                on_chunks(iter_chunk_batches(chunks_path(i)))
+        else:
+            key = (file_item['filename'], file_item['content_hash'])
+            chunks_by_file[key] = [chunk for batch in iter_chunk_batches(chunks_path(i)) for chunk in batch]
+        os.remove(chunks_path(i))
+        report(i, "done", f"{file_item['chunk_count']} chunks")
+
+    try:
+        if executor is None:
+            for i, uploaded_file in enumerate(uploaded_files):
+                report(i, "processing")
+                try:
+                    file_item = process_upload(uploaded_file.name, uploaded_file.type, uploaded_file.getvalue(), chunks_path(i))
+                except Exception as e:
+                    report(i, "failed", str(e))
+                    continue
+                finish(i, file_item)
+        else:
+            futures = {}
+            for i, uploaded_file in enumerate(uploaded_files):
+                report(i, "processing")
+                future = executor.submit(
+                    process_upload, uploaded_file.name, uploaded_file.type, uploaded_file.getvalue(), chunks_path(i)
+                )
+                futures[future] = i
+
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    file_item = future.result()
+                except Exception as e:
+                    report(i, "failed", str(e))
+                    continue
+                finish(i, file_item)
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    knowledge_base = [results[i] for i in range(len(uploaded_files)) if i in results]
+    return knowledge_base, chunks_by_file
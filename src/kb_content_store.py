@@ -0,0 +1,65 @@
+import os
+from typing import Dict, List, Optional
+import streamlit as st
+from .utils.get_base_path import get_base_path
+from .utils.hashing import content_hash
+from .utils.settings import get_setting
+
+
+class KnowledgeBaseContentStore:
+    """
+        Content-addressed files holding the extracted text of knowledge-base
+        files when no database is available, so session state only ever
+        keeps file metadata. Identical files are stored once.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, file_hash: str) -> str:
+        return os.path.join(self.path, f"{file_hash}.txt")
+
+    def put(self, content: str) -> str:
+        """
+            Returns:
+                str: The content hash to fetch it by
+        """
+
+        file_hash = content_hash(content)
+        path = self._file(file_hash)
+        if not os.path.exists(path):
+            with open(path + ".tmp", "w", encoding="utf-8") as content_file:
+                content_file.write(content)
+            os.replace(path + ".tmp", path)
+        return file_hash
+
+    def get(self, file_hash: str) -> Optional[str]:
+        try:
+            with open(self._file(file_hash), "r", encoding="utf-8") as content_file:
+                return content_file.read()
+        except FileNotFoundError:
+            return None
+
+    def strip_content(self, knowledge_base: List[Dict]) -> List[Dict]:
+        """
+            Store the content of each file and return its metadata only.
+        """
+
+        metadata = []
+        for item in knowledge_base:
+            item = dict(item)
+            if 'content' in item:
+                content = item.pop('content') or ''
+                item['size'] = len(content)
+                item['content_hash'] = self.put(content)
+            metadata.append(item)
+        return metadata
+
+
+@st.cache_resource(show_spinner=False)
+def get_kb_content_store() -> KnowledgeBaseContentStore:
+    return KnowledgeBaseContentStore(get_setting(
+        "KB_CONTENT_PATH",
+        os.path.join(get_base_path(), "src", "data", "kb_content")
+    ))
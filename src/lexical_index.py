@@ -0,0 +1,288 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import streamlit as st
+from .utils.get_base_path import get_base_path
+from .utils.hashing import content_hash
+from .utils.settings import get_setting
+
+# Words plus identifiers such as "ERR-1042", "v2.3.1" or "part_no"
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+        Lowercased terms of a text. Compound identifiers are kept whole and
+        also split into their parts, so "ERR-1042" matches both "err-1042"
+        and "1042".
+    """
+
+    terms = []
+    for match in _TOKEN.finditer(text.lower()):
+        term = match.group()
+        terms.append(term)
+        if not term.isalnum():
+            terms.extend(part for part in re.split(r"[-_./]", term) if part)
+    return terms
+
+
+class LexicalIndex:
+    """
+        BM25 inverted index over one chatbot's chunks.
+
+        Each document keeps its term frequencies and the fields returned
+        with search results, so lexical-only hits need no round trip to the
+        vector store.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents: Dict[str, Dict] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+
+    @staticmethod
+    def document(text: str, payload: Dict) -> Dict:
+        frequencies = Counter(tokenize(text))
+        return {"terms": dict(frequencies), "length": sum(frequencies.values()), "payload": payload}
+
+    def add(self, object_id: str, text: str, payload: Dict):
+        self.add_document(object_id, self.document(text, payload))
+
+    def add_document(self, object_id: str, document: Dict):
+        self.remove([object_id])
+
+        self.documents[object_id] = document
+        self.total_length += document["length"]
+        for term, frequency in document["terms"].items():
+            self.postings.setdefault(term, {})[object_id] = frequency
+
+    def remove(self, object_ids: List[str]):
+        for object_id in object_ids:
+            document = self.documents.pop(object_id, None)
+            if document is None:
+                continue
+            self.total_length -= document["length"]
+            for term in document["terms"]:
+                posting = self.postings.get(term)
+                if posting is not None:
+                    posting.pop(object_id, None)
+                    if not posting:
+                        del self.postings[term]
+
+    def update_payload(self, object_id: str, fields: Dict):
+        document = self.documents.get(object_id)
+        if document is not None:
+            document["payload"].update(fields)
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float, Dict]]:
+        """
+            Returns:
+                List of (object ID, BM25 score, payload), best first
+        """
+
+        count = len(self.documents)
+        if not count or limit <= 0:
+            return []
+
+        average_length = self.total_length / count or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for object_id, frequency in posting.items():
+                length = self.documents[object_id]["length"]
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                scores[object_id] = scores.get(object_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(object_id, score, self.documents[object_id]["payload"]) for object_id, score in best]
+
+    def to_dict(self) -> Dict:
+        return {"documents": self.documents}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LexicalIndex":
+        index = cls()
+        for object_id, document in data.get("documents", {}).items():
+            index.add_document(object_id, document)
+        return index
+
+    def apply(self, change: Dict):
+        """Replay one journaled change, as written by LexicalIndexStore."""
+
+        if change["op"] == "add":
+            for object_id, document in change["documents"].items():
+                self.add_document(object_id, document)
+        elif change["op"] == "remove":
+            self.remove(change["ids"])
+        elif change["op"] == "update":
+            for object_id, fields in change["fields"].items():
+                self.update_payload(object_id, fields)
+
+
+class LexicalIndexStore:
+    """
+        Process-wide set of per-chatbot lexical indexes, loaded lazily.
+
+        Each chatbot has a JSON snapshot and a journal of the changes made
+        since, one JSON line per change, so a per-file push appends its own
+        documents instead of rewriting the whole index. The snapshot is
+        rewritten once the journal outgrows it. An index is reloaded when
+        its files change on disk, e.g. when another process writes them.
+    """
+
+    def __init__(self, path: str, min_compact_bytes: int = 1 << 20):
+        self.path = path
+        self.min_compact_bytes = min_compact_bytes
+        self._indexes: Dict[str, LexicalIndex] = {}
+        # (snapshot mtime, journal size) each cached index was read or written at
+        self._versions: Dict[str, Tuple] = {}
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, chatbot_name: str) -> str:
+        return os.path.join(self.path, f"{content_hash(chatbot_name)[:32]}.json")
+
+    def _journal(self, chatbot_name: str) -> str:
+        return self._file(chatbot_name)[:-len(".json")] + ".log"
+
+    def _version(self, chatbot_name: str) -> Tuple:
+        def stat(path):
+            try:
+                return os.stat(path)
+            except FileNotFoundError:
+                return None
+
+        snapshot = stat(self._file(chatbot_name))
+        journal = stat(self._journal(chatbot_name))
+        return (snapshot.st_mtime_ns if snapshot else None, journal.st_size if journal else 0)
+
+    def _get(self, chatbot_name: str) -> Optional[LexicalIndex]:
+        version = self._version(chatbot_name)
+        if chatbot_name in self._indexes and self._versions.get(chatbot_name) == version:
+            return self._indexes[chatbot_name]
+
+        index = None
+        if version[0] is not None:
+            with open(self._file(chatbot_name), "r", encoding="utf-8") as index_file:
+                index = LexicalIndex.from_dict(json.load(index_file))
+        if version[1]:
+            index = index or LexicalIndex()
+            with open(self._journal(chatbot_name), "r", encoding="utf-8") as journal:
+                for line in journal:
+                    # A line cut short by a crash is the last one; skip it
+                    try:
+                        change = json.loads(line)
+                    except ValueError:
+                        continue
+                    index.apply(change)
+
+        if index is None:
+            self._indexes.pop(chatbot_name, None)
+            self._versions.pop(chatbot_name, None)
+        else:
+            self._indexes[chatbot_name] = index
+            self._versions[chatbot_name] = version
+        return index
+
+    def _compact(self, chatbot_name: str, index: LexicalIndex):
+        path = self._file(chatbot_name)
+        with open(path + ".tmp", "w", encoding="utf-8") as index_file:
+            json.dump({"name": chatbot_name, **index.to_dict()}, index_file)
+        os.replace(path + ".tmp", path)
+        if os.path.exists(self._journal(chatbot_name)):
+            os.remove(self._journal(chatbot_name))
+
+    def _write(self, chatbot_name: str, index: LexicalIndex, change: Dict):
+        """Journal a change already applied to the cached index."""
+
+        with open(self._journal(chatbot_name), "a", encoding="utf-8") as journal:
+            journal.write(json.dumps(change) + "\n")
+
+        snapshot, journal_size = self._version(chatbot_name)
+        snapshot_size = os.path.getsize(self._file(chatbot_name)) if snapshot is not None else 0
+        if journal_size > max(snapshot_size, self.min_compact_bytes):
+            self._compact(chatbot_name, index)
+
+        self._indexes[chatbot_name] = index
+        self._versions[chatbot_name] = self._version(chatbot_name)
+
+    def add(self, chatbot_name: str, documents: Dict[str, Tuple[str, Dict]]):
+        """
+            Args:
+                chatbot_name: Name of the chatbot
+                documents: (text, payload) of each chunk, keyed by object ID
+        """
+
+        if not documents:
+            return
+
+        with self._lock:
+            index = self._get(chatbot_name) or LexicalIndex()
+            added = {
+                object_id: LexicalIndex.document(text, payload)
+                for object_id, (text, payload) in documents.items()
+            }
+            for object_id, document in added.items():
+                index.add_document(object_id, document)
+            self._write(chatbot_name, index, {"op": "add", "documents": added})
+
+    def remove(self, chatbot_name: str, object_ids: List[str]):
+        with self._lock:
+            index = self._get(chatbot_name)
+            if index is not None and object_ids:
+                index.remove(object_ids)
+                self._write(chatbot_name, index, {"op": "remove", "ids": list(object_ids)})
+
+    def update_payloads(self, chatbot_name: str, fields: Dict[str, Dict]):
+        with self._lock:
+            index = self._get(chatbot_name)
+            if index is not None and fields:
+                for object_id, values in fields.items():
+                    index.update_payload(object_id, values)
+                self._write(chatbot_name, index, {"op": "update", "fields": fields})
+
+    def search(self, chatbot_name: str, query: str, limit: int) -> List[Tuple[str, float, Dict]]:
+        with self._lock:
+            index = self._get(chatbot_name)
+            return index.search(query, limit) if index is not None else []
+
+    def drop(self, chatbot_name: str):
+        with self._lock:
+            self._indexes.pop(chatbot_name, None)
+            self._versions.pop(chatbot_name, None)
+            for path in (self._file(chatbot_name), self._journal(chatbot_name)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+        Fuse several best-first rankings of object IDs. Only ranks are used,
+        so BM25 scores and cosine distances need no common scale.
+
+        Returns:
+            List of (object ID, fused score), best first
+    """
+
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, object_id in enumerate(ranking):
+            scores[object_id] = scores.get(object_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+@st.cache_resource(show_spinner=False)
+def get_lexical_index_store() -> LexicalIndexStore:
+    return LexicalIndexStore(get_setting(
+        "LEXICAL_INDEX_PATH",
+        os.path.join(get_base_path(), "src", "data", "lexical_index")
+    ))
@@ -0,0 +1,210 @@
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Tuple
+import streamlit as st
+from .database_manager import DatabaseManager, utcnow
+from .utils.metrics import increment_counter, record_metric
+from .utils.settings import get_setting
+
+
+class ChatMessageWriter:
+    """
+        Write-behind queue for chat messages.
+
+        Messages are queued in memory and written by a background thread in
+        group commits: one transaction per batch, flushed as soon as
+        batch_size messages are waiting or the oldest has waited
+        flush_interval seconds. Queued messages are visible through
+        pending(), so a session always reads its own writes; anything still
+        queued at shutdown is flushed by an atexit hook.
+
+        A failed flush keeps the batch queued and is retried. After
+        max_attempts failures in a row the batch is written one message at
+        a time, so a single row the database rejects cannot hold up the
+        rest: such a row is moved to dead_letters and counted. At most
+        max_pending messages are queued; beyond that new ones are dropped
+        and counted rather than growing memory during an outage.
+    """
+
+    def __init__(self, db, batch_size: int = 50, flush_interval: float = 0.5,
+                 max_attempts: int = 3, max_pending: int = 10000):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        # Messages the database rejected on their own, kept for inspection
+        self.dead_letters = deque(maxlen=100)
+        self._failures = 0
+        self._pending: List[Dict] = []
+        self._lock = threading.Lock()
+        # Held for a whole flush, so discard() can wait out an in-flight batch
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="chat-message-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, chatbot_name: str, user_message: str, bot_response: str):
+        message = {
+            'chatbot_name': chatbot_name,
+            'user': user_message,
+            'assistant': bot_response,
+            'created_at': utcnow(),
+            'queued_at': time.monotonic()
+        }
+        with self._lock:
+            dropped = len(self._pending) >= self.max_pending
+            if not dropped:
+                self._pending.append(message)
+            full = len(self._pending) >= self.batch_size
+        if dropped:
+            increment_counter("chat.messages_dropped")
+            print(f"Chat write queue full ({self.max_pending} messages), dropped a message for {chatbot_name}")
+        if full:
+            self._wake.set()
+
+    def pending(self, chatbot_name: str) -> List[Dict]:
+        """
+            Returns:
+                List[Dict]: Messages of a chatbot not yet written, oldest
+                first, shaped like stored history entries (with id None)
+        """
+
+        with self._lock:
+            return [{
+                'id': None,
+                'user': message['user'],
+                'assistant': message['assistant'],
+                'created_at': message['created_at']
+            } for message in self._pending if message['chatbot_name'] == chatbot_name]
+
+    def read_through(self, chatbot_name: str, read: Callable[[], Any]) -> Tuple[Any, List[Dict]]:
+        """
+            Read stored history together with the chatbot's queued messages,
+            without a flush moving a message between the two in the middle.
+
+            Args:
+                chatbot_name: Name of the chatbot
+                read: Loads the stored history
+
+            Returns:
+                tuple: read()'s result and the still-queued messages
+        """
+
+        if not self.pending(chatbot_name):
+            # Anything queued from here on is newer than this read
+            return read(), []
+        with self._flush_lock:
+            return read(), self.pending(chatbot_name)
+
+    def discard(self, chatbot_name: str):
+        """Drop a chatbot's queued messages, e.g. before its history is cleared."""
+
+        with self._flush_lock, self._lock:
+            self._pending = [message for message in self._pending if message['chatbot_name'] != chatbot_name]
+
+    def flush(self, split: bool = False):
+        """
+            Write everything queued so far. A failed batch stays queued and
+            the error is raised, unless it has failed max_attempts times or
+            split is set: then it is written message by message.
+        """
+
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[:self.batch_size]
+                if not batch:
+                    return
+
+                if split or self._failures >= self.max_attempts:
+                    self._save_one_by_one(batch)
+                    self._failures = 0
+                    continue
+
+                started = time.perf_counter()
+                try:
+                    self.db.save_chat_messages(batch)
+                except Exception:
+                    self._failures += 1
+                    raise
+                self._failures = 0
+                record_metric("chat.persist_batch", time.perf_counter() - started, size=len(batch))
+                increment_counter("chat.messages_persisted", len(batch))
+                self._pop(len(batch))
+
+    def _pop(self, count: int):
+        with self._lock:
+            # Only the writer removes from the front, so the batch is still there
+            del self._pending[:count]
+
+    def _save_one_by_one(self, batch: List[Dict]):
+        for message in batch:
+            try:
+                self.db.save_chat_messages([message])
+                increment_counter("chat.messages_persisted")
+            except Exception as e:
+                if not self.db.is_available():
+                    # An outage, not a bad row: keep the rest queued
+                    raise
+                self.dead_letters.append({**message, 'error': str(e)})
+                increment_counter("chat.messages_dead_lettered")
+                print(f"Dropped a chat message for {message['chatbot_name']} the database rejected: {e}")
+            self._pop(1)
+
+    def _due(self) -> bool:
+        with self._lock:
+            if not self._pending:
+                return False
+            waited = time.monotonic() - self._pending[0]['queued_at']
+            return len(self._pending) >= self.batch_size or waited >= self.flush_interval
+
+    def _run(self):
+        retry_delay = 0.0
+        while not self._closed:
+            self._wake.wait(max(self.flush_interval, retry_delay) / 2)
+            self._wake.clear()
+            if not self._due():
+                continue
+            try:
+                self.flush()
+                retry_delay = 0.0
+            except Exception as e:
+                increment_counter("chat.persist_failures")
+                print(f"Failed to persist chat messages, will retry: {e}")
+                retry_delay = min(max(retry_delay * 2, 1.0), 30.0)
+                time.sleep(retry_delay)
+
+    def close(self):
+        """Flush what is queued and stop the writer thread."""
+
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        try:
+            self.flush()
+        except Exception:
+            # No time left for retries; save what can be saved
+            try:
+                self.flush(split=True)
+            except Exception as e:
+                with self._lock:
+                    lost = len(self._pending)
+                print(f"Failed to persist {lost} chat messages on shutdown: {e}")
+
+
+@st.cache_resource(show_spinner=False)
+def get_message_writer() -> ChatMessageWriter:
+    return ChatMessageWriter(
+        DatabaseManager(),
+        batch_size=get_setting("CHAT_WRITE_BATCH_SIZE", 50),
+        flush_interval=get_setting("CHAT_WRITE_FLUSH_INTERVAL", 0.5),
+        max_attempts=get_setting("CHAT_WRITE_MAX_ATTEMPTS", 3),
+        max_pending=get_setting("CHAT_WRITE_MAX_PENDING", 10000)
+    )
@@ -0,0 +1,260 @@
+import json
+import os
+import shutil
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from .utils.hashing import content_hash
+from .vector_store import VectorStore
+
+
+class _Index:
+    """One chatbot's objects: IDs, properties and unit-length vectors, row-aligned."""
+
+    def __init__(self, ids: List[str], properties: List[Dict], vectors: np.ndarray, rows: Optional[Dict[str, int]] = None):
+        self.ids = ids
+        self.properties = properties
+        self.vectors = vectors
+        self.rows = rows if rows is not None else {object_id: row for row, object_id in enumerate(ids)}
+
+
+class NumpyVectorStore(VectorStore):
+    """
+        In-process vector store: one float32 matrix per chatbot, searched
+        with a single matrix-vector product.
+
+        With a path, each chatbot's index is persisted as raw float32 rows
+        in vectors.f32 plus one JSON line per row in objects.jsonl, and the
+        vectors are memory-mapped rather than copied into private memory;
+        a search still scans all of them. New objects are appended to both
+        files, while replacing or deleting objects rewrites them. Without a
+        path, indexes live in memory only. Intended for small knowledge
+        bases and offline runs.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._indexes: Dict[str, _Index] = {}
+        self._lock = threading.RLock()
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def _directory(self, chatbot_name: str) -> str:
+        # Hashed so any chatbot name is a safe directory name
+        return os.path.join(self.path, content_hash(chatbot_name)[:32])
+
+    def _load(self, chatbot_name: str) -> Optional[_Index]:
+        index = self._indexes.get(chatbot_name)
+        if index is not None or not self.path:
+            return index
+
+        directory = self._directory(chatbot_name)
+        objects_path = os.path.join(directory, "objects.jsonl")
+        if not os.path.exists(objects_path):
+            return None
+
+        ids, properties = [], []
+        torn = False
+        with open(objects_path, "r", encoding="utf-8") as objects_file:
+            dimensions = json.loads(objects_file.readline())["dimensions"]
+            for line in objects_file:
+                # A crash mid-append leaves at most one partial last line
+                if not line.endswith("\n"):
+                    torn = True
+                    break
+                stored = json.loads(line)
+                ids.append(stored["id"])
+                properties.append(stored["properties"])
+
+        index = _Index(ids, properties, self._map(directory, len(ids), dimensions))
+        if torn:
+            # Rewritten, so later appends start on a clean line
+            self._save(chatbot_name, index)
+        self._indexes[chatbot_name] = index
+        return index
+
+    def _map(self, directory: str, count: int, dimensions: int) -> np.ndarray:
+        """The first count rows of a chatbot's vectors file, mapped read-only."""
+
+        if not count:
+            return np.empty((0, dimensions), dtype=np.float32)
+        return np.memmap(os.path.join(directory, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dimensions))
+
+    def _save(self, chatbot_name: str, index: _Index):
+        """Replace a chatbot's index and rewrite its files."""
+
+        self._indexes[chatbot_name] = index
+        if not self.path:
+            return
+
+        directory = self._directory(chatbot_name)
+        os.makedirs(directory, exist_ok=True)
+        dimensions = index.vectors.shape[1] if index.vectors.ndim == 2 else 0
+
+        # Written aside and swapped in, so a crash never leaves half a file.
+        # The objects file is swapped last and fixes the row count, so extra
+        # rows left in the vectors file are ignored
+        vectors_path = os.path.join(directory, "vectors.f32")
+        with open(vectors_path + ".tmp", "wb") as vectors_file:
+            vectors_file.write(np.ascontiguousarray(index.vectors, dtype=np.float32).tobytes())
+        os.replace(vectors_path + ".tmp", vectors_path)
+
+        objects_path = os.path.join(directory, "objects.jsonl")
+        with open(objects_path + ".tmp", "w", encoding="utf-8") as objects_file:
+            objects_file.write(json.dumps({"name": chatbot_name, "dimensions": dimensions}) + "\n")
+            self._write_objects(objects_file, index.ids, index.properties)
+        os.replace(objects_path + ".tmp", objects_path)
+
+        # Serve searches from the mapped file rather than a private copy
+        index.vectors = self._map(directory, len(index.ids), dimensions)
+
+    def _append(self, chatbot_name: str, index: _Index, ids: List[str], properties: List[Dict], vectors: np.ndarray):
+        """Add new objects after a chatbot's existing rows without rewriting them."""
+
+        start = len(index.ids)
+        count = start + len(ids)
+        rows = dict(index.rows)
+        rows.update((object_id, start + offset) for offset, object_id in enumerate(ids))
+
+        if self.path:
+            directory = self._directory(chatbot_name)
+            with open(os.path.join(directory, "vectors.f32"), "r+b") as vectors_file:
+                # Past the last committed row, dropping any a crash left behind
+                vectors_file.seek(start * vectors.shape[1] * 4)
+                vectors_file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                vectors_file.truncate()
+            with open(os.path.join(directory, "objects.jsonl"), "a", encoding="utf-8") as objects_file:
+                self._write_objects(objects_file, ids, properties)
+            vectors_out = self._map(directory, count, vectors.shape[1])
+        else:
+            # Rows go into spare capacity; earlier snapshots only view rows before start
+            buffer = index.vectors.base
+            if not isinstance(buffer, np.ndarray) or buffer.ndim != 2 or buffer.shape[0] < count or buffer.shape[1] != vectors.shape[1]:
+                buffer = np.empty((max(count, 2 * start, 64), vectors.shape[1]), dtype=np.float32)
+                buffer[:start] = index.vectors
+            buffer[start:count] = vectors
+            vectors_out = buffer[:count]
+
+        self._indexes[chatbot_name] = _Index(index.ids + ids, index.properties + properties, vectors_out, rows)
+
+    @staticmethod
+    def _write_objects(objects_file, ids: List[str], properties: List[Dict]):
+        for object_id, object_properties in zip(ids, properties):
+            objects_file.write(json.dumps({"id": object_id, "properties": object_properties}) + "\n")
+
+    def exists(self, chatbot_name: str) -> bool:
+        with self._lock:
+            return self._load(chatbot_name) is not None
+
+    def create(self, chatbot_name: str):
+        with self._lock:
+            if self._load(chatbot_name) is None:
+                self._save(chatbot_name, _Index([], [], np.empty((0, 0), dtype=np.float32)))
+
+    def upsert(self, chatbot_name: str, objects: Dict[str, Dict], vectors: List[np.ndarray]):
+        if not objects:
+            return
+
+        new_vectors = np.asarray(vectors, dtype=np.float32).reshape(len(objects), -1)
+        norms = np.linalg.norm(new_vectors, axis=1, keepdims=True)
+        new_vectors /= np.where(norms == 0, 1.0, norms)
+
+        with self._lock:
+            index = self._load(chatbot_name)
+            if index is None:
+                index = _Index([], [], np.empty((0, 0), dtype=np.float32))
+
+            # Only new objects: appended, the common case while ingesting
+            if index.ids and index.vectors.shape[1] == new_vectors.shape[1] and not any(object_id in index.rows for object_id in objects):
+                self._append(chatbot_name, index, list(objects), list(objects.values()), new_vectors)
+                return
+
+            ids = list(index.ids)
+            properties = list(index.properties)
+            vectors_out = np.array(index.vectors) if len(ids) else np.empty((0, new_vectors.shape[1]), dtype=np.float32)
+
+            appended = []
+            for (object_id, object_properties), vector in zip(objects.items(), new_vectors):
+                row = index.rows.get(object_id)
+                if row is None:
+                    ids.append(object_id)
+                    properties.append(object_properties)
+                    appended.append(vector)
+                else:
+                    properties[row] = object_properties
+                    vectors_out[row] = vector
+
+            if appended:
+                vectors_out = np.vstack([vectors_out, np.stack(appended)])
+
+            self._save(chatbot_name, _Index(ids, properties, vectors_out))
+
+    def update(self, chatbot_name: str, object_id: str, properties: Dict):
+        with self._lock:
+            index = self._load(chatbot_name)
+            if index is None or object_id not in index.rows:
+                return
+
+            updated = list(index.properties)
+            row = index.rows[object_id]
+            updated[row] = {**updated[row], **properties}
+            self._save(chatbot_name, _Index(index.ids, updated, index.vectors))
+
+    def delete(self, chatbot_name: str, object_ids: Optional[List[str]] = None):
+        with self._lock:
+            if object_ids is None:
+                self._indexes.pop(chatbot_name, None)
+                if self.path:
+                    shutil.rmtree(self._directory(chatbot_name), ignore_errors=True)
+                return
+
+            index = self._load(chatbot_name)
+            if index is None:
+                return
+
+            removed = set(object_ids)
+            keep = [row for row, object_id in enumerate(index.ids) if object_id not in removed]
+            self._save(chatbot_name, _Index(
+                [index.ids[row] for row in keep],
+                [index.properties[row] for row in keep],
+                np.array(index.vectors[keep]) if keep else np.empty((0, 0), dtype=np.float32)
+            ))
+
+    def query(self, chatbot_name: str, vector: List[float], limit: int, include_vector: bool = False) -> List[Dict]:
+        with self._lock:
+            index = self._load(chatbot_name)
+        # Indexes are replaced, never mutated, so this snapshot stays consistent
+        if index is None or not index.ids or limit <= 0:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        similarities = index.vectors @ query
+        if limit < len(similarities):
+            top = np.argpartition(-similarities, limit - 1)[:limit]
+        else:
+            top = np.arange(len(similarities))
+        top = top[np.argsort(-similarities[top])]
+
+        # Cosine distance, as Weaviate reports it
+        results = [{**index.properties[row], "id": index.ids[row], "distance": float(1.0 - similarities[row])} for row in top]
+        if include_vector:
+            for result, row in zip(results, top):
+                result["vector"] = index.vectors[row]
+        return results
+
+    def list_objects(self, chatbot_name: str) -> Dict[str, Dict]:
+        with self._lock:
+            index = self._load(chatbot_name)
+        if index is None:
+            return {}
+
+        return {
+            object_id: {
+                "filename": properties.get("filename"),
+                "file_hash": properties.get("file_hash"),
+                "chunk_index": properties.get("chunk_index")
+            }
+            for object_id, properties in zip(index.ids, index.properties)
+        }
@@ -1,6 +1,7 @@
 import streamlit as st 
-from .forms import create_chatbot_form, edit_chatbot_form
+from .forms import create_chatbot_form, edit_chatbot_form, show_ingestion_job
 from .chat_interface import ChatInterface
+from .utils.metrics import metrics
 
 def show_home_page():
     """
@@ -17,19 +18,19 @@ def show_home_page():
             st.rerun()
     
     # Show existing chatbots
-    chatbots = st.session_state.chatbot_manager.get_chatbot_list()
+    chatbots = st.session_state.chatbot_manager.get_chatbot_summaries()
     
     if chatbots:
         st.subheader("Your Chatbots")
         
         cols = st.columns(min(3, len(chatbots)))
-        for i, chatbot_name in enumerate(chatbots):
+        for i, chatbot_summary in enumerate(chatbots):
+            chatbot_name = chatbot_summary['name']
             with cols[i % 3]:
                 with st.container():
                     st.write(f"**{chatbot_name}**")
-                    chatbot_data = st.session_state.chatbot_manager.get_chatbot(chatbot_name)
-                    st.write(f"System Prompt: {chatbot_data['system_prompt'][:100]}...")
-                    st.write(f"Knowledge Base: {len(chatbot_data['knowledge_base'])} files")
+                    st.write(f"System Prompt: {chatbot_summary['prompt_preview']}...")
+                    st.write(f"Knowledge Base: {chatbot_summary['file_count']} files")
                     
                     col1, col2 = st.columns(2)
                     with col1:
@@ -51,11 +52,32 @@ def show_create_chatbot_page():
 
     st.title("Create New Chatbot")
 
-    create_chatbot_form()
+    job_id = st.session_state.get('ingestion_job')
+    if job_id is not None:
+        # Just created; its files are being indexed in the background
+        chatbot_name = st.session_state.ingestion_chatbot
+        st.success(f"Chatbot '{chatbot_name}' created successfully!")
+        show_ingestion_job(st.session_state.chatbot_manager.get_ingestion_job(job_id))
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("💬 Open Chatbot", type="primary"):
+                del st.session_state['ingestion_job']
+                st.session_state.current_page = 'chat'
+                st.session_state.selected_chatbot = chatbot_name
+                st.query_params.chatbot = chatbot_name
+                st.rerun()
+        with col2:
+            if st.button("➕ Create Another"):
+                del st.session_state['ingestion_job']
+                st.rerun()
+    else:
+        create_chatbot_form()
 
     # Back to home button
     if st.button("← Back to Home"):
         st.session_state.current_page = 'home'
+        st.session_state.pop('ingestion_job', None)
         st.rerun()
 
 def show_edit_chatbot_page():
@@ -113,4 +135,34 @@ def show_chat_page():
     
     # Initialize chat interface
     chat_interface = ChatInterface(chatbot_data)
-    chat_interface.render()
\ No newline at end of file
+    chat_interface.render()
+
+
+def show_metrics_panel():
+    """
+        Sidebar panel of this server's recent performance: response
+        latencies, cache hit rates and session memory
+    """
+
+    report = metrics.report()
+
+    with st.expander("📊 Performance"):
+        ttft = report["latencies"]["chat.ttft"]
+        col1, col2 = st.columns(2)
+        col1.metric("First token p50", f"{ttft['p50']:.2f}s" if ttft else "–")
+        col2.metric("First token p95", f"{ttft['p95']:.2f}s" if ttft else "–")
+
+        results = report["caches"]["retrieval.result_cache"]
+        memory = report["session_memory_bytes"]
+        col1, col2 = st.columns(2)
+        col1.metric("Retrieval cache hits", f"{results['hit_rate']:.0%}" if results["hit_rate"] is not None else "–")
+        col2.metric("Session memory max", f"{memory['max'] / 1e6:.1f} MB" if memory else "–")
+
+        for name, summary in report["latencies"].items():
+            if summary:
+                st.caption(f"{name}: p50 {summary['p50']:.2f}s · p95 {summary['p95']:.2f}s · n={summary['count']}")
+        for name, stats in report["caches"].items():
+            st.caption(f"{name}: {stats['hits']} hits · {stats['misses']} misses")
+        for name, count in report["counters"].items():
+            if count:
+                st.caption(f"{name}: {count}")
\ No newline at end of file
@@ -0,0 +1,241 @@
+import atexit
+import threading
+import time
+import streamlit as st
+import weaviate
+from weaviate.classes.init import Auth, AdditionalConfig, Timeout
+from openai import OpenAI, DefaultHttpxClient
+import httpx
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from .utils.settings import get_setting
+
+
+# Process-wide registry of live clients so they can be closed on shutdown
+_open_resources = {}
+_resources_lock = threading.Lock()
+
+# Time of the last successful health check per resource
+_last_health_check = {}
+
+
+def _register(name: str, resource, close):
+    with _resources_lock:
+        _open_resources[name] = (resource, close)
+        _last_health_check[name] = time.monotonic()
+
+
+def _release(name: str, resource):
+    """Close a resource that failed its health check."""
+
+    with _resources_lock:
+        entry = _open_resources.get(name)
+        if entry and entry[0] is resource:
+            del _open_resources[name]
+        else:
+            entry = None
+
+    if entry:
+        try:
+            entry[1]()
+        except Exception as e:
+            print(f"Failed to close {name}: {e}")
+
+
+def _health_check_due(name: str) -> bool:
+    """
+        Remote health checks cost a round-trip, so they only run every
+        HEALTH_CHECK_INTERVAL seconds; in between a cheap local check is used.
+    """
+
+    interval = get_setting("HEALTH_CHECK_INTERVAL", 30.0)
+    return time.monotonic() - _last_health_check.get(name, 0.0) >= interval
+
+
+def _mark_healthy(name: str):
+    _last_health_check[name] = time.monotonic()
+
+
+def _validate_db_engine(engine) -> bool:
+    if not _health_check_due("db_engine"):
+        return True
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        _mark_healthy("db_engine")
+        return True
+    except Exception as e:
+        print(f"Database health check failed, reconnecting: {e}")
+        _release("db_engine", engine)
+        return False
+
+
+def _is_sqlite_memory(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _engine_options(url) -> dict:
+    """
+        Pool settings for the process-wide engine. Every Streamlit session
+        and background worker borrows from this one pool, one connection per
+        operation, so it is sized for concurrent operations, not users.
+    """
+
+    if url.get_backend_name() != "sqlite":
+        return {
+            "pool_pre_ping": True,
+            "pool_recycle": get_setting("DB_POOL_RECYCLE", 500),
+            "pool_size": get_setting("DB_POOL_SIZE", 5),
+            "max_overflow": get_setting("DB_MAX_OVERFLOW", 10),
+            "pool_timeout": get_setting("DB_POOL_TIMEOUT", 30),
+            # Reuse the most recent connection so idle extras age out
+            "pool_use_lifo": True
+        }
+
+    # SQLite connections are used from several threads; waits on the
+    # database lock are bounded by the driver's busy timeout
+    options = {
+        "connect_args": {
+            "check_same_thread": False,
+            "timeout": get_setting("DB_SQLITE_BUSY_TIMEOUT", 30)
+        }
+    }
+    if _is_sqlite_memory(url):
+        # An in-memory database lives and dies with its connection: keep
+        # exactly one, and hand it to one operation at a time
+        options.update(poolclass=QueuePool, pool_size=1, max_overflow=0)
+    else:
+        options["pool_size"] = get_setting("DB_POOL_SIZE", 5)
+        options["max_overflow"] = get_setting("DB_MAX_OVERFLOW", 10)
+        options["pool_timeout"] = get_setting("DB_POOL_TIMEOUT", 30)
+    return options
+
+
+def _enable_sqlite_wal(dbapi_connection, _):
+    # Readers no longer block behind a writer
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+@st.cache_resource(show_spinner=False, validate=_validate_db_engine)
+def get_db_engine():
+    """
+        Returns:
+            The process-wide SQLAlchemy engine. The schema is created once,
+            when the engine is first built.
+    """
+
+    # Imported here to avoid a circular import with database_manager
+    from .database_manager import Base, migrate_schema
+
+    database_url = get_setting("DATABASE_URL")
+    if not database_url:
+        raise Exception("DATABASE_URL environment variable not found")
+
+    url = make_url(database_url)
+    engine = create_engine(url, **_engine_options(url))
+    if url.get_backend_name() == "sqlite" and not _is_sqlite_memory(url):
+        event.listen(engine, "connect", _enable_sqlite_wal)
+
+    Base.metadata.create_all(engine)
+    migrate_schema(engine)
+
+    _register("db_engine", engine, engine.dispose)
+    return engine
+
+
+def _validate_weaviate_client(client) -> bool:
+    try:
+        if not client.is_connected():
+            raise Exception("client is not connected")
+        if _health_check_due("weaviate_client"):
+            if not client.is_ready():
+                raise Exception("cluster is not ready")
+            _mark_healthy("weaviate_client")
+        return True
+    except Exception as e:
+        print(f"Weaviate health check failed, reconnecting: {e}")
+        _release("weaviate_client", client)
+        return False
+
+
+@st.cache_resource(show_spinner=False, validate=_validate_weaviate_client)
+def get_weaviate_client():
+    """
+        Returns:
+            The process-wide Weaviate Cloud client
+    """
+
+    client = weaviate.connect_to_weaviate_cloud(
+        cluster_url = get_setting("WEAVIATE_URL"),
+        auth_credentials = Auth.api_key(get_setting("WEAVIATE_API_KEY")),
+        headers = {
+            "X-OpenAI-api-key" : get_setting("OPENAI_API_KEY")
+        },
+        additional_config = AdditionalConfig(
+            timeout=Timeout(
+                init=get_setting("WEAVIATE_INIT_TIMEOUT", 10),
+                query=get_setting("WEAVIATE_QUERY_TIMEOUT", 30),
+                insert=get_setting("WEAVIATE_INSERT_TIMEOUT", 120)
+            )
+        )
+    )
+
+    _register("weaviate_client", client, client.close)
+    return client
+
+
+def _validate_openai_client(client) -> bool:
+    if client.is_closed():
+        _release("openai_client", client)
+        return False
+    return True
+
+
+@st.cache_resource(show_spinner=False, validate=_validate_openai_client)
+def get_openai_client():
+    """
+        Returns:
+            The process-wide OpenAI client, backed by a keep-alive
+            httpx connection pool
+    """
+
+    api_key = get_setting("OPENAI_API_KEY")
+    if not api_key:
+        raise Exception("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
+
+    http_client = DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=get_setting("OPENAI_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=get_setting("OPENAI_MAX_KEEPALIVE", 10),
+            keepalive_expiry=get_setting("OPENAI_KEEPALIVE_EXPIRY", 60.0)
+        )
+    )
+
+    client = OpenAI(api_key=api_key, http_client=http_client)
+
+    _register("openai_client", client, client.close)
+    return client
+
+
+def close_all_resources():
+    """
+        Close every shared client. Registered with atexit so connections
+        are released cleanly when the server process stops.
+    """
+
+    with _resources_lock:
+        entries = list(_open_resources.items())
+        _open_resources.clear()
+
+    for name, (_, close) in entries:
+        try:
+            close()
+        except Exception as e:
+            print(f"Failed to close {name}: {e}")
+
+
+atexit.register(close_all_resources)
@@ -0,0 +1,218 @@
+import asyncio
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Dict, Iterator, List, Optional, Tuple, Union
+import httpx
+import streamlit as st
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from .context_assembler import ContextAssembler
+from .utils.get_base_path import get_base_path
+from .utils.metrics import increment_counter, record_metric
+from .utils.settings import get_setting
+
+# Used when the prompt template cannot be read in time
+_FALLBACK_TEMPLATE = "{{user_query}}\n\nRelevant information:\n{{relevant_chunks}}"
+
+_END = object()
+
+
+class ResponsePipeline:
+    """
+        Asyncio request path for chat turns, run on a dedicated event-loop
+        thread so the Streamlit script thread only waits on results.
+
+        The independent stages of a turn (retrieval, history, prompt
+        template) run concurrently, each under its own timeout; a stage
+        that fails or times out degrades to an empty result instead of
+        failing the turn. Generation uses the async OpenAI client and
+        streamed tokens are handed back through a queue.
+    """
+
+    def __init__(self, api_key: str, timeouts: Dict[str, float]):
+        self.timeouts = timeouts
+        self._template = None
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="response-pipeline", daemon=True)
+        self._thread.start()
+
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=get_setting("OPENAI_MAX_CONNECTIONS", 20),
+                    max_keepalive_connections=get_setting("OPENAI_MAX_KEEPALIVE", 10),
+                    keepalive_expiry=get_setting("OPENAI_KEEPALIVE_EXPIRY", 60.0)
+                )
+            )
+        )
+        atexit.register(self.close)
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """Schedule a coroutine on the pipeline's loop from any thread."""
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def run_in_background(self, function: Callable, *args) -> Future:
+        """Run a blocking function off the script thread, e.g. a DB load."""
+
+        async def call():
+            return await asyncio.to_thread(function, *args)
+
+        return self.submit(call())
+
+    def _load_template_file(self) -> str:
+        path = os.path.join(get_base_path(), "src", "data", "prompt.txt")
+        # Re-read only when the file changes
+        modified = os.path.getmtime(path)
+        if self._template is None or self._template[0] != modified:
+            with open(path, "r") as prompt_file:
+                self._template = (modified, prompt_file.read())
+        return self._template[1]
+
+    async def _stage(self, name: str, awaitable, fallback, degraded: List[str]):
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.timeouts[name])
+        except Exception as e:
+            increment_counter(f"pipeline.{name}_failures")
+            print(f"Response pipeline stage {name} failed: {type(e).__name__}: {e}")
+            degraded.append(name)
+            return fallback
+        finally:
+            record_metric(f"pipeline.{name}", time.perf_counter() - started)
+
+    async def prepare(self, chatbot_name: str, system_prompt: str, user_message: str,
+                      history: Union[List[Dict], Future], retrieve: Callable[[], List[Dict]],
+                      assembler: ContextAssembler) -> Tuple[List[Dict], Dict]:
+        """
+            Run retrieval, history and template loading concurrently, then
+            assemble the messages.
+
+            Args:
+                chatbot_name: Name of the chatbot
+                system_prompt: The chatbot's system prompt
+                user_message: The current question
+                history: Previous exchanges, or a Future still loading them
+                retrieve: Blocking retrieval call, run in a worker thread
+                assembler: Fits everything into the token budget
+
+            Returns:
+                tuple: The messages and the assembler's report, with the
+                names of the stages that fell back under "degraded"
+        """
+
+        started = time.perf_counter()
+
+        async def load_history():
+            if isinstance(history, Future):
+                return (await asyncio.wrap_future(history))['messages']
+            return history
+
+        degraded = []
+        chunks, turns, template = await asyncio.gather(
+            self._stage("retrieval", asyncio.to_thread(retrieve), [], degraded),
+            self._stage("history", load_history(), [], degraded),
+            self._stage("template", asyncio.to_thread(self._load_template_file), _FALLBACK_TEMPLATE, degraded)
+        )
+        messages, report = assembler.assemble(system_prompt, turns, chunks, user_message, template)
+        report["degraded"] = degraded
+
+        record_metric("pipeline.prepare", time.perf_counter() - started, chatbot=chatbot_name)
+        return messages, report
+
+    async def _prepared(self, prepared: Union[Coroutine, Future]) -> Tuple[List[Dict], Dict]:
+        # A Future is a prepare() submitted early, e.g. while history loads
+        if isinstance(prepared, Future):
+            return await asyncio.wrap_future(prepared)
+        return await prepared
+
+    async def _complete(self, prepared: Union[Coroutine, Future], **completion) -> Tuple[str, Dict]:
+        messages, report = await self._prepared(prepared)
+        response = await self.client.chat.completions.create(messages=messages, **completion)
+        return response.choices[0].message.content, report
+
+    async def _stream(self, prepared: Union[Coroutine, Future], tokens: queue.Queue, **completion):
+        try:
+            messages, report = await self._prepared(prepared)
+            tokens.put(("report", report))
+            stream = await self.client.chat.completions.create(messages=messages, stream=True, **completion)
+            # Closes the response if the task is cancelled mid-stream
+            async with stream:
+                async for event in stream:
+                    if event.choices and event.choices[0].delta.content:
+                        tokens.put(("token", event.choices[0].delta.content))
+        except Exception as e:
+            tokens.put(("error", e))
+        finally:
+            tokens.put(("end", _END))
+
+    def generate(self, prepared: Union[Coroutine, Future], **completion) -> Tuple[str, Dict]:
+        """
+            Args:
+                prepared: A prepare() coroutine, or the Future of one
+                    already submitted
+
+            Returns:
+                tuple: The full response text and the context report
+        """
+
+        return self.submit(self._complete(prepared, **completion)).result()
+
+    def stream(self, prepared: Union[Coroutine, Future], on_report: Optional[Callable[[Dict], Any]] = None, **completion) -> Iterator[str]:
+        """
+            Stream a response into the calling thread. Closing the
+            generator early cancels the completion.
+
+            Yields:
+                str: Text deltas as they arrive
+        """
+
+        tokens = queue.Queue()
+        streaming = self.submit(self._stream(prepared, tokens, **completion))
+        try:
+            while True:
+                kind, value = tokens.get()
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise value
+                if kind == "report":
+                    if on_report:
+                        on_report(value)
+                    continue
+                yield value
+        finally:
+            # Stops the completion when the caller stops reading early
+            streaming.cancel()
+
+    def close(self):
+        if self._loop.is_running():
+            try:
+                self.submit(self.client.close()).result(timeout=5)
+            except Exception as e:
+                print(f"Failed to close async OpenAI client: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+
+@st.cache_resource(show_spinner=False)
+def get_response_pipeline() -> ResponsePipeline:
+    """
+        Returns:
+            The process-wide response pipeline and its event-loop thread
+    """
+
+    api_key = get_setting("OPENAI_API_KEY")
+    if not api_key:
+        raise Exception("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
+
+    return ResponsePipeline(api_key, timeouts={
+        "retrieval": get_setting("PIPELINE_RETRIEVAL_TIMEOUT", 10.0),
+        "history": get_setting("PIPELINE_HISTORY_TIMEOUT", 5.0),
+        "template": get_setting("PIPELINE_TEMPLATE_TIMEOUT", 2.0)
+    })
@@ -0,0 +1,61 @@
+import re
+import threading
+from typing import Dict
+import streamlit as st
+from .utils.settings import get_setting
+from .utils.ttl_cache import TTLCache
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def collapse_whitespace(query: str) -> str:
+    """A query with each run of whitespace replaced by one space, trimmed."""
+
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used as cache key."""
+
+    return collapse_whitespace(query).lower()
+
+
+class RetrievalCache:
+    """
+        Process-wide caches for the retrieval path: query embeddings and
+        retrieval results.
+
+        Result keys include a per-chatbot knowledge-base version that is
+        bumped whenever the chatbot's objects change, so stale results are
+        never served after an update in this process. The TTL bounds
+        staleness for updates made by other processes.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.embeddings = TTLCache("retrieval.embedding_cache", maxsize=maxsize, ttl=ttl)
+        self.results = TTLCache("retrieval.result_cache", maxsize=maxsize, ttl=ttl)
+        self._kb_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def kb_version(self, chatbot_name: str) -> int:
+        with self._lock:
+            return self._kb_versions.get(chatbot_name, 0)
+
+    def bump_kb_version(self, chatbot_name: str):
+        with self._lock:
+            self._kb_versions[chatbot_name] = self._kb_versions.get(chatbot_name, 0) + 1
+
+    def stats(self) -> Dict:
+        return {
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats()
+        }
+
+
+@st.cache_resource(show_spinner=False)
+def get_retrieval_cache() -> RetrievalCache:
+    return RetrievalCache(
+        maxsize=get_setting("RETRIEVAL_CACHE_SIZE", 2048),
+        ttl=get_setting("RETRIEVAL_CACHE_TTL", 900.0)
+    )
@@ -0,0 +1,174 @@
+from typing import Dict, List, Optional
+import numpy as np
+
+
+def strip_overlap(previous: str, following: str, max_overlap: int = 400) -> str:
+    """
+        Remove from the start of following the longest text that previous
+        ends with (the splitter's chunk overlap), so adjacent chunks can be
+        joined without repeating it.
+    """
+
+    for size in range(min(len(previous), len(following), max_overlap), 0, -1):
+        if previous.endswith(following[:size]):
+            return following[size:]
+    return following
+
+
+def adjacent_runs(hits: List[Dict]) -> List[List[int]]:
+    """
+        Group hits that are consecutive chunks of the same file.
+
+        Args:
+            hits: Retrieved chunks, best first
+
+        Returns:
+            List[List[int]]: Positions in hits of each run's chunks, in file
+            order; runs are ordered by their best member
+    """
+
+    runs = {}
+    by_file = {}
+    for rank, hit in enumerate(hits):
+        if hit.get("filename") is None or hit.get("chunk_index") is None:
+            runs[rank] = [rank]
+        else:
+            by_file.setdefault(hit["filename"], []).append(rank)
+
+    for file_ranks in by_file.values():
+        file_ranks.sort(key=lambda rank: hits[rank]["chunk_index"])
+        run = [file_ranks[0]]
+        for rank in file_ranks[1:]:
+            if hits[rank]["chunk_index"] == hits[run[-1]]["chunk_index"] + 1:
+                run.append(rank)
+            else:
+                runs[min(run)] = run
+                run = [rank]
+        runs[min(run)] = run
+
+    return [runs[rank] for rank in sorted(runs)]
+
+
+def merge_run(hits: List[Dict], run: List[int]) -> Dict:
+    """
+        Join one run of adjacent_runs into a passage, without the text the
+        chunks share. The passage takes the rank and fields of its best
+        member, and lists the "chunk_indexes" it spans.
+    """
+
+    members = [hits[rank] for rank in run]
+    if len(members) == 1:
+        return {**members[0], "chunk_indexes": [members[0].get("chunk_index")]}
+
+    content = members[0]["content"]
+    for hit in members[1:]:
+        content += strip_overlap(content, hit["content"])
+    distances = [hit["distance"] for hit in members if hit.get("distance") is not None]
+    pages = [hit["page_start"] for hit in members if hit.get("page_start") is not None]
+    return {
+        **hits[min(run)],
+        "content": content,
+        "chunk_index": members[0]["chunk_index"],
+        "chunk_indexes": [hit["chunk_index"] for hit in members],
+        "page_start": min(pages) if pages else None,
+        "section": members[0].get("section"),
+        # Recounted by the context assembler
+        "token_count": None,
+        "distance": min(distances) if distances else None
+    }
+
+
+class RetrievalPostProcessor:
+    """
+        Trims retrieved candidates before they reach the prompt:
+
+        1. distance cutoff: vector hits farther than max_distance are dropped;
+           lexical-only hits (no distance) are kept, they matched exact terms
+        2. adaptive k: hits much farther than the best one are dropped, so a
+           focused question keeps a few chunks and a broad one keeps more
+        3. adjacent chunks of the same file are merged into one passage, so
+           overlapping neighbours are not mistaken for redundant hits
+        4. MMR: up to top_k passages are picked for relevance while
+           penalizing similarity to passages already picked
+    """
+
+    def __init__(self, max_distance: float = 0.6, distance_margin: float = 0.15, top_k: int = 8, mmr_lambda: float = 0.7):
+        self.max_distance = max_distance
+        self.distance_margin = distance_margin
+        self.top_k = top_k
+        self.mmr_lambda = mmr_lambda
+
+    def filter_by_distance(self, hits: List[Dict]) -> List[Dict]:
+        distances = [hit["distance"] for hit in hits if hit.get("distance") is not None]
+        if not distances:
+            return hits
+
+        limit = min(self.max_distance, min(distances) + self.distance_margin)
+        return [hit for hit in hits if hit.get("distance") is None or hit["distance"] <= limit]
+
+    def mmr(self, query_vector: List[float], hits: List[Dict], vectors: List[np.ndarray]) -> List[Dict]:
+        """
+            Maximal marginal relevance selection of up to top_k hits
+            (passages, when called from process).
+
+            Relevance is the fused score for hybrid results (rank-based, so
+            lexical-only hits are not penalized for a weak embedding match)
+            and the cosine similarity to the query otherwise.
+        """
+
+        if len(hits) <= 1 or self.top_k <= 0:
+            return hits[:max(self.top_k, 0)]
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+        if all(hit.get("fusion_score") is not None for hit in hits):
+            relevance = np.asarray([hit["fusion_score"] for hit in hits], dtype=np.float32)
+            relevance /= relevance.max() or 1.0
+        else:
+            query = np.asarray(query_vector, dtype=np.float32)
+            relevance = matrix @ (query / (np.linalg.norm(query) or 1.0))
+
+        similarity = matrix @ matrix.T
+        selected = [int(np.argmax(relevance))]
+        redundancy = similarity[selected[0]].copy()
+        remaining = np.ones(len(hits), dtype=bool)
+        remaining[selected[0]] = False
+
+        while len(selected) < min(self.top_k, len(hits)):
+            scores = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * redundancy
+            scores[~remaining] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            remaining[best] = False
+            redundancy = np.maximum(redundancy, similarity[best])
+
+        return [hits[i] for i in selected]
+
+    def process(self, query_vector: List[float], hits: List[Dict], vectors: Optional[List[np.ndarray]] = None) -> List[Dict]:
+        """
+            Args:
+                query_vector: Embedding of the query
+                hits: Retrieved chunks, best first
+                vectors: Embeddings of the hits' contents, in the same order;
+                    without them MMR is skipped and the best top_k passages
+                    are kept
+
+            Returns:
+                List[Dict]: The passages to send, best first
+        """
+
+        kept = self.filter_by_distance(hits)
+        runs = adjacent_runs(kept)
+        passages = [merge_run(kept, run) for run in runs]
+        if vectors is None:
+            return passages[:self.top_k]
+
+        # A passage is represented by the centroid of its chunks' vectors
+        rows = {id(hit): vector for hit, vector in zip(hits, vectors)}
+        passage_vectors = []
+        for run in runs:
+            members = np.asarray([rows[id(kept[rank])] for rank in run], dtype=np.float32)
+            members /= np.maximum(np.linalg.norm(members, axis=1, keepdims=True), 1e-12)
+            passage_vectors.append(members.mean(axis=0))
+        return self.mmr(query_vector, passages, passage_vectors)
@@ -0,0 +1,141 @@
+import sys
+from collections import OrderedDict
+from typing import Any, List
+import streamlit as st
+from .utils.metrics import increment_counter, record_metric
+from .utils.settings import get_setting
+
+# Session key of the chat-history LRU: chat key -> its session keys and size
+_LRU_KEY = "_chat_history_lru"
+# Session key of the DB-less histories' running sizes, least recently written first
+_FALLBACK_KEY = "_fallback_history_bytes"
+
+
+def estimate_size(value: Any) -> int:
+    """
+        Approximate deep size in bytes of plain data (dicts, lists, tuples,
+        sets, strings, numbers). Shared objects are counted once.
+    """
+
+    seen = set()
+    stack = [value]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+
+def track_chat_history(chat_key: str, keys: List[str]):
+    """
+        Mark a chatbot's chat history as the most recently used one in this
+        session and evict the least recently used others once there are
+        more than SESSION_MAX_CHAT_HISTORIES of them, or together they take
+        more than SESSION_MEMORY_LIMIT_MB. The active history is never
+        evicted; an evicted one is reloaded from storage when reopened.
+
+        Args:
+            chat_key: Session key of the history list
+            keys: Every session key belonging to that history, dropped
+                together on eviction
+    """
+
+    lru = st.session_state.setdefault(_LRU_KEY, OrderedDict())
+    lru[chat_key] = {'keys': keys, 'bytes': estimate_size(st.session_state.get(chat_key, []))}
+    lru.move_to_end(chat_key)
+
+    max_histories = get_setting("SESSION_MAX_CHAT_HISTORIES", 3)
+    max_bytes = get_setting("SESSION_MEMORY_LIMIT_MB", 16.0) * 1024 * 1024
+
+    def total():
+        return sum(record['bytes'] for record in lru.values())
+
+    while len(lru) > 1 and (len(lru) > max_histories or total() > max_bytes):
+        _, record = lru.popitem(last=False)
+        for key in record['keys']:
+            st.session_state.pop(key, None)
+        increment_counter("session.history_evictions")
+
+    record_session_memory()
+
+
+def append_fallback_turn(chatbot_name: str, turn: dict):
+    """
+        Append a turn to a chatbot's history in the DB-less fallback store
+        (st.session_state.chatbots), which is its only copy. Each history
+        keeps at most SESSION_FALLBACK_MAX_TURNS turns, and together they
+        stay within SESSION_MEMORY_LIMIT_MB: the oldest turns of the least
+        recently written history are dropped first. Sizes are counted as
+        turns come and go, so the store is never re-walked.
+
+        Args:
+            chatbot_name: Name of the chatbot
+            turn: The turn to append
+    """
+
+    chatbots = st.session_state.chatbots
+    history = chatbots[chatbot_name].setdefault('chat_history', [])
+    sizes = st.session_state.setdefault(_FALLBACK_KEY, OrderedDict())
+    if chatbot_name not in sizes:
+        sizes[chatbot_name] = estimate_size(history)
+    history.append(turn)
+    sizes[chatbot_name] += estimate_size(turn)
+    sizes.move_to_end(chatbot_name)
+
+    max_turns = get_setting("SESSION_FALLBACK_MAX_TURNS", 500)
+    if len(history) > max_turns:
+        _trim_fallback_history(chatbot_name, history[:len(history) - max_turns])
+
+    excess = sum(sizes.values()) - get_setting("SESSION_MEMORY_LIMIT_MB", 16.0) * 1024 * 1024
+    for name in list(sizes):
+        if excess <= 0:
+            break
+        turns = chatbots.get(name, {}).get('chat_history', [])
+        # The newest turn of the history being written always stays
+        candidates = turns[:-1] if name == chatbot_name else turns
+        dropped, freed = 0, 0
+        while dropped < len(candidates) and freed < excess:
+            freed += estimate_size(candidates[dropped])
+            dropped += 1
+        excess -= _trim_fallback_history(name, candidates[:dropped])
+
+    record_session_memory()
+
+
+def _trim_fallback_history(chatbot_name: str, oldest: List[dict]) -> int:
+    """Drop a fallback history's oldest turns (a prefix of it). Returns the bytes freed."""
+
+    if not oldest:
+        return 0
+    freed = sum(estimate_size(turn) for turn in oldest)
+    del st.session_state.chatbots[chatbot_name]['chat_history'][:len(oldest)]
+    sizes = st.session_state[_FALLBACK_KEY]
+    sizes[chatbot_name] = max(0, sizes[chatbot_name] - freed)
+    increment_counter("session.fallback_turns_trimmed", len(oldest))
+    return freed
+
+
+def forget_fallback_history(chatbot_name: str):
+    """Drop a chatbot's size record after its fallback history is cleared or deleted."""
+
+    st.session_state.get(_FALLBACK_KEY, {}).pop(chatbot_name, None)
+    record_session_memory()
+
+
+def record_session_memory():
+    """Record this session's estimated memory: tracked chat histories plus the DB-less fallback store."""
+
+    lru = st.session_state.get(_LRU_KEY, {})
+    history_bytes = sum(record['bytes'] for record in lru.values())
+    fallback_bytes = sum(st.session_state.get(_FALLBACK_KEY, {}).values())
+
+    record_metric("session.history_bytes", history_bytes, histories=len(lru))
+    record_metric("session.memory_bytes", history_bytes + fallback_bytes)
@@ -0,0 +1,221 @@
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .settings import get_setting
+from .tokens import count_tokens
+
+# Tried in order; pieces still too large fall through to the next one,
+# and past the last to a fixed-size split
+SEPARATORS = ("\n\n", "\n", ".", " ")
+
+# (chunk_size, chunk_overlap) per sizing unit
+_DEFAULT_SIZES = {"tokens": (250, 50), "chars": (1000, 200)}
+
+# Rough characters per token, to size the streaming buffer
+_CHARS_PER_TOKEN = 4
+
+
+class RecursiveChunker:
+    """
+        Recursive separator splitter measuring chunks in tokens or
+        characters.
+
+        Text is cut at the coarsest separator that occurs (paragraphs, then
+        lines, sentences and words), recursing only into pieces that are
+        still too large; the pieces are then packed greedily into chunks of
+        at most chunk_size with chunk_overlap carried over between
+        neighbours. Everything is done on offsets into the source text, so
+        every chunk knows where it came from and no intermediate strings
+        are built beyond the pieces being measured. Piece sizes are summed,
+        which slightly misestimates token counts across piece boundaries;
+        each chunk's reported token_count is exact.
+
+        Instances hold no per-call state; use get_chunker to share them.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int, unit: str = "tokens", separators: Tuple[str, ...] = SEPARATORS):
+        if unit not in _DEFAULT_SIZES:
+            raise ValueError(f"Unknown chunk size unit: {unit}")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.unit = unit
+        self.separators = separators
+        self._length = count_tokens if unit == "tokens" else len
+
+    def _pieces(self, text: str, start: int, end: int, level: int, out: List[Tuple[int, int, int]]):
+        """Append (start, end, size) pieces of text[start:end], each within chunk_size."""
+
+        while level < len(self.separators) and text.find(self.separators[level], start, end) == -1:
+            level += 1
+
+        if level == len(self.separators):
+            # No separator left: cut at a fixed width scaled to the unit
+            size = self._length(text[start:end])
+            step = max(1, (end - start) * self.chunk_size // max(size, 1))
+            for piece_start in range(start, end, step):
+                piece_end = min(piece_start + step, end)
+                out.append((piece_start, piece_end, self._length(text[piece_start:piece_end])))
+            return
+
+        separator = self.separators[level]
+        position = start
+        while position < end:
+            found = text.find(separator, position, end)
+            # The separator stays at the end of its piece
+            piece_end = end if found == -1 else found + len(separator)
+            size = self._length(text[position:piece_end])
+            if size <= self.chunk_size:
+                out.append((position, piece_end, size))
+            else:
+                self._pieces(text, position, piece_end, level + 1, out)
+            position = piece_end
+
+    def _spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        pieces = []
+        self._pieces(text, 0, len(text), 0, pieces)
+
+        window = deque()
+        total = 0
+        for piece in pieces:
+            if window and total + piece[2] > self.chunk_size:
+                yield window[0][0], window[-1][1]
+                # Keep at most chunk_overlap of the tail, and room for the new piece
+                while window and (total > self.chunk_overlap or total + piece[2] > self.chunk_size):
+                    total -= window.popleft()[2]
+            window.append(piece)
+            total += piece[2]
+
+        if window:
+            yield window[0][0], window[-1][1]
+
+    def split(self, text: str) -> List[Dict]:
+        """
+            Returns:
+                List[Dict]: One dict per chunk with its text, start and end
+                character offsets in the source, and token_count
+        """
+
+        chunks = []
+        for start, end in self._spans(text):
+            raw = text[start:end]
+            stripped = raw.strip()
+            if not stripped:
+                continue
+            start += len(raw) - len(raw.lstrip())
+            chunks.append({
+                "text": stripped,
+                "start": start,
+                "end": start + len(stripped),
+                "token_count": count_tokens(stripped)
+            })
+        return chunks
+
+    def stream(self, segments: Iterable[Dict], window_factor: int = 4) -> Iterator[Tuple[str, Dict]]:
+        """
+            Chunk a stream of text segments (pages, paragraphs) with bounded
+            memory.
+
+            Segments are buffered until the buffer holds window_factor
+            chunks' worth of text; the buffer is then split and every chunk
+            but the last is emitted. The last, possibly incomplete, chunk
+            seeds the next window, so memory stays proportional to
+            chunk_size rather than to the document.
+
+            Args:
+                segments: Dicts with "text" and optional "page" and
+                    "section"; texts are concatenated as-is, so they carry
+                    their own separators
+                window_factor: Buffer size, in chunks, before splitting
+
+            Yields:
+                tuple: Chunk text and its metadata: page_start, page_end,
+                section, token_count, and start/end character offsets in
+                the concatenated document
+        """
+
+        window_chars = self.chunk_size * window_factor * (_CHARS_PER_TOKEN if self.unit == "tokens" else 1)
+
+        # Buffered text parts and, per part, (start offset, end offset, page, section)
+        parts = []
+        spans = []
+        length = 0
+        # Document offset of the buffer's first character
+        base = 0
+
+        def locate(start, end):
+            overlapping = [(page, section) for offset, part_end, page, section in spans if offset < end and part_end > start]
+            pages = [page for page, _ in overlapping if page is not None]
+            sections = [section for _, section in overlapping if section]
+            return {
+                "page_start": min(pages) if pages else None,
+                "page_end": max(pages) if pages else None,
+                "section": sections[0] if sections else None
+            }
+
+        def split(final):
+            buffer = "".join(parts)
+            chunks = self.split(buffer)
+            if not final and len(chunks) > 1:
+                keep_from = chunks[-1]["start"]
+                chunks = chunks[:-1]
+            else:
+                keep_from = len(buffer)
+
+            emitted = [(chunk["text"], {
+                **locate(chunk["start"], chunk["end"]),
+                "token_count": chunk["token_count"],
+                "start": base + chunk["start"],
+                "end": base + chunk["end"]
+            }) for chunk in chunks]
+
+            # Rebase the retained tail so offsets start at zero again
+            tail_spans = []
+            for offset, part_end, page, section in spans:
+                if part_end > keep_from:
+                    tail_spans.append((max(offset, keep_from) - keep_from, part_end - keep_from, page, section))
+            return emitted, buffer[keep_from:], tail_spans, keep_from
+
+        for segment in segments:
+            text = segment.get("text") or ""
+            if not text:
+                continue
+            spans.append((length, length + len(text), segment.get("page"), segment.get("section")))
+            parts.append(text)
+            length += len(text)
+
+            if length >= window_chars:
+                emitted, tail, spans, consumed = split(final=False)
+                yield from emitted
+                parts = [tail] if tail else []
+                length = len(tail)
+                base += consumed
+
+        if length:
+            emitted, _, _, _ = split(final=True)
+            yield from emitted
+
+
+@lru_cache(maxsize=16)
+def _shared_chunker(chunk_size: int, chunk_overlap: int, unit: str) -> RecursiveChunker:
+    return RecursiveChunker(chunk_size, chunk_overlap, unit)
+
+
+def get_chunker(chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None, unit: Optional[str] = None) -> RecursiveChunker:
+    """
+        Returns:
+            The shared chunker for a configuration. Unset arguments come
+            from CHUNK_UNIT ("tokens" or "chars"), CHUNK_SIZE and
+            CHUNK_OVERLAP, with defaults of 250/50 tokens or 1000/200
+            characters.
+    """
+
+    unit = unit or get_setting("CHUNK_UNIT", "tokens")
+    default_size, default_overlap = _DEFAULT_SIZES.get(unit, _DEFAULT_SIZES["tokens"])
+    return _shared_chunker(
+        chunk_size or get_setting("CHUNK_SIZE", default_size),
+        chunk_overlap if chunk_overlap is not None else get_setting("CHUNK_OVERLAP", default_overlap),
+        unit
+    )
@@ -1,9 +0,0 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-def chunk_with_recursive_splitter(text, chunk_size=1000, chunk_overlap=200):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", ".", " ", ""]
-    )
-    return splitter.split_text(text)
\ No newline at end of file
@@ -0,0 +1,27 @@
+import hashlib
+import uuid
+
+# Fixed namespace so object IDs are stable across processes and deploys
+CHUNK_NAMESPACE = uuid.UUID("6f1c7a52-9a8e-4b8e-9a57-2f0f3c1d8b11")
+
+
+def content_hash(text: str) -> str:
+    """
+        Returns:
+            Hex SHA-256 digest of the given text
+    """
+
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_uuid(chatbot_name: str, filename: str, chunk_hash: str, occurrence: int = 0) -> str:
+    """
+        Deterministic object ID for a chunk.
+
+        The same text in the same file always maps to the same ID, so a
+        re-index can tell unchanged chunks apart from new ones. The
+        occurrence number separates identical chunks within one file.
+    """
+
+    key = f"{chatbot_name}\x00{filename}\x00{chunk_hash}\x00{occurrence}"
+    return str(uuid.uuid5(CHUNK_NAMESPACE, key))
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Optional
+import streamlit as st
+from .settings import get_setting
+
+# What the metrics panel and the periodic log line report
+REPORTED_LATENCIES = ("chat.ttft", "chat.generation_time", "pipeline.prepare", "retrieval.latency")
+REPORTED_CACHES = ("retrieval.result_cache", "retrieval.embedding_cache", "answer_cache")
+REPORTED_COUNTERS = (
+    "session.history_evictions", "chat.persist_failures", "chat.messages_dropped",
+    "chat.messages_dead_lettered", "pipeline.retrieval_failures", "ingestion.jobs_failed"
+)
+
+
+class MetricsRecorder:
+    """
+        Process-wide, thread-safe store of recent metric samples.
+
+        Each metric keeps a bounded window of its latest values, which is
+        enough to report counts and latency percentiles without growing
+        with uptime.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self._window))
+        self._counters = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, value: float, **tags):
+        """Record one sample for a metric, e.g. a latency in seconds."""
+
+        with self._lock:
+            self._samples[name].append((time.time(), float(value), tags))
+
+    def increment(self, name: str, amount: int = 1):
+        """Increment a counter, e.g. cache hits."""
+
+        with self._lock:
+            self._counters[name] += amount
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def summary(self, name: str) -> Optional[Dict]:
+        """
+            Args:
+                name: Metric name
+
+            Returns:
+                Dict: count, mean, p50, p95, p99 and max of the recent
+                samples, or None if nothing was recorded
+        """
+
+        with self._lock:
+            values = sorted(value for _, value, _ in self._samples.get(name, ()))
+
+        if not values:
+            return None
+
+        def percentile(p):
+            index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+            return values[index]
+
+        return {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(50),
+            "p95": percentile(95),
+            "p99": percentile(99),
+            "max": values[-1]
+        }
+
+    def names(self):
+        with self._lock:
+            return sorted(set(self._samples) | set(self._counters))
+
+    def cache_stats(self, name: str) -> Dict:
+        """
+            Returns:
+                Dict: hits, misses and hit_rate (None before any lookup) of
+                a cache counting "<name>.hits" and "<name>.misses"
+        """
+
+        hits = self.counter(f"{name}.hits")
+        misses = self.counter(f"{name}.misses")
+        lookups = hits + misses
+        return {"hits": hits, "misses": misses, "hit_rate": hits / lookups if lookups else None}
+
+    def report(self) -> Dict:
+        """
+            Returns:
+                Dict: Summaries of the key latencies, cache hit rates,
+                session memory and failure counters
+        """
+
+        return {
+            "latencies": {name: self.summary(name) for name in REPORTED_LATENCIES},
+            "caches": {name: self.cache_stats(name) for name in REPORTED_CACHES},
+            "session_memory_bytes": self.summary("session.memory_bytes"),
+            "counters": {name: self.counter(name) for name in REPORTED_COUNTERS}
+        }
+
+
+def format_report(report: Dict) -> str:
+    """One line of the report's non-empty parts, for logs."""
+
+    parts = []
+    for name, summary in report["latencies"].items():
+        if summary:
+            parts.append(f"{name} p50 {summary['p50']:.2f}s p95 {summary['p95']:.2f}s (n={summary['count']})")
+    for name, stats in report["caches"].items():
+        if stats["hit_rate"] is not None:
+            parts.append(f"{name} {stats['hit_rate']:.0%} hits of {stats['hits'] + stats['misses']}")
+    memory = report["session_memory_bytes"]
+    if memory:
+        parts.append(f"session memory p50 {memory['p50'] / 1e6:.1f} MB max {memory['max'] / 1e6:.1f} MB")
+    parts.extend(f"{name} {count}" for name, count in report["counters"].items() if count)
+    return " | ".join(parts)
+
+
+metrics = MetricsRecorder()
+
+
+def record_metric(name: str, value: float, **tags):
+    metrics.record(name, value, **tags)
+
+
+def increment_counter(name: str, amount: int = 1):
+    metrics.increment(name, amount)
+
+
+class MetricsLogger:
+    """
+        Background thread printing the metrics report every interval
+        seconds, skipped while nothing new was recorded.
+    """
+
+    def __init__(self, recorder: MetricsRecorder, interval: float):
+        self.recorder = recorder
+        self.interval = interval
+        self._thread = threading.Thread(target=self._run, name="metrics-logger", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last = None
+        while True:
+            time.sleep(self.interval)
+            line = format_report(self.recorder.report())
+            if line and line != last:
+                print(f"Metrics: {line}")
+                last = line
+
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_logger() -> Optional[MetricsLogger]:
+    """
+        Returns:
+            The process-wide metrics logger, or None when
+            METRICS_LOG_INTERVAL is 0
+    """
+
+    interval = get_setting("METRICS_LOG_INTERVAL", 300.0)
+    return MetricsLogger(metrics, interval) if interval > 0 else None
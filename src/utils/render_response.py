@@ -1,23 +1,66 @@
 import streamlit as st
 import re
+from functools import lru_cache
+from typing import Tuple
 
-def render_response(response):
-    # First, handle block LaTeX separately
-    blocks = re.split(r'(\\\[.*?\\\])', response, flags=re.DOTALL)
-    for block in blocks:
+_BLOCK_LATEX = re.compile(r'(\\\[.*?\\\])', re.DOTALL)
+_INLINE_LATEX = re.compile(r'\\\((.*?)\\\)')
+
+# Parsed messages kept per process; a long conversation is a few hundred
+_PARSE_CACHE_SIZE = 2048
+
+
+def _parse(response: str) -> Tuple[Tuple[str, str], ...]:
+    segments = []
+    for block in _BLOCK_LATEX.split(response):
         block = block.strip()
         if not block:
             continue
         if block.startswith(r'\[') and block.endswith(r'\]'):
-            st.latex(block[2:-2])  # block math
+            segments.append(("latex", block[2:-2]))  # block math
+        else:
+            # Inline LaTeX becomes markdown math
+            segments.append(("markdown", _INLINE_LATEX.sub(r'$\1$', block)))
+    return tuple(segments)
+
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def parse_response(response: str) -> Tuple[Tuple[str, str], ...]:
+    """
+        Split a response into display segments, once per distinct text.
+
+        Returns:
+            tuple: ("latex", expression) for block math and ("markdown",
+            text) for everything else, inline LaTeX already converted
+    """
+
+    return _parse(response)
+
+
+def render_response(response, memoize: bool = True):
+    """
+        Args:
+            response: The assistant's message
+            memoize: Use the parse cache; off for partial streamed text,
+                which would only be seen once
+    """
+
+    for kind, text in (parse_response(response) if memoize else _parse(response)):
+        if kind == "latex":
+            st.latex(text)
         else:
-            # Now handle inline LaTeX inside this text block
-            segments = re.split(r'(\\\(.*?\\\))', block)
-            formatted_text = ""
-            for seg in segments:
-                if seg.startswith(r'\(') and seg.endswith(r'\)'):
-                    latex_expr = seg[2:-2]
-                    formatted_text += f"${latex_expr}$"
-                else:
-                    formatted_text += seg
-            st.markdown(formatted_text)
+            st.markdown(text)
+
+
+def trim_incomplete_latex(partial_response):
+    """
+        While a response is still streaming, hold back a trailing LaTeX
+        expression whose closing delimiter has not arrived yet, so it is
+        never rendered as raw markup.
+    """
+
+    for opening, closing in ((r'\[', r'\]'), (r'\(', r'\)')):
+        start = partial_response.rfind(opening)
+        if start != -1 and partial_response.find(closing, start) == -1:
+            partial_response = partial_response[:start]
+    return partial_response
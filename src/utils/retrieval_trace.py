@@ -0,0 +1,106 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import time
+from collections import deque
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Dict, List
+import streamlit as st
+from .get_base_path import get_base_path
+from .settings import get_setting
+
+
+class RetrievalTracer:
+    """
+        Sampled tracing of retrieval calls.
+
+        Sampled records go to an in-memory ring buffer and, through a
+        bounded queue, to a background thread that appends them to a
+        rotating JSONL file. The calling thread never touches the disk;
+        if the writer falls behind, records are dropped from the file
+        (they stay in the ring buffer).
+    """
+
+    def __init__(self, path: str, sample_rate: float = 0.1, buffer_size: int = 500,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        self.sample_rate = sample_rate
+        self.recent = deque(maxlen=buffer_size)
+        self.dropped = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        self._queue = queue.Queue(maxsize=10000)
+        self._listener = QueueListener(self._queue, handler)
+        self._listener.start()
+        atexit.register(self.close)
+
+    def trace(self, chatbot_name: str, query: str, results: List[Dict], latency: float, cache_hit: bool = False):
+        """
+            Record one retrieval call, subject to the sampling rate.
+
+            Args:
+                chatbot_name: Name of the chatbot
+                query: The user query
+                results: Retrieved chunks with "distance" and optional metadata
+                latency: Retrieval time in seconds
+                cache_hit: Whether the results came from the retrieval cache
+        """
+
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return
+
+        record = {
+            "timestamp": time.time(),
+            "chatbot": chatbot_name,
+            "query": query,
+            "latency_ms": round(latency * 1000, 3),
+            "cache_hit": cache_hit,
+            "distances": [item.get("distance") for item in results],
+            "results": [{
+                "filename": item.get("filename"),
+                "chunk_index": item.get("chunk_index"),
+                "distance": item.get("distance")
+            } for item in results]
+        }
+        self.recent.append(record)
+
+        try:
+            self._queue.put_nowait(logging.makeLogRecord({"msg": json.dumps(record)}))
+        except queue.Full:
+            self.dropped += 1
+
+    def recent_traces(self, chatbot_name: str = None) -> List[Dict]:
+        """Latest sampled records, optionally for one chatbot."""
+
+        records = list(self.recent)
+        if chatbot_name is not None:
+            records = [record for record in records if record["chatbot"] == chatbot_name]
+        return records
+
+    def close(self):
+        """Flush queued records to disk and stop the writer thread."""
+
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+
+
+@st.cache_resource(show_spinner=False)
+def get_retrieval_tracer() -> RetrievalTracer:
+    return RetrievalTracer(
+        path=get_setting(
+            "RETRIEVAL_TRACE_PATH",
+            os.path.join(get_base_path(), "src", "data", "weaviate_response", "retrieval_trace.jsonl")
+        ),
+        sample_rate=get_setting("RETRIEVAL_TRACE_SAMPLE_RATE", 0.1),
+        buffer_size=get_setting("RETRIEVAL_TRACE_BUFFER", 500),
+        max_bytes=get_setting("RETRIEVAL_TRACE_MAX_BYTES", 10 * 1024 * 1024),
+        backup_count=get_setting("RETRIEVAL_TRACE_BACKUPS", 5)
+    )
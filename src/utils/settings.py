@@ -0,0 +1,45 @@
+import os
+import streamlit as st
+
+
+def get_setting(name, default=None):
+    """
+        Look up a configuration value.
+
+        Streamlit secrets win over environment variables, and the default
+        is used when neither is set. When a default is given the value is
+        cast to the default's type, so numeric and boolean settings can be
+        supplied as strings in the environment.
+
+        Args:
+            name: Setting name, e.g. "DB_POOL_SIZE"
+            default: Value to return when the setting is missing
+
+        Returns:
+            The configured value, or the default
+    """
+
+    value = None
+    try:
+        if name in st.secrets:
+            value = st.secrets[name]
+    except Exception:
+        # No secrets.toml available (tests, benchmarks, scripts)
+        value = None
+
+    if value is None:
+        value = os.environ.get(name)
+
+    if value is None:
+        return default
+
+    if default is None or isinstance(value, type(default)):
+        return value
+
+    if isinstance(default, bool):
+        return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+    try:
+        return type(default)(value)
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from .metrics import increment_counter
+
+
+class TTLCache:
+    """
+        Thread-safe LRU cache whose entries also expire after a fixed TTL.
+
+        Hits, misses and evictions are counted on the instance and mirrored
+        to the metrics recorder under "<name>.hits" etc.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 600.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                hit, value = True, entry[1]
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                hit, value = False, default
+
+        increment_counter(f"{self.name}.hits" if hit else f"{self.name}.misses")
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+
+        if evicted:
+            increment_counter(f"{self.name}.evictions", evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,380 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import streamlit as st
+from .utils.get_base_path import get_base_path
+from .utils.hashing import chunk_uuid
+from .utils.metrics import record_metric
+from .utils.retrieval_trace import get_retrieval_tracer
+from .utils.settings import get_setting
+from .embedding_cache import get_embedder
+from .lexical_index import get_lexical_index_store, reciprocal_rank_fusion
+from .retrieval_postprocessor import RetrievalPostProcessor
+from .retrieval_cache import collapse_whitespace, get_retrieval_cache, normalize_query
+
+# Vectors are computed client-side with this model, whatever the backend
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Chunk fields returned by retrieval (and kept by the lexical index)
+RESULT_FIELDS = ("content", "filename", "chunk_index", "page_start", "section", "token_count")
+
+
+class VectorStore(ABC):
+    """
+        Per-chatbot store of chunk vectors.
+
+        Backends implement the storage primitives (create, upsert, delete,
+        query and listing); this class builds the knowledge-base operations
+        on top of them: deterministic object IDs, cached client-side
+        embeddings, diff-based re-indexing, the lexical index used by hybrid
+        retrieval, the retrieval cache and tracing.
+    """
+
+    @abstractmethod
+    def exists(self, chatbot_name: str) -> bool:
+        pass
+
+    @abstractmethod
+    def create(self, chatbot_name: str):
+        """Create the chatbot's collection if it does not exist yet."""
+
+    @abstractmethod
+    def upsert(self, chatbot_name: str, objects: Dict[str, Dict], vectors: List[np.ndarray]):
+        """
+            Args:
+                chatbot_name: Name of the chatbot
+                objects: Properties of each object, keyed by object ID
+                vectors: One vector per object, in the same order
+        """
+
+    @abstractmethod
+    def update(self, chatbot_name: str, object_id: str, properties: Dict):
+        """Overwrite some properties of one object, keeping its vector."""
+
+    @abstractmethod
+    def delete(self, chatbot_name: str, object_ids: Optional[List[str]] = None):
+        """Delete the given objects, or the whole collection when object_ids is None."""
+
+    @abstractmethod
+    def query(self, chatbot_name: str, vector: List[float], limit: int, include_vector: bool = False) -> List[Dict]:
+        """
+            Returns:
+                List[Dict]: Properties of the nearest objects, best first,
+                each with its object "id" and cosine "distance", and its
+                stored "vector" when include_vector is set
+        """
+
+    @abstractmethod
+    def list_objects(self, chatbot_name: str) -> Dict[str, Dict]:
+        """
+            Returns:
+                Dict mapping object ID to its bookkeeping properties
+                (filename, file_hash, chunk_index), without vectors or content
+        """
+
+    def _assign_uuids(self, chatbot_name: str, chunks: List[Dict], occurrences: Optional[Dict] = None) -> Dict[str, Dict]:
+        """
+            Args:
+                chatbot_name: Name of the chatbot
+                chunks: Chunks to assign IDs to
+                occurrences: Counts of the chunks seen so far, carried over
+                    when one file's chunks are assigned batch by batch
+
+            Returns:
+                Dict mapping each chunk's deterministic object ID to the chunk
+        """
+
+        if occurrences is None:
+            occurrences = {}
+        objects = {}
+        for chunk in chunks:
+            key = (chunk["filename"], chunk["chunk_hash"])
+            occurrence = occurrences.get(key, 0)
+            occurrences[key] = occurrence + 1
+            objects[chunk_uuid(chatbot_name, chunk["filename"], chunk["chunk_hash"], occurrence)] = chunk
+        return objects
+
+    def _chunk_properties(self, chunk: Dict) -> Dict:
+        properties = {
+            "content": chunk["content"],
+            "chunk_index": chunk["chunk_index"],
+            "filename": chunk["filename"],
+            "file_type": chunk["type"],
+            "file_hash": chunk["file_hash"],
+            "chunk_hash": chunk["chunk_hash"],
+            "token_count": chunk["token_count"],
+            "page_start": chunk.get("page_start"),
+            "page_end": chunk.get("page_end"),
+            "section": chunk.get("section")
+        }
+        # Location metadata is only known for some file types
+        return {key: value for key, value in properties.items() if value is not None}
+
+    def push_chunks(self, chatbot_name: str, chunks: List[Dict], object_ids: Optional[Dict[str, Dict]] = None):
+        if object_ids is None:
+            object_ids = self._assign_uuids(chatbot_name, chunks)
+
+        # Batched, cache-backed embeddings; unchanged text costs nothing
+        vectors = get_embedder(EMBEDDING_MODEL).embed([chunk["content"] for chunk in object_ids.values()])
+
+        properties = {object_id: self._chunk_properties(chunk) for object_id, chunk in object_ids.items()}
+        try:
+            self.upsert(chatbot_name, properties, vectors)
+
+            get_lexical_index_store().add(chatbot_name, {
+                object_id: (values["content"], {field: values.get(field) for field in RESULT_FIELDS})
+                for object_id, values in properties.items()
+            })
+        finally:
+            # After the write, so a query racing it cannot cache pre-write
+            # results under the new version; also after a partial write
+            get_retrieval_cache().bump_kb_version(chatbot_name)
+
+    def push_chunk_batches(self, chatbot_name: str, batches: Iterable[List[Dict]]) -> int:
+        """
+            Push one file's chunks a batch at a time, with the same object
+            IDs a single push of all of them would get.
+
+            Returns:
+                int: Number of chunks pushed
+        """
+
+        occurrences = {}
+        pushed = 0
+        for batch in batches:
+            self.push_chunks(chatbot_name, batch, object_ids=self._assign_uuids(chatbot_name, batch, occurrences))
+            pushed += len(batch)
+        return pushed
+
+    def get_indexed_files(self, chatbot_name: str) -> Dict[str, Dict]:
+        """
+            Returns:
+                Dict mapping each indexed filename to its "file_hash" (None
+                for objects indexed before hashes were stored, or when its
+                objects disagree) and its number of indexed "chunks"
+        """
+
+        if not self.exists(chatbot_name):
+            return {}
+
+        files = {}
+        for properties in self.list_objects(chatbot_name).values():
+            filename = properties.get("filename")
+            file_hash = properties.get("file_hash")
+            indexed = files.setdefault(filename, {"file_hash": file_hash, "chunks": 0})
+            # A file is only current if every one of its objects has the hash
+            if indexed["file_hash"] != file_hash:
+                indexed["file_hash"] = None
+            indexed["chunks"] += 1
+        return files
+
+    def embed_query(self, user_query: str) -> List[float]:
+        """
+            Embed a query with the collection's embedding model, reusing
+            cached embeddings of previously seen queries. Queries differing
+            only in case or whitespace share an entry; the text embedded
+            keeps its case, which embedding models are sensitive to.
+        """
+
+        cache = get_retrieval_cache()
+        key = (EMBEDDING_MODEL, normalize_query(user_query))
+
+        vector = cache.embeddings.get(key)
+        if vector is None:
+            vector = get_embedder(EMBEDDING_MODEL).embed([collapse_whitespace(user_query)])[0].tolist()
+            cache.embeddings.set(key, vector)
+        return vector
+
+    def _hybrid_results(self, chatbot_name: str, user_query: str, vector_hits: List[Dict], max_results: int) -> List[Dict]:
+        """
+            Fuse the vector ranking with a BM25 ranking of the same query.
+
+            Exact terms such as part numbers and error codes rank high
+            lexically even when their embedding is only loosely similar.
+            Lexical-only hits have no distance.
+        """
+
+        lexical_hits = get_lexical_index_store().search(chatbot_name, user_query, max_results)
+
+        hits = {hit["id"]: hit for hit in vector_hits}
+        for object_id, score, payload in lexical_hits:
+            hits.setdefault(object_id, {**payload, "id": object_id, "distance": None})["lexical_score"] = score
+
+        fused = reciprocal_rank_fusion([
+            [hit["id"] for hit in vector_hits],
+            [object_id for object_id, _, _ in lexical_hits]
+        ])
+        return [{**hits[object_id], "fusion_score": score} for object_id, score in fused]
+
+    def fetch_relevant_chunks(self, chatbot_name, user_query, max_distance=None, max_results=20, mode=None):
+        """
+            Args:
+                chatbot_name: Name of the chatbot
+                user_query: The user query
+                max_distance: Cosine distance cutoff for vector hits;
+                    defaults to RETRIEVAL_MAX_DISTANCE
+                max_results: Candidates taken from each ranking
+                mode: "vector" or "hybrid"; defaults to RETRIEVAL_MODE
+
+            Returns:
+                List[Dict]: Passages to prompt with, best first; adjacent
+                chunks of a file come back merged
+        """
+
+        mode = mode or get_setting("RETRIEVAL_MODE", "hybrid")
+        if max_distance is None:
+            max_distance = get_setting("RETRIEVAL_MAX_DISTANCE", 0.6)
+        started = time.perf_counter()
+        cache = get_retrieval_cache()
+        cache_key = (chatbot_name, normalize_query(user_query), cache.kb_version(chatbot_name), max_results, mode, max_distance)
+
+        cached = cache.results.get(cache_key)
+        if cached is not None:
+            results = [dict(item) for item in cached]
+            get_retrieval_tracer().trace(chatbot_name, user_query, results, time.perf_counter() - started, cache_hit=True)
+            return results
+
+        use_mmr = get_setting("RETRIEVAL_MMR", True)
+        query_vector = self.embed_query(user_query)
+        hits = self.query(chatbot_name, query_vector, max_results, include_vector=use_mmr)
+        # MMR compares the stored vectors; they are not kept in the results
+        stored_vectors = {obj["id"]: obj["vector"] for obj in hits if obj.get("vector") is not None}
+        results = [{
+            "id": obj["id"],
+            **{field: obj.get(field) for field in RESULT_FIELDS},
+            "distance": obj["distance"]
+        } for obj in hits]
+
+        if mode == "hybrid":
+            results = self._hybrid_results(chatbot_name, user_query, results, max_results)
+
+        candidates = len(results)
+        postprocessor = RetrievalPostProcessor(
+            max_distance=max_distance,
+            distance_margin=get_setting("RETRIEVAL_DISTANCE_MARGIN", 0.15),
+            top_k=get_setting("RETRIEVAL_TOP_K", 8),
+            mmr_lambda=get_setting("RETRIEVAL_MMR_LAMBDA", 0.7)
+        )
+        vectors = None
+        if use_mmr and len(results) > 1:
+            # Only lexical-only hits come without a stored vector; chunk
+            # embeddings are content-addressed, so these are cache hits
+            missing = [hit["content"] for hit in results if hit["id"] not in stored_vectors]
+            embedded = iter(get_embedder(EMBEDDING_MODEL).embed(missing) if missing else [])
+            vectors = [
+                stored_vectors[hit["id"]] if hit["id"] in stored_vectors else next(embedded)
+                for hit in results
+            ]
+        results = postprocessor.process(query_vector, results, vectors)
+        record_metric("retrieval.chunks", len(results), chatbot=chatbot_name, candidates=candidates)
+
+        cache.results.set(cache_key, [dict(item) for item in results])
+
+        latency = time.perf_counter() - started
+        record_metric("retrieval.latency", latency, chatbot=chatbot_name)
+        get_retrieval_tracer().trace(chatbot_name, user_query, results, latency)
+
+        return results
+
+    def update_knowledge_base(self, chatbot_name: str, updated_knowledge_base: List, retained_files: Optional[List[str]] = None) -> Dict:
+        """
+            Bring the collection in line with the new knowledge base by
+            diffing deterministic object IDs instead of rebuilding it.
+
+            Args:
+                chatbot_name: Name of the chatbot
+                updated_knowledge_base: Chunks of new or changed files
+                retained_files: Filenames whose indexed objects are already
+                    current and must be left untouched
+
+            Returns:
+                Dict: Number of inserted, deleted, moved and unchanged objects
+        """
+
+        self.create(chatbot_name)
+
+        # Before, so cached results stop being served while objects change,
+        # and after, so results cached from the half-updated store are dropped
+        get_retrieval_cache().bump_kb_version(chatbot_name)
+        try:
+            return self._apply_diff(chatbot_name, updated_knowledge_base, retained_files)
+        finally:
+            get_retrieval_cache().bump_kb_version(chatbot_name)
+
+    def _apply_diff(self, chatbot_name: str, updated_knowledge_base: List, retained_files: Optional[List[str]]) -> Dict:
+        retained = set(retained_files or [])
+        existing = self.list_objects(chatbot_name)
+        desired = self._assign_uuids(chatbot_name, updated_knowledge_base)
+
+        to_delete = [
+            object_id for object_id, properties in existing.items()
+            if object_id not in desired and properties.get("filename") not in retained
+        ]
+        to_insert = {
+            object_id: chunk for object_id, chunk in desired.items()
+            if object_id not in existing
+        }
+        # Same text, new position in the file: only the index changes
+        moved = {
+            object_id: chunk["chunk_index"] for object_id, chunk in desired.items()
+            if object_id in existing and existing[object_id].get("chunk_index") != chunk["chunk_index"]
+        }
+
+        if to_delete:
+            self.delete(chatbot_name, to_delete)
+            get_lexical_index_store().remove(chatbot_name, to_delete)
+
+        for object_id, chunk_index in moved.items():
+            self.update(chatbot_name, object_id, {"chunk_index": chunk_index})
+        if moved:
+            get_lexical_index_store().update_payloads(
+                chatbot_name, {object_id: {"chunk_index": chunk_index} for object_id, chunk_index in moved.items()}
+            )
+
+        if to_insert:
+            self.push_chunks(chatbot_name=chatbot_name, chunks=list(to_insert.values()), object_ids=to_insert)
+
+        return {
+            "inserted": len(to_insert),
+            "deleted": len(to_delete),
+            "moved": len(moved),
+            "unchanged": len(existing) - len(to_delete) - len(moved)
+        }
+
+    def delete_chatbot(self, chatbot_name: str):
+        try:
+            if self.exists(chatbot_name):
+                self.delete(chatbot_name)
+            get_lexical_index_store().drop(chatbot_name)
+        finally:
+            get_retrieval_cache().bump_kb_version(chatbot_name)
+
+
+@st.cache_resource(show_spinner=False)
+def get_vector_store() -> VectorStore:
+    """
+        Returns:
+            The process-wide vector store selected by VECTOR_STORE_BACKEND:
+            "weaviate" (default, laid out per WEAVIATE_LAYOUT) or "numpy"
+            for the in-process index
+    """
+
+    backend = get_setting("VECTOR_STORE_BACKEND", "weaviate").strip().lower()
+
+    if backend == "numpy":
+        from .numpy_vector_store import NumpyVectorStore
+        path = None
+        if get_setting("NUMPY_STORE_PERSIST", True):
+            path = get_setting("NUMPY_STORE_PATH", os.path.join(get_base_path(), "src", "data", "vector_store"))
+        return NumpyVectorStore(path)
+
+    if backend == "weaviate":
+        from .weaviate_manager import WeaviateManager, MultiTenantWeaviateManager
+        # "per_bot": one collection per chatbot; "multi_tenant": one shared collection
+        if get_setting("WEAVIATE_LAYOUT", "per_bot").strip().lower() == "multi_tenant":
+            return MultiTenantWeaviateManager(get_setting("WEAVIATE_SHARED_COLLECTION", "Chatbots"))
+        return WeaviateManager()
+
+    raise ValueError(f"Unknown vector store backend: {backend}")
@@ -1,118 +1,246 @@
-import weaviate
-from weaviate.classes.init import Auth
 from weaviate.classes.config import Property, DataType, Configure
-from weaviate.classes.query import MetadataQuery
-import streamlit as st
-from typing import List, Dict
-import uuid
-import os
-import json
-from .utils.get_base_path import get_base_path
+from weaviate.classes.query import MetadataQuery, Filter
+from weaviate.classes.tenants import Tenant
+from typing import Callable, List, Dict, Optional
+import re
+import threading
+import numpy as np
+from .resource_manager import get_weaviate_client
+from .utils.hashing import content_hash
+from .vector_store import VectorStore
 
 
-class WeaviateManager:
+def tenant_name(chatbot_name: str) -> str:
+    """
+        Weaviate tenant name for a chatbot: a readable, sanitized prefix of
+        the name plus a hash of the full name, so any chatbot name maps to
+        a valid and unique tenant (letters, digits, "_" and "-", at most 64).
+    """
 
-    def __init__(self):
-        self.client = weaviate.connect_to_weaviate_cloud(
-            cluster_url = st.secrets["WEAVIATE_URL"],
-            auth_credentials = Auth.api_key(st.secrets["WEAVIATE_API_KEY"]),
-            headers = {
-                "X-OpenAI-api-key" : st.secrets["OPENAI_API_KEY"]
-            }
-        ) 
+    prefix = re.sub(r"[^A-Za-z0-9_-]", "_", chatbot_name)[:40]
+    return f"{prefix}-{content_hash(chatbot_name)[:16]}"
 
-    def create_weaviate_class(self, chatbot_name: str):
 
-        class_name = f"Chatbot_{chatbot_name.replace(' ', '_')}"
+class WeaviateManager(VectorStore):
+    """Vector store backed by one Weaviate collection per chatbot."""
+
+    @property
+    def client(self):
+        # Shared client, looked up per use so a reconnected client is picked up
+        return get_weaviate_client()
+
+    def _class_name(self, chatbot_name: str) -> str:
+        return f"Chatbot_{chatbot_name.replace(' ', '_')}"
+
+    def _collection(self, chatbot_name: str):
+        return self.client.collections.get(self._class_name(chatbot_name))
+
+    def _properties(self) -> List[Property]:
+        return [
+            Property(name="content", data_type=DataType.TEXT),
+            Property(name="chunk_index", data_type=DataType.INT),
+            Property(name="filename", data_type=DataType.TEXT),
+            Property(name="file_type",data_type=DataType.TEXT),
+            *self._bookkeeping_properties()
+        ]
+
+    def exists(self, chatbot_name: str) -> bool:
+        return self.client.collections.exists(self._class_name(chatbot_name))
+
+    def create(self, chatbot_name: str):
+
+        class_name = self._class_name(chatbot_name)
 
         if self.client.collections.exists(class_name):
-            return  # Class already exists, skip
+            # Older collections may predate the bookkeeping properties
+            self._ensure_bookkeeping_properties(self.client.collections.get(class_name))
+            return
 
         self.client.collections.create(
             name= class_name,
-            vectorizer_config=Configure.Vectorizer.text2vec_openai(
-                model="text-embedding-3-small",
-                vectorize_collection_name=False
-            ),
-            properties=[
-                Property(name="content", data_type=DataType.TEXT),
-                Property(name="chunk_index", data_type=DataType.INT),
-                Property(name="filename", data_type=DataType.TEXT),
-                Property(name="file_type",data_type=DataType.TEXT)
-            ]
+            # Vectors are attached on insert, from the embedding cache
+            vectorizer_config=Configure.Vectorizer.none(),
+            properties=self._properties()
         )
 
+    def _bookkeeping_properties(self) -> List[Property]:
+        # Bookkeeping only; kept out of the embedded text
+        return [
+            Property(name="file_hash", data_type=DataType.TEXT, skip_vectorization=True),
+            Property(name="chunk_hash", data_type=DataType.TEXT, skip_vectorization=True),
+            Property(name="token_count", data_type=DataType.INT, skip_vectorization=True),
+            Property(name="page_start", data_type=DataType.INT, skip_vectorization=True),
+            Property(name="page_end", data_type=DataType.INT, skip_vectorization=True),
+            Property(name="section", data_type=DataType.TEXT, skip_vectorization=True)
+        ]
 
-    def push_chunks_to_weaviate(self,chatbot_name: str, chunks: List[Dict]):
+    def _ensure_bookkeeping_properties(self, collection):
+        """Add the bookkeeping properties to collections created before they existed."""
 
-        class_name = f"Chatbot_{chatbot_name.replace(' ', '_')}"
+        existing = {prop.name for prop in collection.config.get().properties}
+        for prop in self._bookkeeping_properties():
+            if prop.name not in existing:
+                collection.config.add_property(prop)
 
-        collection = self.client.collections.get(class_name)
+    def upsert(self, chatbot_name: str, objects: Dict[str, Dict], vectors: List[np.ndarray]):
+        collection = self._collection(chatbot_name)
 
         with collection.batch.dynamic() as batch:
-
-            for chunk in chunks:
-                data_object = {
-                    "content": chunk["content"],
-                    "chunk_index": chunk["chunk_index"],
-                    "filename": chunk["filename"],
-                    "file_type": chunk["type"]
-                }
+            for (object_id, properties), vector in zip(objects.items(), vectors):
                 batch.add_object(
-                    properties=data_object,
-                    uuid=uuid.uuid4()
+                    properties=properties,
+                    uuid=object_id,
+                    vector=np.asarray(vector).tolist()
                 )
 
-    def fetch_relevant_chunks(self, chatbot_name, user_query, max_distance=0.2, max_results=20):
-        class_name = f"Chatbot_{chatbot_name.replace(' ', '_')}"
-        collection = self.client.collections.get(class_name)
-
-        response = collection.query.near_text(
-            query=user_query,
-            limit=max_results,
-            return_metadata=MetadataQuery(distance=True),
-        )
-
-        results = [{
-            "content": obj.properties["content"],
-            "distance": obj.metadata.distance
-        } for obj in response.objects]
-
-        try:
-            # Build absolute path to save folder
-            result_save_path = os.path.abspath(
-                os.path.join(get_base_path(), "src", "data", "weaviate_response")
+        # The batch context swallows per-object errors; a partial write must not pass
+        failed = collection.batch.failed_objects
+        if failed:
+            raise Exception(f"Error upserting into chatbot {chatbot_name}: {len(failed)} objects failed, e.g. {failed[0].message}")
+
+    def update(self, chatbot_name: str, object_id: str, properties: Dict):
+        collection = self._collection(chatbot_name)
+        collection.data.update(uuid=object_id, properties=properties)
+
+    def delete(self, chatbot_name: str, object_ids: Optional[List[str]] = None):
+        if object_ids is None:
+            self.client.collections.delete(self._class_name(chatbot_name))
+            return
+
+        collection = self._collection(chatbot_name)
+        batch_size = 500
+        for start in range(0, len(object_ids), batch_size):
+            collection.data.delete_many(
+                where=Filter.by_id().contains_any(object_ids[start:start + batch_size])
             )
 
-            print("Save path:", result_save_path)
-            print("Writable?", os.access(result_save_path, os.W_OK))
-
-            os.makedirs(result_save_path, exist_ok=True)
-
-            # Safely build the file path
-            file_path = os.path.join(result_save_path, "relevant_chunks.json")
+    def query(self, chatbot_name: str, vector: List[float], limit: int, include_vector: bool = False) -> List[Dict]:
+        collection = self._collection(chatbot_name)
 
-            # Write to file
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(results, f, indent=2)
-            print("File saved at:", file_path)
-
-        except Exception as e:
-            print(f"Failed to write results: {e}")
+        # Embedding locally lets repeated queries skip Weaviate's call to OpenAI
+        response = collection.query.near_vector(
+            near_vector=vector,
+            limit=limit,
+            return_metadata=MetadataQuery(distance=True),
+            include_vector=include_vector,
+        )
 
+        results = [{**obj.properties, "id": str(obj.uuid), "distance": obj.metadata.distance} for obj in response.objects]
+        if include_vector:
+            for result, obj in zip(results, response.objects):
+                result["vector"] = obj.vector["default"]
         return results
 
-    def update_knowledge_base(self, chatbot_name: str, updated_knowledge_base: List):
-
-        class_name = f"Chatbot_{chatbot_name.replace(' ', '_')}"
-        if self.client.collections.exists(class_name):
-            self.client.collections.delete(class_name)
-
-        self.create_weaviate_class(chatbot_name=chatbot_name)
-        self.push_chunks_to_weaviate(chatbot_name=chatbot_name, chunks=updated_knowledge_base)
-
-    def delete_chatbot(self, chatbot_name: str):
-        class_name = f"Chatbot_{chatbot_name.replace(' ', '_')}"
-        if self.client.collections.exists(class_name):
-            self.client.collections.delete(class_name)
+    def list_objects(self, chatbot_name: str) -> Dict[str, Dict]:
+        collection = self._collection(chatbot_name)
 
+        return {
+            str(obj.uuid): obj.properties
+            for obj in collection.iterator(
+                return_properties=["filename", "file_hash", "chunk_index"]
+            )
+        }
+
+
+class MultiTenantWeaviateManager(WeaviateManager):
+    """
+        Vector store that keeps every chatbot in one shared Weaviate
+        collection, one tenant per chatbot.
+
+        Creating or deleting a chatbot is a tenant operation instead of a
+        schema change, tenants are fully isolated shards, and tenants this
+        process already knows about need no existence round trip.
+    """
+
+    def __init__(self, collection_name: str = "Chatbots"):
+        self.collection_name = collection_name
+        self._collection_ready = False
+        self._tenants = set()
+        self._lock = threading.Lock()
+
+    def _shared_collection(self):
+        if not self._collection_ready:
+            with self._lock:
+                if not self._collection_ready:
+                    if not self.client.collections.exists(self.collection_name):
+                        self.client.collections.create(
+                            name=self.collection_name,
+                            vectorizer_config=Configure.Vectorizer.none(),
+                            multi_tenancy_config=Configure.multi_tenancy(enabled=True, auto_tenant_activation=True),
+                            properties=self._properties()
+                        )
+                    self._collection_ready = True
+        return self.client.collections.get(self.collection_name)
+
+    def _collection(self, chatbot_name: str):
+        return self._shared_collection().with_tenant(tenant_name(chatbot_name))
+
+    def exists(self, chatbot_name: str) -> bool:
+        tenant = tenant_name(chatbot_name)
+        if tenant in self._tenants:
+            return True
+        if self._shared_collection().tenants.exists(tenant):
+            self._tenants.add(tenant)
+            return True
+        return False
+
+    def create(self, chatbot_name: str):
+        if not self.exists(chatbot_name):
+            tenant = tenant_name(chatbot_name)
+            self._shared_collection().tenants.create([Tenant(name=tenant)])
+            self._tenants.add(tenant)
+
+    def delete(self, chatbot_name: str, object_ids: Optional[List[str]] = None):
+        if object_ids is None:
+            tenant = tenant_name(chatbot_name)
+            self._shared_collection().tenants.remove([tenant])
+            self._tenants.discard(tenant)
+            return
+
+        super().delete(chatbot_name, object_ids)
+
+
+def migrate_to_multi_tenant(chatbot_names: List[str], target: MultiTenantWeaviateManager,
+                            delete_source: bool = False, progress: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+    """
+        Copy per-chatbot collections into tenants of the shared collection.
+
+        Objects keep their IDs, properties and stored vectors, so nothing is
+        re-embedded and the lexical index stays valid. Chatbots without a
+        per-bot collection are skipped. Safe to re-run: objects are upserted
+        by ID.
+
+        Args:
+            chatbot_names: Chatbots to migrate
+            target: The multi-tenant store to copy into
+            delete_source: Drop each per-bot collection once it is copied
+            progress: Called with (chatbot name, objects copied)
+
+        Returns:
+            Dict mapping each migrated chatbot to its number of objects
+    """
+
+    source = WeaviateManager()
+    migrated = {}
+    for chatbot_name in chatbot_names:
+        if not source.exists(chatbot_name):
+            continue
+
+        target.create(chatbot_name)
+        destination = target._collection(chatbot_name)
+        copied = 0
+        with destination.batch.dynamic() as batch:
+            for obj in source._collection(chatbot_name).iterator(include_vector=True):
+                batch.add_object(properties=obj.properties, uuid=obj.uuid, vector=obj.vector["default"])
+                copied += 1
+
+        failed = destination.batch.failed_objects
+        if failed:
+            raise Exception(f"Error migrating chatbot {chatbot_name}: {len(failed)} objects failed, e.g. {failed[0].message}")
+
+        if delete_source:
+            source.delete(chatbot_name)
+        migrated[chatbot_name] = copied
+        if progress:
+            progress(chatbot_name, copied)
+    return migrated
@@ -0,0 +1,123 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import pytest
+from src.database_manager import DatabaseManager, IngestionJob, utcnow
+from src.resource_manager import get_db_engine
+
+SESSIONS = 24
+TURNS = 15
+CHATBOTS = 4
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # A file database, so pooled connections and WAL are exercised as in production
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'chat.db'}")
+    get_db_engine.clear()
+    yield DatabaseManager()
+    get_db_engine().dispose()
+    get_db_engine.clear()
+
+
+def run_sessions(session, count):
+    errors = []
+    lock = threading.Lock()
+
+    def guarded(session_id):
+        try:
+            session(DatabaseManager(), session_id)
+        except Exception as e:
+            with lock:
+                errors.append(f"session {session_id}: {e}")
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        list(executor.map(guarded, range(count)))
+    return errors
+
+
+def test_concurrent_sessions_persist_every_message(db):
+    chatbots = [f"bot {i}" for i in range(CHATBOTS)]
+    for name in chatbots:
+        assert db.create_chatbot(name, "You are a test.")
+
+    def session(session_db, session_id):
+        # A page load, then a conversation that re-reads history every turn
+        name = chatbots[session_id % CHATBOTS]
+        session_db.get_chatbot_summaries()
+        session_db.get_chatbot(name)
+        for turn in range(TURNS):
+            session_db.save_chat_message(name, f"question {session_id}.{turn}", "answer")
+            session_db.get_chat_history_page(name, limit=50)
+
+    assert run_sessions(session, SESSIONS) == []
+
+    for i, name in enumerate(chatbots):
+        sessions = len(range(i, SESSIONS, CHATBOTS))
+        history = db.get_chat_history(name)
+        assert len(history) == sessions * TURNS
+        assert len({message['user'] for message in history}) == sessions * TURNS
+
+
+def test_concurrent_group_commits_persist_every_message(db):
+    def session(session_db, session_id):
+        session_db.save_chat_messages([
+            {'chatbot_name': "bot", 'user': f"question {session_id}.{turn}", 'assistant': "answer", 'created_at': utcnow()}
+            for turn in range(TURNS)
+        ])
+
+    assert run_sessions(session, SESSIONS) == []
+    assert len(db.get_chat_history("bot")) == SESSIONS * TURNS
+
+
+def test_concurrent_workers_claim_each_job_once(db):
+    job_ids = {db.create_ingestion_job("bot", []) for _ in range(SESSIONS // 2)}
+    claimed = []
+    lock = threading.Lock()
+
+    def session(session_db, session_id):
+        job = session_db.claim_ingestion_job(stale_after=300)
+        if job is not None:
+            with lock:
+                claimed.append(job['id'])
+
+    assert run_sessions(session, SESSIONS) == []
+    assert sorted(claimed) == sorted(job_ids)
+
+
+def test_stale_running_job_is_reclaimed(db):
+    job_id = db.create_ingestion_job("bot", [])
+    assert db.claim_ingestion_job(stale_after=300)['id'] == job_id
+    # Stored and computed times share one convention, so they compare
+    assert db.get_ingestion_job(job_id)['updated_at'] <= utcnow()
+    # Running and fresh: not claimable
+    assert db.claim_ingestion_job(stale_after=300) is None
+
+    with db.session_scope() as session:
+        session.query(IngestionJob).filter_by(id=job_id).update(
+            {'updated_at': utcnow() - timedelta(seconds=600)}, synchronize_session=False
+        )
+
+    assert db.claim_ingestion_job(stale_after=300)['id'] == job_id
+
+
+def test_backed_off_job_is_claimed_once_due(db):
+    job_id = db.create_ingestion_job("bot", [])
+    db.update_ingestion_job(job_id, status='queued', retry_at=utcnow() + timedelta(seconds=60))
+    assert db.claim_ingestion_job(stale_after=300) is None
+
+    db.update_ingestion_job(job_id, retry_at=utcnow() - timedelta(seconds=1))
+    assert db.claim_ingestion_job(stale_after=300)['id'] == job_id
+
+
+def test_chatbot_created_with_its_job_or_not_at_all(db):
+    job_id = db.create_ingestion_job("bot", [], new_chatbot={'system_prompt': "You are a test."})
+    assert db.get_ingestion_job(job_id)['chatbot_name'] == "bot"
+    assert db.get_chatbot("bot") is not None
+
+    # A file without a staged path fails the job insert
+    with pytest.raises(Exception):
+        db.create_ingestion_job("other bot", [{'filename': "a.txt"}], new_chatbot={'system_prompt': "You are a test."})
+    assert db.get_chatbot("other bot") is None
+    # Nothing was left behind, so the name is still free
+    assert db.create_chatbot("other bot", "You are a test.")